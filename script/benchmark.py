@@ -0,0 +1,391 @@
+#!/usr/bin/env python3
+"""Benchmark end-to-end and per-stage throughput of the server.
+
+Starts the server on a local Unix socket, replays concurrent Wyoming
+clients streaming a WAV fixture, micro-benchmarks the audio conversion,
+speaker embedding and speaker matching stages, and prints JSON that can be
+compared between versions.
+"""
+import argparse
+import asyncio
+import json
+import logging
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+import wave
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional
+
+import numpy as np
+
+_DIR = Path(__file__).parent
+_PROGRAM_DIR = _DIR.parent
+_TESTS_DIR = _PROGRAM_DIR / "tests"
+sys.path.insert(0, str(_PROGRAM_DIR))
+
+from wyoming.asr import Transcribe, Transcript  # noqa: E402
+from wyoming.audio import AudioChunk, AudioStart, AudioStop  # noqa: E402
+from wyoming.client import AsyncClient  # noqa: E402
+from wyoming.error import Error  # noqa: E402
+from wyoming.info import Describe, Info  # noqa: E402
+
+from wyoming_faster_whisper import __version__  # noqa: E402
+from wyoming_faster_whisper.audio import PcmBuffer  # noqa: E402
+from wyoming_faster_whisper.features import (  # noqa: E402
+    SPEAKER_FRONT_END,
+    UtteranceFeatures,
+)
+from wyoming_faster_whisper.speaker_identifier import SpeakerIdentifier  # noqa: E402
+from wyoming_faster_whisper.speaker_index import SpeakerIndex  # noqa: E402
+
+_LOGGER = logging.getLogger("benchmark")
+
+_SAMPLES_PER_CHUNK = 1024
+_START_TIMEOUT = 300
+_REQUEST_TIMEOUT = 120
+
+
+def _percentiles(values: List[float]) -> Dict[str, float]:
+    if not values:
+        return {}
+
+    array = np.array(values)
+    return {
+        "mean": float(array.mean()),
+        "p50": float(np.percentile(array, 50)),
+        "p95": float(np.percentile(array, 95)),
+        "p99": float(np.percentile(array, 99)),
+        "min": float(array.min()),
+        "max": float(array.max()),
+    }
+
+
+def _time_it(function: Callable[[], Any], repeat: int) -> Dict[str, float]:
+    function()  # warm up
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        timings.append(time.perf_counter() - start)
+
+    return _percentiles(timings)
+
+
+# -----------------------------------------------------------------------------
+
+
+class Fixture:
+    """WAV file loaded into memory."""
+
+    def __init__(self, path: Path) -> None:
+        with wave.open(str(path), "rb") as wav_file:
+            self.rate = wav_file.getframerate()
+            self.width = wav_file.getsampwidth()
+            self.channels = wav_file.getnchannels()
+            self.audio = wav_file.readframes(wav_file.getnframes())
+
+        self.seconds = len(self.audio) / (self.rate * self.width * self.channels)
+
+    def chunks(self) -> List[bytes]:
+        chunk_bytes = _SAMPLES_PER_CHUNK * self.width * self.channels
+        return [
+            self.audio[i : i + chunk_bytes]
+            for i in range(0, len(self.audio), chunk_bytes)
+        ]
+
+
+async def _wait_for_server(uri: str, proc: subprocess.Popen) -> None:
+    deadline = time.monotonic() + _START_TIMEOUT
+    while time.monotonic() < deadline:
+        if proc.poll() is not None:
+            raise RuntimeError(f"Server exited with code {proc.returncode}")
+
+        try:
+            async with AsyncClient.from_uri(uri) as client:
+                await client.write_event(Describe().event())
+                while True:
+                    event = await asyncio.wait_for(client.read_event(), timeout=10)
+                    if event is None:
+                        break
+
+                    if Info.is_type(event.type):
+                        return
+        except (OSError, asyncio.TimeoutError):
+            pass
+
+        await asyncio.sleep(0.5)
+
+    raise TimeoutError("Server did not start in time")
+
+
+async def _run_request(uri: str, fixture: Fixture, realtime: bool) -> Dict[str, Any]:
+    chunk_seconds = _SAMPLES_PER_CHUNK / fixture.rate
+    async with AsyncClient.from_uri(uri) as client:
+        started = time.perf_counter()
+        await client.write_event(Transcribe().event())
+        await client.write_event(
+            AudioStart(fixture.rate, fixture.width, fixture.channels).event()
+        )
+        for chunk in fixture.chunks():
+            await client.write_event(
+                AudioChunk(fixture.rate, fixture.width, fixture.channels, chunk).event()
+            )
+            if realtime:
+                await asyncio.sleep(chunk_seconds)
+
+        stopped = time.perf_counter()
+        await client.write_event(AudioStop().event())
+
+        while True:
+            event = await asyncio.wait_for(client.read_event(), _REQUEST_TIMEOUT)
+            if event is None:
+                raise RuntimeError("Server closed connection before transcript")
+
+            if Transcript.is_type(event.type):
+                rejected = False
+                break
+
+            if Error.is_type(event.type):
+                # Turned away by admission control (--max-queued, --queue-timeout)
+                rejected = True
+                break
+
+        finished = time.perf_counter()
+
+    return {
+        "latency": finished - stopped,
+        "total": finished - started,
+        "rejected": rejected,
+    }
+
+
+async def _client(
+    uri: str, fixture: Fixture, requests: int, realtime: bool, results: List
+) -> None:
+    for _ in range(requests):
+        results.append(await _run_request(uri, fixture, realtime))
+
+
+async def benchmark_end_to_end(
+    args: argparse.Namespace, fixture: Fixture
+) -> Dict[str, Any]:
+    """Start the server and replay concurrent clients against it."""
+    with tempfile.TemporaryDirectory() as temp_dir:
+        uri = f"unix://{temp_dir}/asr.socket"
+        command = [
+            sys.executable,
+            "-m",
+            "wyoming_faster_whisper",
+            "--uri",
+            uri,
+            "--model",
+            args.model,
+            "--data-dir",
+            temp_dir,
+        ] + args.server_args
+        _LOGGER.info("Starting server: %s", " ".join(command))
+
+        proc = subprocess.Popen(  # pylint: disable=consider-using-with
+            command,
+            cwd=_PROGRAM_DIR,
+            stdout=subprocess.DEVNULL,
+            stderr=None if args.debug else subprocess.DEVNULL,
+        )
+        try:
+            start_time = time.perf_counter()
+            await _wait_for_server(uri, proc)
+            startup_seconds = time.perf_counter() - start_time
+            _LOGGER.info("Server ready after %.2f second(s)", startup_seconds)
+
+            # Warm up
+            await _run_request(uri, fixture, realtime=False)
+
+            results: List[Dict[str, Any]] = []
+            started = time.perf_counter()
+            await asyncio.gather(
+                *(
+                    _client(uri, fixture, args.requests, args.realtime, results)
+                    for _ in range(args.clients)
+                )
+            )
+            elapsed = time.perf_counter() - started
+        finally:
+            proc.terminate()
+            try:
+                proc.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                proc.kill()
+
+    rejected = [result for result in results if result["rejected"]]
+    results = [result for result in results if not result["rejected"]]
+    latencies = [result["latency"] for result in results]
+    return {
+        "clients": args.clients,
+        "requests": len(results),
+        "rejected": len(rejected),
+        "startup_seconds": startup_seconds,
+        "elapsed_seconds": elapsed,
+        "throughput_rps": len(results) / elapsed,
+        "audio_seconds_per_second": (len(results) * fixture.seconds) / elapsed,
+        "latency_seconds": _percentiles(latencies),
+        "total_seconds": _percentiles([result["total"] for result in results]),
+        "real_time_factor": _percentiles(
+            [latency / fixture.seconds for latency in latencies]
+        ),
+    }
+
+
+# -----------------------------------------------------------------------------
+
+
+def benchmark_stages(args: argparse.Namespace, fixture: Fixture) -> Dict[str, Any]:
+    """Micro-benchmark individual stages in this process."""
+    stages: Dict[str, Any] = {}
+
+    def decode() -> np.ndarray:
+        buffer = PcmBuffer()
+        buffer.set_format(fixture.rate, fixture.width, fixture.channels)
+        buffer.append(fixture.audio)
+        return buffer.to_float32()
+
+    stages["decode_resample"] = _time_it(decode, args.repeat)
+    wav = decode()
+
+    # Matching against a large synthetic household/office
+    rng = np.random.default_rng(0)
+    index = SpeakerIndex.from_embeddings(
+        {
+            f"speaker{i}": rng.standard_normal((3, 256)).astype(np.float32)
+            for i in range(args.speakers)
+        },
+        pooling="max",
+    )
+    query = rng.standard_normal(256).astype(np.float32)
+    stages["speaker_match"] = _time_it(lambda: index.search(query, k=3), args.repeat)
+    stages["speaker_match"]["speakers"] = args.speakers
+
+    # Mel frames and frame levels, computed once per utterance
+    def speaker_features() -> UtteranceFeatures:
+        features = UtteranceFeatures(wav)
+        features.mel(SPEAKER_FRONT_END)
+        features.frame_db(SPEAKER_FRONT_END)
+        return features
+
+    stages["speaker_features"] = _time_it(speaker_features, args.repeat)
+    features = speaker_features()
+
+    try:
+        from resemblyzer import VoiceEncoder
+    except ImportError:
+        _LOGGER.warning("resemblyzer is not installed; skipping speaker embedding")
+    else:
+        identifier = SpeakerIdentifier(VoiceEncoder(device="cpu", verbose=False), index)
+        stages["speaker_embed"] = _time_it(
+            lambda: identifier.embed_features(features), args.repeat
+        )
+
+    return stages
+
+
+# -----------------------------------------------------------------------------
+
+
+def _git_revision() -> Optional[str]:
+    try:
+        return subprocess.check_output(
+            ["git", "rev-parse", "--short", "HEAD"],
+            cwd=_PROGRAM_DIR,
+            stderr=subprocess.DEVNULL,
+            text=True,
+        ).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument(
+        "--wav",
+        default=str(_TESTS_DIR / "turn_on_the_living_room_lamp.wav"),
+        help="WAV fixture streamed by each client",
+    )
+    parser.add_argument(
+        "--model",
+        default="stub",
+        help="Model passed to the server (default: stub, a stand-in that needs no NeMo weights)",
+    )
+    parser.add_argument("--clients", type=int, default=4, help="Concurrent clients")
+    parser.add_argument("--requests", type=int, default=10, help="Requests per client")
+    parser.add_argument(
+        "--realtime",
+        action="store_true",
+        help="Stream audio at real-time speed instead of as fast as possible",
+    )
+    parser.add_argument(
+        "--repeat", type=int, default=20, help="Repetitions per micro-benchmark"
+    )
+    parser.add_argument(
+        "--speakers",
+        type=int,
+        default=500,
+        help="Enrolled speakers in the matching micro-benchmark",
+    )
+    parser.add_argument(
+        "--skip-server", action="store_true", help="Only run micro-benchmarks"
+    )
+    parser.add_argument(
+        "--skip-stages", action="store_true", help="Only run the end-to-end benchmark"
+    )
+    parser.add_argument("--output", help="Write JSON results to this file")
+    parser.add_argument("--debug", action="store_true", help="Show server logs")
+    parser.add_argument(
+        "server_args",
+        nargs=argparse.REMAINDER,
+        help="Extra server arguments after --",
+    )
+    args = parser.parse_args()
+    if args.server_args and (args.server_args[0] == "--"):
+        args.server_args = args.server_args[1:]
+
+    logging.basicConfig(
+        level=logging.DEBUG if args.debug else logging.INFO,
+        format="%(asctime)s %(levelname)s: %(message)s",
+    )
+
+    fixture = Fixture(Path(args.wav))
+    report: Dict[str, Any] = {
+        "version": __version__,
+        "revision": _git_revision(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "model": args.model,
+        "server_args": args.server_args,
+        "fixture": {
+            "path": args.wav,
+            "seconds": fixture.seconds,
+            "rate": fixture.rate,
+            "width": fixture.width,
+            "channels": fixture.channels,
+        },
+    }
+
+    if not args.skip_stages:
+        report["stages"] = benchmark_stages(args, fixture)
+
+    if not args.skip_server:
+        report["end_to_end"] = asyncio.run(benchmark_end_to_end(args, fixture))
+
+    report_json = json.dumps(report, indent=2)
+    if args.output:
+        Path(args.output).write_text(report_json + "\n", encoding="utf-8")
+
+    print(report_json)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,51 @@
+#!/usr/bin/env python3
+"""Convert legacy pickled speaker embeddings to the embedding store format."""
+import argparse
+import logging
+import sys
+from pathlib import Path
+
+_PROGRAM_DIR = Path(__file__).parent.parent
+sys.path.insert(0, str(_PROGRAM_DIR))
+
+from wyoming_faster_whisper.embedding_store import (  # noqa: E402
+    STORE_SUFFIX,
+    convert_pickle,
+)
+from wyoming_faster_whisper.speaker_index import (  # noqa: E402
+    POOLING_CENTROID,
+    POOLING_MAX,
+)
+
+logging.basicConfig(
+    level=logging.INFO,
+    format="%(asctime)s %(levelname)s: %(message)s",
+    datefmt="%Y-%m-%d %H:%M:%S",
+)
+_LOGGER = logging.getLogger("convert_embeddings")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("input", help="Legacy embeddings file (.pkl)")
+    parser.add_argument(
+        "--output",
+        help=f"Output path for embeddings store (default: input with {STORE_SUFFIX})",
+    )
+    parser.add_argument(
+        "--pooling",
+        choices=(POOLING_CENTROID, POOLING_MAX),
+        default=POOLING_CENTROID,
+        help="Store one averaged embedding per speaker (centroid) or all of them (max)",
+    )
+    args = parser.parse_args()
+
+    try:
+        convert_pickle(args.input, args.output, pooling=args.pooling)
+    except Exception as e:
+        _LOGGER.error("Failed to convert embeddings: %s", e)
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,14 +1,29 @@
 #!/usr/bin/env python3
 """Enroll speaker voices using resemblyzer VoiceEncoder."""
 import argparse
+import hashlib
 import logging
-import pickle
+import os
+import wave
+from concurrent.futures import ProcessPoolExecutor, as_completed
 from pathlib import Path
 import warnings
 import sys
+from typing import Dict, List, Optional, Tuple
 
 import numpy as np
-from resemblyzer import VoiceEncoder, preprocess_wav
+
+_PROGRAM_DIR = Path(__file__).parent.parent
+sys.path.insert(0, str(_PROGRAM_DIR))
+
+from wyoming_faster_whisper.audio import TARGET_RATE, pcm_to_float32, resample  # noqa: E402
+from wyoming_faster_whisper.embedding_store import (  # noqa: E402
+    load_store,
+    save_store,
+)
+from wyoming_faster_whisper.features import UtteranceFeatures  # noqa: E402
+from wyoming_faster_whisper.speaker_identifier import SpeakerIdentifier  # noqa: E402
+from wyoming_faster_whisper.speaker_index import SpeakerIndex  # noqa: E402
 
 # Configure logging
 logging.basicConfig(
@@ -18,6 +33,17 @@ logging.basicConfig(
 )
 _LOGGER = logging.getLogger("enroll_speakers")
 
+_WAV_SUFFIXES = {".wav"}
+_CONVERTED_SUFFIXES = {".mp3", ".ogg", ".flac", ".m4a"}
+
+# Embeddings from an older pipeline (resemblyzer's preprocess_wav) are not
+# reused from the cache
+_CACHE_VERSION = b"features-v1"
+
+# Per-process voice encoder, created once by _init_worker
+_IDENTIFIER: Optional[SpeakerIdentifier] = None
+
+
 def _check_mp3_support():
     """Check if MP3 support is available."""
     try:
@@ -26,19 +52,137 @@ def _check_mp3_support():
     except ImportError:
         return None
 
+
+def _find_audio_files(ref_dir: Path, converted: bool) -> List[Tuple[str, Path]]:
+    """Find (speaker, path) pairs.
+
+    Either ref_dir/speaker_name.wav or several clips in ref_dir/speaker_name/.
+    """
+    suffixes = set(_WAV_SUFFIXES)
+    if converted:
+        suffixes |= _CONVERTED_SUFFIXES
+
+    audio_files = []
+    for path in sorted(ref_dir.iterdir()):
+        if path.is_dir():
+            audio_files.extend(
+                (path.name, clip_path)
+                for clip_path in sorted(path.iterdir())
+                if clip_path.suffix.lower() in suffixes
+            )
+        elif path.suffix.lower() in suffixes:
+            audio_files.append((path.stem, path))
+
+    return audio_files
+
+
+def _hash_file(path: Path) -> str:
+    """Hash file contents so unchanged clips are not embedded again."""
+    hasher = hashlib.sha256(_CACHE_VERSION)
+    with open(path, "rb") as audio_file:
+        for block in iter(lambda: audio_file.read(1 << 20), b""):
+            hasher.update(block)
+
+    return hasher.hexdigest()
+
+
+def _load_cache(cache_path: Path) -> Dict[str, np.ndarray]:
+    """Load {file hash: embedding} from a previous run."""
+    if not cache_path.is_file():
+        return {}
+
+    try:
+        return {
+            file_hash: np.array(rows[0])
+            for file_hash, rows in load_store(cache_path).to_dict().items()
+        }
+    except Exception as e:
+        _LOGGER.warning("Ignoring unreadable cache %s: %s", cache_path, e)
+        return {}
+
+
+def _init_worker(device: Optional[str]) -> None:
+    global _IDENTIFIER  # pylint: disable=global-statement
+    from resemblyzer import VoiceEncoder
+
+    _IDENTIFIER = SpeakerIdentifier(
+        VoiceEncoder(device=device, verbose=False), SpeakerIndex.from_embeddings({})
+    )
+
+
+def _decode(audio_path: Path) -> np.ndarray:
+    """Decode an audio file to 16kHz mono float32 in memory.
+
+    No trimming or volume normalization here: the embedding does both, the
+    same way as for audio sent to the server.
+    """
+    if audio_path.suffix.lower() in _WAV_SUFFIXES:
+        try:
+            with wave.open(str(audio_path), "rb") as wav_file:
+                return pcm_to_float32(
+                    wav_file.readframes(wav_file.getnframes()),
+                    wav_file.getframerate(),
+                    wav_file.getsampwidth(),
+                    wav_file.getnchannels(),
+                )
+        except wave.Error:
+            # Not plain PCM (e.g. float samples); let ffmpeg decode it
+            pass
+
+    # Other formats are decoded by pydub/ffmpeg without writing a WAV file
+    from pydub import AudioSegment
+
+    sound = AudioSegment.from_file(audio_path)
+    samples = np.array(sound.get_array_of_samples(), dtype=np.float32)
+    samples /= float(1 << ((8 * sound.sample_width) - 1))
+    if sound.channels > 1:
+        samples = samples.reshape(-1, sound.channels).mean(axis=1)
+
+    return resample(samples, sound.frame_rate, TARGET_RATE)
+
+
+def _embed(audio_path: Path) -> np.ndarray:
+    """Compute the embedding of one clip (runs in a worker process)."""
+    assert _IDENTIFIER is not None
+    wav = _decode(audio_path)
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore")
+        return _IDENTIFIER.embed_features(UtteranceFeatures(wav))
+
+
 def main():
     AudioSegment = _check_mp3_support()
-    
+
     parser = argparse.ArgumentParser()
     parser.add_argument(
         "--reference-dir",
         required=True,
-        help="Directory containing reference audio files (speaker_name.wav or speaker_name.mp3)"
+        help="Directory containing reference audio files (speaker_name.wav or speaker_name.mp3) or one sub-directory of clips per speaker"
     )
     parser.add_argument(
         "--output",
-        default="user_embeddings.pkl",
-        help="Output path for embeddings file (.pkl)"
+        default="user_embeddings.emb",
+        help="Output path for embeddings store (.emb)"
+    )
+    parser.add_argument(
+        "--cache",
+        help="Embedding cache keyed on file contents (default: <output>.cache)"
+    )
+    parser.add_argument(
+        "--jobs",
+        type=int,
+        default=os.cpu_count() or 1,
+        help="Number of worker processes computing embeddings"
+    )
+    parser.add_argument(
+        "--pooling",
+        choices=("centroid", "max"),
+        default="centroid",
+        help="Store one averaged embedding per speaker (centroid) or one per clip (max) (default: centroid)"
+    )
+    parser.add_argument(
+        "--device",
+        help="Device for the voice encoder in each worker (default: resemblyzer's choice)"
     )
     parser.add_argument(
         "--debug",
@@ -55,64 +199,77 @@ def main():
     _LOGGER.info("Reference directory: %s", args.reference_dir)
     _LOGGER.info("Output file: %s", args.output)
 
-    # Initialize voice encoder
-    _LOGGER.debug("Initializing VoiceEncoder")
-    encoder = VoiceEncoder()
-    embeddings = {}
+    output_path = Path(args.output)
+    cache_path = Path(args.cache) if args.cache else Path(f"{output_path}.cache")
 
-    # Process each reference file
+    # Find reference clips
     ref_dir = Path(args.reference_dir)
-    audio_files = list(ref_dir.glob("*.wav")) + (list(ref_dir.glob("*.mp3")) if AudioSegment else [])
+    audio_files = _find_audio_files(ref_dir, converted=AudioSegment is not None)
     _LOGGER.info("Found %d audio files in directory", len(audio_files))
-    
-    for audio_path in audio_files:
-        speaker = audio_path.stem
-        _LOGGER.debug("Processing speaker: %s (%s)", speaker, audio_path)
-        
-        try:
-            # Handle MP3 files if supported
-            if audio_path.suffix.lower() == ".mp3":
-                if not AudioSegment:
-                    _LOGGER.error("MP3 support requires pydub and ffmpeg. Install with: pip install pydub")
-                    _LOGGER.error("Alternatively, convert MP3 to WAV manually")
-                    continue
-                    
-                _LOGGER.debug("Converting MP3 to WAV")
-                sound = AudioSegment.from_mp3(audio_path)
-                wav_path = audio_path.with_suffix(".wav")
-                sound.export(wav_path, format="wav")
-                audio_path = wav_path
-                
-            # Load and preprocess audio
-            _LOGGER.debug("Preprocessing audio")
-            wav = preprocess_wav(audio_path)
-            
-            # Compute embedding
-            with warnings.catch_warnings():
-                warnings.simplefilter("ignore")
-                _LOGGER.debug("Computing embedding")
-                embedding = encoder.embed_utterance(wav)
-            
-            embeddings[speaker] = embedding
-            _LOGGER.info("Successfully enrolled speaker: %s", speaker)
-            
-        except Exception as e:
-            _LOGGER.error("Failed to process %s: %s", wav_path, e, exc_info=args.debug)
-
-    # Save embeddings
+    if AudioSegment is None:
+        _LOGGER.info("MP3/OGG/FLAC support requires pydub and ffmpeg. Install with: pip install pydub")
+
+    # Only embed clips whose contents are not already cached
+    cache = _load_cache(cache_path)
+    file_hashes = {audio_path: _hash_file(audio_path) for _, audio_path in audio_files}
+    to_embed = sorted(
+        {path for path, file_hash in file_hashes.items() if file_hash not in cache}
+    )
+    _LOGGER.info(
+        "%d file(s) cached, %d to embed", len(audio_files) - len(to_embed), len(to_embed)
+    )
+
+    if to_embed:
+        with ProcessPoolExecutor(
+            max_workers=max(1, min(args.jobs, len(to_embed))),
+            initializer=_init_worker,
+            initargs=(args.device,),
+        ) as executor:
+            futures = {
+                executor.submit(_embed, audio_path): audio_path
+                for audio_path in to_embed
+            }
+            for future in as_completed(futures):
+                audio_path = futures[future]
+                try:
+                    cache[file_hashes[audio_path]] = future.result()
+                    _LOGGER.debug("Computed embedding for %s", audio_path)
+                except Exception as e:
+                    _LOGGER.error("Failed to process %s: %s", audio_path, e, exc_info=args.debug)
+
+    # Group clip embeddings by speaker
+    embeddings: Dict[str, List[np.ndarray]] = {}
+    for speaker, audio_path in audio_files:
+        embedding = cache.get(file_hashes[audio_path])
+        if embedding is not None:
+            embeddings.setdefault(speaker, []).append(embedding)
+
+    for speaker, speaker_embeddings in sorted(embeddings.items()):
+        _LOGGER.info(
+            "Successfully enrolled speaker: %s (%d clip(s))", speaker, len(speaker_embeddings)
+        )
+
+    # Save embeddings (both files are replaced atomically)
     _LOGGER.info("Saving embeddings for %d speakers", len(embeddings))
     try:
-        output_path = Path(args.output)
-        output_path.parent.mkdir(parents=True, exist_ok=True)
-        
-        with open(output_path, "wb") as f:
-            pickle.dump(embeddings, f)
+        save_store(output_path, SpeakerIndex.from_embeddings(embeddings, pooling=args.pooling))
         _LOGGER.info("Successfully saved embeddings to %s", output_path)
-        
+
+        # Only keep cache entries for files that still exist
+        live_hashes = set(file_hashes.values())
+        save_store(
+            cache_path,
+            SpeakerIndex.from_embeddings(
+                {h: e for h, e in cache.items() if h in live_hashes}, pooling="max"
+            ),
+        )
+        _LOGGER.debug("Saved embedding cache to %s", cache_path)
+
     except Exception as e:
         _LOGGER.error("Failed to save embeddings: %s", e)
-        _LOGGER.info("Try using a relative path like './user_embeddings.pkl'")
+        _LOGGER.info("Try using a relative path like './user_embeddings.emb'")
         sys.exit(1)
 
+
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
@@ -0,0 +1,73 @@
+"""Tests for admission control under overload."""
+import asyncio
+
+import pytest
+
+from wyoming_faster_whisper.admission import (
+    AdmissionController,
+    Overloaded,
+    max_audio_bytes,
+)
+
+
+async def _hold(admission: AdmissionController, release: asyncio.Event) -> None:
+    async with admission.slot():
+        await release.wait()
+
+
+@pytest.mark.asyncio
+async def test_queue_full_is_rejected() -> None:
+    admission = AdmissionController(max_in_flight=1, max_queued=1)
+    release = asyncio.Event()
+
+    holder = asyncio.create_task(_hold(admission, release))
+    waiter = asyncio.create_task(_hold(admission, release))
+    await asyncio.sleep(0)
+    assert (admission.in_flight, admission.queued) == (1, 1)
+
+    # Neither a free slot nor room in the queue
+    with pytest.raises(Overloaded) as err:
+        await admission.acquire()
+    overloaded: Overloaded = err.value
+    assert overloaded.reason == "queue_full"
+
+    release.set()
+    await asyncio.gather(holder, waiter)
+    assert (admission.in_flight, admission.queued) == (0, 0)
+
+
+@pytest.mark.asyncio
+async def test_queue_timeout() -> None:
+    admission = AdmissionController(max_in_flight=1, queue_timeout=0.01)
+    release = asyncio.Event()
+    holder = asyncio.create_task(_hold(admission, release))
+    await asyncio.sleep(0)
+
+    with pytest.raises(Overloaded) as err:
+        await admission.acquire()
+    overloaded: Overloaded = err.value
+    assert overloaded.reason == "timeout"
+    assert admission.queued == 0
+
+    # The slot is still usable once released
+    release.set()
+    await holder
+    async with admission.slot():
+        assert admission.in_flight == 1
+
+
+@pytest.mark.asyncio
+async def test_unlimited() -> None:
+    admission = AdmissionController()
+    async with admission.slot():
+        async with admission.slot():
+            assert admission.in_flight == 2
+
+    assert admission.in_flight == 0
+
+
+def test_max_audio_bytes() -> None:
+    assert max_audio_bytes(16000, 2, 1) is None
+    assert max_audio_bytes(16000, 2, 1, max_seconds=2) == 64000
+    assert max_audio_bytes(16000, 2, 2, max_bytes=1001) == 1000
+    assert max_audio_bytes(16000, 2, 1, max_seconds=2, max_bytes=1000) == 1000
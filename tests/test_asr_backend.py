@@ -0,0 +1,39 @@
+"""Tests for the NeMo backend wrapper."""
+from types import SimpleNamespace
+from typing import Any, List
+
+import numpy as np
+
+from wyoming_faster_whisper.asr_backend import NemoBackend
+
+
+class FakeNemoModel:
+    """Switches decoding to timestamps like NeMo's transcribe(timestamps=True)."""
+
+    def __init__(self) -> None:
+        self.cfg = SimpleNamespace(
+            decoding=SimpleNamespace(compute_timestamps=False),
+            preprocessor=SimpleNamespace(window_stride=0.01),
+            encoder={"subsampling_factor": 8},
+        )
+        self.decoded_with_timestamps: List[bool] = []
+
+    def change_decoding_strategy(self, decoding_cfg: Any) -> None:
+        self.cfg.decoding = decoding_cfg
+
+    def transcribe(self, audio, batch_size: int = 4, timestamps=None, **kwargs):
+        if timestamps:
+            self.cfg.decoding.compute_timestamps = True
+
+        self.decoded_with_timestamps.append(self.cfg.decoding.compute_timestamps)
+        return ["text" for _ in audio]
+
+
+def test_word_timings_leave_decoding_unchanged() -> None:
+    model = FakeNemoModel()
+    backend = NemoBackend(model)
+    audio = [np.zeros(1600, dtype=np.float32)]
+
+    assert backend.transcribe_words(audio)[0].text == "text"
+    assert backend.transcribe(audio) == ["text"]
+    assert model.decoded_with_timestamps == [True, False]
@@ -0,0 +1,123 @@
+"""Tests for in-memory audio buffering and conversion."""
+import math
+
+import numpy as np
+import pytest
+
+from wyoming_faster_whisper.audio import (
+    PcmBuffer,
+    PcmStreamDecoder,
+    StreamResampler,
+    is_native_format,
+    pcm_to_float32,
+    resample,
+)
+
+
+def test_pcm_buffer_grows() -> None:
+    buffer = PcmBuffer(capacity=4)
+    buffer.set_format(16000, 2, 1)
+    buffer.append(b"\x01\x00\x02\x00")
+    buffer.append(b"\x03\x00\x04\x00")
+
+    assert len(buffer) == 8
+    assert buffer.capacity >= 8
+    assert bytes(buffer.view()) == b"\x01\x00\x02\x00\x03\x00\x04\x00"
+
+    buffer.clear()
+    assert len(buffer) == 0
+    assert not buffer.has_format
+    assert buffer.to_float32().size == 0
+
+
+def test_pcm_to_float32_16khz_mono() -> None:
+    pcm = np.array([0, 16384, -32768], dtype="<i2").tobytes()
+    samples = pcm_to_float32(pcm, 16000, 2, 1)
+
+    assert samples.dtype == np.float32
+    np.testing.assert_allclose(samples, [0.0, 0.5, -1.0])
+
+
+def test_pcm_to_float32_stereo_downmix() -> None:
+    pcm = np.array([16384, 0, -16384, -16384], dtype="<i2").tobytes()
+    samples = pcm_to_float32(pcm, 16000, 2, 2)
+
+    np.testing.assert_allclose(samples, [0.25, -0.5])
+
+
+def test_native_format() -> None:
+    assert is_native_format(16000, 2, 1)
+    assert not is_native_format(16000, 2, 2)
+    assert not is_native_format(22050, 2, 1)
+    assert not is_native_format(16000, 4, 1)
+
+
+def test_pcm_to_float32_resamples() -> None:
+    rate = 44100
+    tone = np.sin(2 * np.pi * 440 * np.arange(rate) / rate)
+    pcm = (tone * 16384).astype("<i2").tobytes()
+    samples = pcm_to_float32(pcm, rate, 2, 1)
+
+    assert samples.dtype == np.float32
+    assert len(samples) == 16000
+
+    # Still a 440Hz tone at half amplitude
+    spectrum = np.abs(np.fft.rfft(samples))
+    assert np.argmax(spectrum) == 440
+    assert np.abs(samples[1000:-1000]).max() == pytest.approx(0.5, abs=0.01)
+
+
+@pytest.mark.parametrize("rate", [8000, 22050, 48000])
+def test_resample_matches_resample_poly(rate: int) -> None:
+    resample_poly = pytest.importorskip("scipy.signal").resample_poly
+    rng = np.random.default_rng(0)
+    audio = rng.uniform(-1, 1, rate).astype(np.float32)
+
+    # The precomputed filter is the one resample_poly designs itself, and
+    # reusing it gives the same samples every time
+    divisor = math.gcd(rate, 16000)
+    expected = resample_poly(audio, 16000 // divisor, rate // divisor)
+    for _ in range(2):
+        np.testing.assert_allclose(
+            resample(audio, rate, 16000), expected, rtol=1e-4, atol=1e-5
+        )
+
+
+@pytest.mark.parametrize("rate", [8000, 22050, 44100, 48000])
+def test_stream_resampler_matches_whole_signal(rate: int) -> None:
+    rng = np.random.default_rng(0)
+    samples = rng.uniform(-1, 1, rate + 123).astype(np.float32)
+    resampler = StreamResampler(rate)
+
+    # Uneven pieces, as they arrive from a client
+    pieces = []
+    start = 0
+    while start < len(samples):
+        end = start + int(rng.integers(1, rate // 4))
+        pieces.append(resampler.process(samples[start:end]))
+        start = end
+    pieces.append(resampler.finish())
+
+    expected = resample(samples, rate, 16000)
+    streamed = np.concatenate(pieces)
+    assert len(streamed) == len(expected)
+    np.testing.assert_allclose(streamed, expected, atol=1e-5)
+
+
+def test_pcm_stream_decoder() -> None:
+    rate = 44100
+    tone = np.sin(2 * np.pi * 440 * np.arange(rate) / rate)
+    pcm = (tone * 16384).astype("<i2").tobytes()
+    decoder = PcmStreamDecoder(rate, 2, 1)
+
+    # 250 ms pieces
+    piece_bytes = (rate // 4) * 2
+    pieces = [
+        decoder.decode(
+            pcm[start : start + piece_bytes], final=(start + piece_bytes >= len(pcm))
+        )
+        for start in range(0, len(pcm), piece_bytes)
+    ]
+    np.testing.assert_allclose(
+        np.concatenate(pieces), pcm_to_float32(pcm, rate, 2, 1), atol=1e-5
+    )
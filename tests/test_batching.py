@@ -0,0 +1,136 @@
+"""Tests for dynamic micro-batching of transcriptions."""
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import List
+
+import numpy as np
+import pytest
+
+from wyoming_faster_whisper.batching import (
+    Transcription,
+    TranscriptionBatcher,
+    WordTiming,
+)
+
+
+class FakeModel:
+    """Model that reports the length of each utterance."""
+
+    def __init__(self) -> None:
+        self.batch_sizes: List[int] = []
+
+    def transcribe(self, audios, batch_size: int = 1) -> List[str]:
+        self.batch_sizes.append(len(audios))
+        return [str(len(audio)) for audio in audios]
+
+
+class FakeTimingModel(FakeModel):
+    """Also reports the utterance length as one timed word."""
+
+    supports_word_timings = True
+
+    def __init__(self) -> None:
+        super().__init__()
+        self.word_batches: List[int] = []
+
+    def transcribe_words(self, audios, batch_size: int = 1) -> List[Transcription]:
+        self.word_batches.append(len(audios))
+        return [
+            Transcription(str(len(audio)), (WordTiming(str(len(audio)), 0.0, 1.0),))
+            for audio in audios
+        ]
+
+
+@pytest.mark.asyncio
+async def test_concurrent_utterances_are_batched() -> None:
+    model = FakeModel()
+    batcher = TranscriptionBatcher(model, max_batch_size=4, max_wait_ms=50)
+    batcher.start()
+    try:
+        texts = await asyncio.gather(
+            *(batcher.transcribe(np.zeros(n, dtype=np.float32)) for n in (1, 2, 3))
+        )
+    finally:
+        await batcher.stop()
+
+    assert texts == ["1", "2", "3"]
+    assert model.batch_sizes == [3]
+
+
+@pytest.mark.asyncio
+async def test_batch_size_is_limited() -> None:
+    model = FakeModel()
+    batcher = TranscriptionBatcher(model, max_batch_size=2, max_wait_ms=50)
+    try:
+        texts = await asyncio.gather(
+            *(batcher.transcribe(np.zeros(n, dtype=np.float32)) for n in range(1, 6))
+        )
+    finally:
+        await batcher.stop()
+
+    assert texts == ["1", "2", "3", "4", "5"]
+    assert model.batch_sizes == [2, 2, 1]
+
+
+@pytest.mark.asyncio
+async def test_word_timings() -> None:
+    model = FakeTimingModel()
+    batcher = TranscriptionBatcher(model, max_batch_size=4, max_wait_ms=50)
+    try:
+        text, result = await asyncio.gather(
+            batcher.transcribe(np.zeros(1, dtype=np.float32)),
+            batcher.transcribe_words(np.zeros(2, dtype=np.float32)),
+        )
+    finally:
+        await batcher.stop()
+
+    # One caller wanting timings is enough to get them for the whole batch
+    assert batcher.supports_word_timings
+    assert text == "1"
+    assert result == Transcription("2", (WordTiming("2", 0.0, 1.0),))
+    assert model.word_batches == [2]
+    assert not model.batch_sizes
+
+    # Models without timings still answer with plain text
+    assert not TranscriptionBatcher(FakeModel()).supports_word_timings
+
+
+class SlowModel(FakeModel):
+    """Records how many batches run at once."""
+
+    def __init__(self) -> None:
+        super().__init__()
+        self.running = 0
+        self.max_running = 0
+        self._lock = threading.Lock()
+
+    def transcribe(self, audios, batch_size: int = 1) -> List[str]:
+        with self._lock:
+            self.running += 1
+            self.max_running = max(self.max_running, self.running)
+        time.sleep(0.02)
+        with self._lock:
+            self.running -= 1
+        return super().transcribe(audios, batch_size)
+
+
+@pytest.mark.asyncio
+async def test_one_batch_at_a_time() -> None:
+    model = SlowModel()
+    executor = ThreadPoolExecutor(max_workers=4)
+    batcher = TranscriptionBatcher(
+        model, max_batch_size=1, max_wait_ms=0, executor=executor
+    )
+    try:
+        await asyncio.gather(
+            *(batcher.transcribe(np.zeros(n, dtype=np.float32)) for n in range(1, 5))
+        )
+    finally:
+        await batcher.stop()
+        executor.shutdown()
+
+    # A free executor thread doesn't mean the model is free
+    assert model.batch_sizes == [1, 1, 1, 1]
+    assert model.max_running == 1
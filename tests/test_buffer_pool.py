@@ -0,0 +1,105 @@
+"""Tests for the shared audio buffer pool."""
+import gc
+
+import numpy as np
+
+from wyoming_faster_whisper.audio import PcmBuffer
+from wyoming_faster_whisper.buffer_pool import (
+    KIND_FLOAT32,
+    KIND_PCM,
+    MIN_CLASS_BYTES,
+    BufferPool,
+    PoolOccupancy,
+    size_class,
+)
+
+
+def test_size_class() -> None:
+    assert size_class(0) == MIN_CLASS_BYTES
+    assert size_class(MIN_CLASS_BYTES) == MIN_CLASS_BYTES
+    assert size_class(MIN_CLASS_BYTES + 1) == 2 * MIN_CLASS_BYTES
+    assert size_class(320000) == 512 * 1024
+
+
+def test_pcm_buffers_are_reused() -> None:
+    pool = BufferPool()
+    buffer = pool.acquire_pcm()
+    buffer.set_format(16000, 2, 1)
+    buffer.append(b"\x01\x00" * 100)
+    assert pool.occupancy(KIND_PCM) == PoolOccupancy(1, 512 * 1024, 0, 0)
+
+    pool.release(buffer)
+    assert pool.occupancy(KIND_PCM) == PoolOccupancy(0, 0, 1, 512 * 1024)
+
+    # Returned empty, and handed out again
+    again = pool.acquire_pcm()
+    assert again is buffer
+    assert (len(again) == 0) and (not again.has_format)
+
+    # Returning twice, or a foreign buffer, does nothing
+    pool.release(again)
+    pool.release(again)
+    pool.release(PcmBuffer())
+    assert pool.occupancy(KIND_PCM).free == 1
+
+
+def test_grown_buffer_serves_smaller_requests() -> None:
+    pool = BufferPool()
+    buffer = pool.acquire_pcm(capacity=MIN_CLASS_BYTES)
+    buffer.append(bytes(3 * MIN_CLASS_BYTES))
+    pool.release(buffer)
+
+    # Too small for a bigger class, big enough for a smaller one
+    assert pool.acquire_pcm(capacity=4 * MIN_CLASS_BYTES) is not buffer
+    assert pool.acquire_pcm(capacity=MIN_CLASS_BYTES) is buffer
+
+
+def test_float32_decode() -> None:
+    pool = BufferPool()
+    buffer = PcmBuffer()
+    buffer.set_format(16000, 2, 1)
+    buffer.append(np.array([0, 16384, -32768], dtype="<i2").tobytes())
+
+    audio = pool.to_float32(buffer)
+    np.testing.assert_allclose(audio, [0.0, 0.5, -1.0])
+    assert pool.occupancy(KIND_FLOAT32).in_use == 1
+
+    # Returned through the view
+    pool.release(audio)
+    assert pool.occupancy(KIND_FLOAT32) == PoolOccupancy(0, 0, 1, MIN_CLASS_BYTES)
+    reused = pool.acquire_float32(10)
+    assert reused.base is audio.base
+
+    # Resampled audio isn't pooled; only the reused array is checked out
+    buffer.clear()
+    buffer.set_format(8000, 2, 1)
+    buffer.append(bytes(1600))
+    assert len(pool.to_float32(buffer)) == 1600
+    assert pool.occupancy(KIND_FLOAT32).in_use == 1
+
+
+def test_free_memory_is_bounded() -> None:
+    pool = BufferPool(
+        max_free_bytes=3 * MIN_CLASS_BYTES, max_buffer_bytes=MIN_CLASS_BYTES
+    )
+    small = [pool.acquire_float32(16) for _ in range(4)]
+    big = pool.acquire_float32(MIN_CLASS_BYTES)
+    for array in small + [big]:
+        pool.release(array)
+
+    assert pool.occupancy(KIND_FLOAT32) == PoolOccupancy(0, 0, 3, 3 * MIN_CLASS_BYTES)
+
+    pool.close()
+    assert pool.occupancy(KIND_FLOAT32) == PoolOccupancy()
+
+
+def test_unreturned_buffers_are_collected() -> None:
+    pool = BufferPool()
+    audio = pool.acquire_float32(16)
+    pool.acquire_pcm()
+    assert pool.occupancy(KIND_FLOAT32).in_use == 1
+
+    del audio
+    gc.collect()
+    assert pool.occupancy(KIND_FLOAT32) == PoolOccupancy()
+    assert pool.occupancy(KIND_PCM) == PoolOccupancy()
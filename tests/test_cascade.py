@@ -0,0 +1,106 @@
+"""Tests for routing utterances between a small and a large model."""
+from typing import List, Optional
+
+import numpy as np
+import pytest
+
+from wyoming_faster_whisper.batching import Transcription, TranscriptionBatcher
+from wyoming_faster_whisper.cascade import CascadeRouter
+
+RATE = 16000
+
+
+class ConfidenceModel:
+    """Model with a fixed transcript and confidence."""
+
+    supports_word_timings = True
+
+    def __init__(self, text: str, confidence: Optional[float]) -> None:
+        self.text = text
+        self.confidence = confidence
+        self.supports_confidence = confidence is not None
+        self.lengths: List[int] = []
+        self.word_calls = 0
+
+    def transcribe(self, audios, batch_size: int = 1) -> List[str]:
+        self.lengths.extend(len(audio) for audio in audios)
+        return [self.text for _ in audios]
+
+    def transcribe_confidence(self, audios, batch_size: int = 1) -> List[Transcription]:
+        self.lengths.extend(len(audio) for audio in audios)
+        return [Transcription(self.text, (), self.confidence) for _ in audios]
+
+    def transcribe_words(self, audios, batch_size: int = 1) -> List[Transcription]:
+        self.word_calls += 1
+        return self.transcribe_confidence(audios, batch_size)
+
+
+def _router(small: ConfidenceModel, large: ConfidenceModel, **kwargs) -> CascadeRouter:
+    return CascadeRouter(
+        TranscriptionBatcher(small, max_wait_ms=0),
+        TranscriptionBatcher(large, max_wait_ms=0),
+        **kwargs,
+    )
+
+
+def _audio(seconds: float) -> np.ndarray:
+    return np.zeros(int(seconds * RATE), dtype=np.float32)
+
+
+@pytest.mark.asyncio
+async def test_route_by_duration() -> None:
+    small = ConfidenceModel("small", None)
+    large = ConfidenceModel("large", None)
+    router = _router(small, large, max_small_seconds=3.0)
+    try:
+        assert await router.transcribe(_audio(1.0)) == "small"
+        assert await router.transcribe(_audio(3.0)) == "small"
+        assert await router.transcribe(_audio(4.0)) == "large"
+    finally:
+        await router.stop()
+
+    assert small.lengths == [RATE, 3 * RATE]
+    assert large.lengths == [4 * RATE]
+
+
+@pytest.mark.asyncio
+async def test_escalate_low_confidence() -> None:
+    small = ConfidenceModel("smal", 0.4)
+    large = ConfidenceModel("large", 0.9)
+    router = _router(small, large, max_small_seconds=3.0, min_confidence=0.5)
+    try:
+        assert await router.transcribe(_audio(1.0)) == "large"
+        result = await router.transcribe_words(_audio(1.0))
+    finally:
+        await router.stop()
+
+    assert result == Transcription("large", (), 0.9)
+    assert len(small.lengths) == 2
+    assert len(large.lengths) == 2
+
+    # Word timings only for the caller that asked for them
+    assert small.word_calls == large.word_calls == 1
+
+    # Confident enough
+    small.confidence = 0.6
+    router = _router(small, large, min_confidence=0.5)
+    try:
+        assert await router.transcribe(_audio(1.0)) == "smal"
+    finally:
+        await router.stop()
+
+    assert len(large.lengths) == 2
+
+
+@pytest.mark.asyncio
+async def test_confidence_needs_support() -> None:
+    small = ConfidenceModel("small", None)
+    large = ConfidenceModel("large", 0.9)
+    router = _router(small, large, min_confidence=0.5)
+    assert router.min_confidence == 0.0
+    assert not router.supports_confidence
+    assert router.supports_word_timings
+    try:
+        assert await router.transcribe(_audio(10.0)) == "small"
+    finally:
+        await router.stop()
@@ -0,0 +1,186 @@
+"""Tests for diarization, with a fake voice encoder."""
+import asyncio
+from typing import List
+
+import numpy as np
+import pytest
+
+from wyoming_faster_whisper.batching import Transcription, WordTiming
+from wyoming_faster_whisper.diarization import (
+    DiarizedSegment,
+    SpeakerTurn,
+    assign_words,
+    diarize,
+    main_speaker,
+    smooth_labels,
+    transcribe_speakers,
+    window_starts,
+)
+from wyoming_faster_whisper.features import UtteranceFeatures
+from wyoming_faster_whisper.speaker_identifier import SpeakerIdentifier
+from wyoming_faster_whisper.speaker_index import SpeakerIndex
+
+RATE = 16000
+ALICE = np.array([1.0, 0.0, 0.0], dtype=np.float32)
+BOB = np.array([0.0, 1.0, 0.0], dtype=np.float32)
+STRANGER = np.array([0.0, 0.0, 1.0], dtype=np.float32)
+
+
+class FakeIdentifier(SpeakerIdentifier):
+    """Embeds a window as alice (low voice), bob (mid) or a stranger (high)."""
+
+    def __init__(self) -> None:
+        super().__init__(
+            None, SpeakerIndex.from_embeddings({"alice": ALICE, "bob": BOB})
+        )
+        self.batches: List[int] = []
+
+    def embed_mels(self, mels: np.ndarray) -> np.ndarray:
+        self.batches.append(len(mels))
+        embeddings = []
+        for mel in mels:
+            channel = mel.mean(axis=0).argmax()
+            if channel < 15:
+                embeddings.append(ALICE)
+            elif channel < 33:
+                embeddings.append(BOB)
+            else:
+                embeddings.append(STRANGER)
+
+        return np.stack(embeddings)
+
+
+def _voice(seconds: float, frequency: float) -> np.ndarray:
+    t = np.arange(int(seconds * RATE)) / RATE
+    return (0.1 * np.sin(2 * np.pi * frequency * t)).astype(np.float32)
+
+
+def _alice(seconds: float) -> np.ndarray:
+    return _voice(seconds, 300)
+
+
+def _bob(seconds: float) -> np.ndarray:
+    return _voice(seconds, 2000)
+
+
+def test_window_starts() -> None:
+    assert window_starts(1000, 25600, 8000) == [0]
+    assert window_starts(25600, 25600, 8000) == [0]
+
+    # The last window ends with the audio
+    starts = window_starts(40000, 25600, 8000)
+    assert starts == [0, 8000, 14400]
+
+
+def test_smooth_labels() -> None:
+    labels = ["a", "a", "b", "a", "a", "b", "b"]
+    assert smooth_labels(labels) == ["a", "a", "a", "a", "a", "b", "b"]
+
+
+def test_diarize_two_speakers() -> None:
+    identifier = FakeIdentifier()
+    audio = np.concatenate([_alice(3.0), _bob(3.0)])
+    turns = diarize(identifier, UtteranceFeatures(audio))
+
+    # All windows embedded in one batch
+    assert len(identifier.batches) == 1
+    assert [turn.speaker for turn in turns] == ["alice", "bob"]
+    assert turns[0].start == 0.0
+    assert turns[-1].end == 6.0
+    assert abs(turns[0].end - 3.0) <= 0.25
+    assert turns[0].end == turns[1].start
+
+
+def test_diarize_unknown_speaker_and_silence() -> None:
+    identifier = FakeIdentifier()
+    audio = np.concatenate(
+        [_alice(3.0), np.zeros(3 * RATE, dtype=np.float32), _voice(3.0, 7000)]
+    )
+    turns = diarize(identifier, UtteranceFeatures(audio))
+
+    # Silent windows aren't embedded and belong to the previous speaker
+    num_frames = (len(audio) // 160) + 1
+    assert identifier.batches[0] < len(window_starts(num_frames, 160, 50))
+    assert [turn.speaker for turn in turns] == ["alice", None]
+
+
+def test_diarize_short_audio() -> None:
+    turns = diarize(FakeIdentifier(), UtteranceFeatures(_bob(0.5)))
+    assert turns == [SpeakerTurn("bob", 0.0, 0.5)]
+    assert not diarize(FakeIdentifier(), UtteranceFeatures(np.zeros(0, np.float32)))
+
+
+def test_assign_words() -> None:
+    turns = [SpeakerTurn("alice", 0.0, 2.0), SpeakerTurn("bob", 2.0, 4.0)]
+    words = [
+        WordTiming("turn", 0.2, 0.5),
+        WordTiming("on", 0.6, 0.8),
+        WordTiming("the", 1.7, 2.1),  # midpoint 1.9
+        WordTiming("lights", 2.2, 2.9),
+        WordTiming("please", 3.0, 3.5),
+    ]
+
+    segments = assign_words(turns, words)
+    assert segments == [
+        DiarizedSegment("alice", "turn on the", 0.2, 2.1),
+        DiarizedSegment("bob", "lights please", 2.2, 3.5),
+    ]
+    assert main_speaker(segments) == "alice"
+    assert main_speaker([DiarizedSegment(None, "hi", 0.0, 1.0)]) is None
+
+
+class TimingTranscriber:
+    """Batcher stand-in with one word per second of audio."""
+
+    supports_confidence = False
+
+    def __init__(self, supports_word_timings: bool) -> None:
+        self.supports_word_timings = supports_word_timings
+        self.calls: List[float] = []
+
+    async def transcribe(self, audio: np.ndarray) -> str:
+        return (await self.transcribe_words(audio)).text
+
+    async def transcribe_confidence(self, audio: np.ndarray) -> Transcription:
+        return Transcription(await self.transcribe(audio))
+
+    async def transcribe_words(self, audio: np.ndarray) -> Transcription:
+        await asyncio.sleep(0)
+        seconds = len(audio) / RATE
+        self.calls.append(seconds)
+        words = tuple(
+            WordTiming(f"w{second}", second + 0.1, second + 0.9)
+            for second in range(int(seconds))
+        )
+        return Transcription(" ".join(word.word for word in words), words)
+
+
+@pytest.mark.asyncio
+async def test_transcribe_speakers_with_word_timings() -> None:
+    transcriber = TimingTranscriber(supports_word_timings=True)
+    audio = np.concatenate([_alice(3.0), _bob(3.0)])
+    segments = await transcribe_speakers(
+        transcriber, FakeIdentifier(), UtteranceFeatures(audio)
+    )
+
+    # Transcribed once as a whole
+    assert transcriber.calls == [6.0]
+    assert segments == [
+        DiarizedSegment("alice", "w0 w1 w2", 0.1, 2.9),
+        DiarizedSegment("bob", "w3 w4 w5", 3.1, 5.9),
+    ]
+
+
+@pytest.mark.asyncio
+async def test_transcribe_speakers_per_turn() -> None:
+    transcriber = TimingTranscriber(supports_word_timings=False)
+    audio = np.concatenate([_alice(3.0), _bob(3.0)])
+    segments = await transcribe_speakers(
+        transcriber, FakeIdentifier(), UtteranceFeatures(audio)
+    )
+
+    # Each turn is transcribed on its own
+    assert len(transcriber.calls) == 2
+    assert [segment.speaker for segment in segments] == ["alice", "bob"]
+    assert segments[0].start == 0.0
+    assert segments[-1].end == 6.0
@@ -0,0 +1,69 @@
+"""Tests for the memory-mappable speaker embedding store."""
+import pickle
+from pathlib import Path
+from typing import List
+
+import numpy as np
+
+from wyoming_faster_whisper.embedding_store import (
+    StoreWatcher,
+    is_store,
+    load_index,
+    load_store,
+    save_store,
+)
+from wyoming_faster_whisper.speaker_index import SpeakerIndex
+
+_EMBEDDINGS = {
+    "alice": np.array([[1, 0, 0], [0, 1, 0]], dtype=np.float32),
+    "bob": np.array([0, 0, 2], dtype=np.float32),
+}
+
+
+def test_store_round_trip(tmp_path: Path) -> None:
+    index = SpeakerIndex.from_embeddings(_EMBEDDINGS, pooling="max")
+    store_path = tmp_path / "user_embeddings.emb"
+    save_store(store_path, index)
+
+    assert is_store(store_path)
+    loaded = load_store(store_path)
+    assert isinstance(loaded.matrix, np.memmap)
+    assert loaded.row_speakers == index.row_speakers
+    np.testing.assert_allclose(loaded.matrix, index.matrix)
+    assert loaded.search(np.array([0, 0, 1]))[0][0] == "bob"
+
+    # Centroid pooling on top of a store with several rows per speaker
+    assert loaded.pooled("centroid").matrix.shape == (2, 3)
+
+
+def test_legacy_pickle_is_converted(tmp_path: Path) -> None:
+    pickle_path = tmp_path / "user_embeddings.pkl"
+    with open(pickle_path, "wb") as pickle_file:
+        pickle.dump(_EMBEDDINGS, pickle_file)
+
+    index = load_index(pickle_path)
+    assert sorted(index.speakers) == ["alice", "bob"]
+
+    # Converted with one averaged row per speaker, used memory-mapped as is
+    assert isinstance(index.matrix, np.memmap)
+    assert index.matrix.shape == (2, 3)
+    assert index.pooled("max") is index
+    assert index.pooled("centroid") is index
+
+    store_path = tmp_path / "user_embeddings.emb"
+    assert is_store(store_path)
+    assert load_index(pickle_path).row_speakers == index.row_speakers
+
+
+def test_watcher_reloads_changed_store(tmp_path: Path) -> None:
+    store_path = tmp_path / "user_embeddings.emb"
+    save_store(store_path, SpeakerIndex.from_embeddings({"alice": _EMBEDDINGS["bob"]}))
+
+    reloaded: List[SpeakerIndex] = []
+    watcher = StoreWatcher(store_path, reloaded.append)
+    assert not watcher.check()
+
+    save_store(store_path, SpeakerIndex.from_embeddings(_EMBEDDINGS))
+    assert watcher.check()
+    assert sorted(reloaded[-1].speakers) == ["alice", "bob"]
+    assert not watcher.check()
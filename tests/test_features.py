@@ -0,0 +1,133 @@
+"""Tests for front-end features shared by ASR and speaker ID."""
+import wave
+from pathlib import Path
+from typing import List
+
+import numpy as np
+import pytest
+
+from wyoming_faster_whisper.audio import pcm_to_float32
+from wyoming_faster_whisper.features import (
+    SPEAKER_FRONT_END,
+    MelFrontEnd,
+    UtteranceFeatures,
+    mel_filterbank,
+    partial_windows,
+    speech_frames,
+    volume_gain,
+)
+from wyoming_faster_whisper.speaker_identifier import SpeakerIdentifier
+from wyoming_faster_whisper.speaker_index import SpeakerIndex
+
+RATE = 16000
+_WAV_PATH = Path(__file__).parent / "turn_on_the_living_room_lamp.wav"
+
+
+def _tone(seconds: float, amplitude: float = 0.1, frequency: float = 440) -> np.ndarray:
+    t = np.arange(int(seconds * RATE)) / RATE
+    return (amplitude * np.sin(2 * np.pi * frequency * t)).astype(np.float32)
+
+
+def test_features_are_computed_once() -> None:
+    features = UtteranceFeatures(_tone(1.0))
+    mel = features.mel()
+    assert mel.shape == (101, 40)
+    assert features.mel(SPEAKER_FRONT_END) is mel
+    assert not mel.flags.writeable
+
+    # Same STFT, different filterbank: the power spectrum is shared
+    wide = MelFrontEnd(n_fft=400, n_mels=80, periodic_window=True)
+    assert features.mel(wide).shape == (101, 80)
+    assert features.power(wide) is features.power(SPEAKER_FRONT_END)
+
+
+def test_frame_db() -> None:
+    # A sine at full scale has an RMS of -3 dBFS
+    frame_db = UtteranceFeatures(_tone(1.0, amplitude=1.0)).frame_db()
+    np.testing.assert_allclose(frame_db[5:-5], -3.0, atol=0.1)
+
+    silence = UtteranceFeatures(np.zeros(RATE, dtype=np.float32)).frame_db()
+    assert np.all(silence <= -90)
+
+
+def test_speech_frames() -> None:
+    silence = np.zeros(RATE // 2, dtype=np.float32)
+    pause = np.zeros(RATE // 20, dtype=np.float32)  # 50 ms
+    audio = np.concatenate([silence, _tone(1.0), pause, _tone(1.0), silence])
+    speech = speech_frames(UtteranceFeatures(audio).frame_db())
+
+    # Leading and trailing silence are dropped, the short pause is kept
+    voiced = np.flatnonzero(speech)
+    assert abs(voiced[0] - 50) <= 5
+    assert abs(voiced[-1] - 255) <= 5
+    assert speech[voiced[0] : voiced[-1]].all()
+
+
+def test_mel_filterbank() -> None:
+    weights = mel_filterbank(16000, 512, 80)
+    assert weights.shape == (80, 257)
+    assert np.all(weights >= 0)
+
+    # Filters are ordered by center frequency
+    peaks = weights.argmax(axis=1)
+    assert np.all(np.diff(peaks) >= 0)
+
+
+def test_partial_windows() -> None:
+    mel = np.ones((401, 40), dtype=np.float32)
+
+    # Like embed_utterance: the last window covers too little and is dropped
+    assert partial_windows(mel).shape == (4, 160, 40)
+
+    windows = partial_windows(mel[:50])
+    assert windows.shape == (1, 160, 40)
+    assert np.all(windows[0, 50:] == 0)
+
+
+def test_volume_gain() -> None:
+    # -23 dBFS is raised to -30 dBFS only if it's quieter
+    assert volume_gain(_tone(1.0, amplitude=0.1)) == 1.0
+    gain = volume_gain(_tone(1.0, amplitude=0.01))
+    np.testing.assert_allclose(10 * np.log10(gain), 13.0, atol=0.1)
+
+
+class FakeIdentifier(SpeakerIdentifier):
+    """Embeds a window as its mean mel energy."""
+
+    def __init__(self) -> None:
+        super().__init__(None, SpeakerIndex.from_embeddings({}))
+        self.windows: List[np.ndarray] = []
+
+    def embed_mels(self, mels: np.ndarray) -> np.ndarray:
+        self.windows.extend(mels)
+        return np.stack([[mel.mean(), 1.0] for mel in mels])
+
+
+def test_embed_features() -> None:
+    identifier = FakeIdentifier()
+    silence = np.zeros(RATE, dtype=np.float32)
+    features = UtteranceFeatures(np.concatenate([silence, _tone(3.0), silence]))
+    embedding = identifier.embed_features(features)
+
+    # Silence is trimmed before the utterance is split into windows
+    assert len(identifier.windows) == 3
+    np.testing.assert_allclose(np.linalg.norm(embedding), 1.0, rtol=1e-6)
+
+
+def test_embedding_matches_resemblyzer() -> None:
+    resemblyzer = pytest.importorskip("resemblyzer")
+    encoder = resemblyzer.VoiceEncoder(device="cpu", verbose=False)
+    identifier = SpeakerIdentifier(encoder, SpeakerIndex.from_embeddings({}))
+    with wave.open(str(_WAV_PATH), "rb") as wav_file:
+        audio = pcm_to_float32(
+            wav_file.readframes(wav_file.getnframes()),
+            wav_file.getframerate(),
+            wav_file.getsampwidth(),
+            wav_file.getnchannels(),
+        )
+
+    # Same voice whether trimmed by webrtcvad on the waveform or by level
+    # on the mel frames
+    expected = encoder.embed_utterance(resemblyzer.preprocess_wav(_WAV_PATH))
+    embedding = identifier.embed_features(UtteranceFeatures(audio))
+    assert float(np.dot(embedding, expected)) >= 0.95
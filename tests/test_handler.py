@@ -0,0 +1,207 @@
+"""Tests for the Wyoming event handler, with a stub transcriber and client."""
+import argparse
+import asyncio
+from typing import Callable, Iterable, List, Optional, cast
+
+import numpy as np
+import pytest
+from wyoming.audio import AudioChunk, AudioStart, AudioStop
+from wyoming.event import Event, async_read_event, async_write_event
+from wyoming.info import Info
+
+from wyoming_faster_whisper.admission import AdmissionController
+from wyoming_faster_whisper.batching import Transcription
+from wyoming_faster_whisper.buffer_pool import KIND_PCM, BufferPool
+from wyoming_faster_whisper.handler import ParakeetEventHandler
+
+RATE = 16000
+
+
+class StubTranscriber:
+    """Transcribes every utterance as its length in samples."""
+
+    supports_word_timings = False
+    supports_confidence = False
+
+    def __init__(self) -> None:
+        self.lengths: List[int] = []
+
+    async def transcribe(self, audio: np.ndarray) -> str:
+        self.lengths.append(len(audio))
+        return f"{len(audio)} samples"
+
+    async def transcribe_confidence(self, audio: np.ndarray) -> Transcription:
+        return Transcription(await self.transcribe(audio))
+
+    async def transcribe_words(self, audio: np.ndarray) -> Transcription:
+        return Transcription(await self.transcribe(audio))
+
+
+class _Pipe:
+    """In-memory stream: written like a StreamWriter, read from .reader."""
+
+    def __init__(self) -> None:
+        self.reader = asyncio.StreamReader()
+
+    def write(self, data: bytes) -> None:
+        self.reader.feed_data(data)
+
+    def writelines(self, lines: Iterable[bytes]) -> None:
+        for line in lines:
+            self.write(line)
+
+    async def drain(self) -> None:
+        pass
+
+    def close(self) -> None:
+        self.reader.feed_eof()
+
+
+class StubClient:
+    """Runs a handler over in-memory streams and talks to it."""
+
+    def __init__(self, handler_factory) -> None:
+        self._to_handler = _Pipe()
+        self._from_handler = _Pipe()
+        self.handler: ParakeetEventHandler = handler_factory(
+            self._to_handler.reader,
+            cast(asyncio.StreamWriter, self._from_handler),
+        )
+        self.task = asyncio.create_task(self.handler.run())
+
+    async def write_event(self, event: Event) -> None:
+        await async_write_event(event, cast(asyncio.StreamWriter, self._to_handler))
+
+    async def read_event(self) -> Optional[Event]:
+        """Next event from the handler, skipping partial transcripts."""
+        while True:
+            event = await asyncio.wait_for(
+                async_read_event(self._from_handler.reader), 5
+            )
+            if (event is None) or (event.type != "transcript-chunk"):
+                return event
+
+    async def send_audio(self, seconds: float, stop: bool = True) -> None:
+        await self.write_event(AudioStart(RATE, 2, 1).event())
+        pcm = np.full(int(seconds * RATE), 1000, dtype=np.int16).tobytes()
+        for start in range(0, len(pcm), 8000):
+            await self.write_event(
+                AudioChunk(RATE, 2, 1, pcm[start : start + 8000]).event()
+            )
+
+        if stop:
+            await self.write_event(AudioStop().event())
+
+    async def disconnect(self) -> None:
+        self._to_handler.close()
+        await asyncio.wait_for(self.task, 5)
+
+
+def _args(**kwargs) -> argparse.Namespace:
+    return argparse.Namespace(language=None, **kwargs)
+
+
+def _factory(
+    transcriber: StubTranscriber, args: argparse.Namespace, **kwargs
+) -> Callable:
+    def factory(reader, writer) -> ParakeetEventHandler:
+        return ParakeetEventHandler(
+            Info(), args, transcriber, None, reader, writer, **kwargs
+        )
+
+    return factory
+
+
+@pytest.mark.asyncio
+async def test_streaming_is_refused_at_capacity() -> None:
+    transcriber = StubTranscriber()
+    admission = AdmissionController(max_in_flight=1, max_queued=0)
+    factory = _factory(
+        transcriber,
+        _args(streaming=True, streaming_chunk_ms=500),
+        admission=admission,
+    )
+
+    # The first utterance is still streaming, but already holds the slot
+    first = StubClient(factory)
+    await first.send_audio(2.0, stop=False)
+    await asyncio.sleep(0.1)
+    assert admission.in_flight == 1
+    num_transcribed = len(transcriber.lengths)
+    assert num_transcribed > 0
+
+    second = StubClient(factory)
+    await second.send_audio(2.0)
+    error = await second.read_event()
+    assert error is not None
+    assert error.type == "error"
+    assert error.data["code"] == "overloaded_queue_full"
+    await second.disconnect()
+
+    # No streaming work was started for the refused utterance
+    assert len(transcriber.lengths) == num_transcribed
+
+    await first.write_event(AudioStop().event())
+    transcript = await first.read_event()
+    assert transcript is not None
+    assert transcript.type == "transcript"
+    await first.disconnect()
+    assert admission.in_flight == 0
+
+
+@pytest.mark.asyncio
+async def test_audio_is_transcribed() -> None:
+    transcriber = StubTranscriber()
+    client = StubClient(_factory(transcriber, _args()))
+    await client.send_audio(1.0)
+
+    transcript = await client.read_event()
+    assert transcript is not None
+    assert transcript.type == "transcript"
+    assert transcript.data["text"] == str({"text": "16000 samples", "speaker": "guest"})
+    assert transcriber.lengths == [RATE]
+    await client.disconnect()
+
+
+@pytest.mark.asyncio
+async def test_buffers_are_released_on_disconnect() -> None:
+    buffer_pool = BufferPool()
+    admission = AdmissionController(max_in_flight=1)
+    client = StubClient(
+        _factory(
+            StubTranscriber(), _args(), buffer_pool=buffer_pool, admission=admission
+        )
+    )
+    await client.send_audio(1.0, stop=False)
+    await asyncio.sleep(0.1)
+    assert buffer_pool.occupancy(KIND_PCM).in_use == 1
+
+    # Gone before AudioStop
+    await client.disconnect()
+    occupancy = buffer_pool.occupancy(KIND_PCM)
+    assert occupancy.in_use == 0
+    assert occupancy.free == 1
+    assert admission.in_flight == 0
+
+
+@pytest.mark.asyncio
+async def test_overloaded_request_gets_an_error() -> None:
+    transcriber = StubTranscriber()
+    admission = AdmissionController(max_in_flight=1, queue_timeout=0.05)
+    factory = _factory(transcriber, _args(), admission=admission)
+
+    first = StubClient(factory)
+    await first.write_event(AudioStart(RATE, 2, 1).event())
+    await asyncio.sleep(0.1)
+
+    second = StubClient(factory)
+    await second.send_audio(1.0)
+    error = await second.read_event()
+    assert error is not None
+    assert error.type == "error"
+    assert error.data["code"] == "overloaded_timeout"
+    await second.disconnect()
+    await first.disconnect()
+
+    assert not transcriber.lengths
+    assert admission.in_flight == 0
@@ -0,0 +1,114 @@
+"""Tests for transcribing long audio in overlapping windows."""
+import asyncio
+from typing import List
+
+import numpy as np
+import pytest
+
+from wyoming_faster_whisper.batching import Transcription
+from wyoming_faster_whisper.long_audio import (
+    merge_overlap,
+    merge_texts,
+    split_windows,
+    transcribe_long,
+)
+
+RATE = 16000
+
+
+def test_split_windows_cover_audio() -> None:
+    audio = np.random.default_rng(0).standard_normal(RATE * 65).astype(np.float32)
+    windows = split_windows(audio, RATE * 20, RATE * 2, RATE * 3)
+
+    assert windows[0][0] == 0
+    assert windows[-1][1] == len(audio)
+    for start, end in windows:
+        assert 0 < (end - start) <= RATE * 20
+
+    # Each window starts before the previous one ends
+    for (_, prev_end), (start, _) in zip(windows, windows[1:]):
+        assert prev_end - start == RATE * 2
+
+
+def test_split_windows_at_pauses() -> None:
+    audio = np.ones(RATE * 30, dtype=np.float32)
+    audio[RATE * 18 : RATE * 18 + 800] = 0.0  # 50 ms pause
+    windows = split_windows(audio, RATE * 20, 0, RATE * 5)
+
+    assert len(windows) == 2
+    assert RATE * 18 <= windows[0][1] <= (RATE * 18) + 800
+
+
+def test_short_audio_is_one_window() -> None:
+    audio = np.zeros(RATE, dtype=np.float32)
+    assert split_windows(audio, RATE * 20, RATE * 2, RATE * 3) == [(0, RATE)]
+
+
+def test_merge_overlap() -> None:
+    assert merge_overlap(
+        "turn on the living".split(), "the living room lamp".split()
+    ) == ("turn on the living room lamp".split())
+
+    # Punctuation and case differ at the window edge
+    assert merge_texts(["Turn on the Living.", "the living room lamp."]) == (
+        "Turn on the living room lamp."
+    )
+
+
+def test_merge_partial_words() -> None:
+    # Words cut in half at both window edges are dropped
+    assert merge_texts(["set a timer for ten mi", "r for ten minutes please"]) == (
+        "set a timer for ten minutes please"
+    )
+
+    # No shared words: plain concatenation
+    assert (
+        merge_texts(["hello there", "general kenobi"]) == "hello there general kenobi"
+    )
+    assert merge_texts(["", "hello", ""]) == "hello"
+
+
+class WindowModel:
+    """Batcher stand-in that transcribes a window as its sample range."""
+
+    supports_word_timings = False
+    supports_confidence = False
+
+    def __init__(self, audio: np.ndarray) -> None:
+        self.audio = audio
+        self.windows: List[int] = []
+        self.active = 0
+        self.max_active = 0
+
+    async def transcribe(self, window: np.ndarray) -> str:
+        self.active += 1
+        self.max_active = max(self.max_active, self.active)
+        await asyncio.sleep(0.001)
+        self.active -= 1
+
+        # Windows are views into the original audio
+        assert np.shares_memory(window, self.audio)
+        seconds = window[[0, -1]].astype(int).tolist()
+        self.windows.append(len(window))
+        return " ".join(f"w{second}" for second in range(seconds[0], seconds[1] + 1))
+
+    async def transcribe_confidence(self, window: np.ndarray) -> Transcription:
+        return Transcription(await self.transcribe(window))
+
+    async def transcribe_words(self, window: np.ndarray) -> Transcription:
+        return Transcription(await self.transcribe(window))
+
+
+@pytest.mark.asyncio
+async def test_transcribe_long() -> None:
+    # Each sample holds its second, so words are seconds
+    audio = (np.arange(RATE * 50) // RATE).astype(np.float32)
+    model = WindowModel(audio)
+
+    text = await transcribe_long(
+        model, audio, window_seconds=10, overlap_seconds=2, max_parallel=2
+    )
+
+    assert text == " ".join(f"w{second}" for second in range(50))
+    assert len(model.windows) > 4
+    assert model.max_active == 2
@@ -0,0 +1,49 @@
+"""Tests for Prometheus-style metrics."""
+import asyncio
+
+import pytest
+
+from wyoming_faster_whisper.metrics import MetricsRegistry, start_metrics_server
+
+
+def test_render_text_format() -> None:
+    registry = MetricsRegistry()
+    requests = registry.counter("requests_total", "Requests", ("outcome",))
+    depth = registry.gauge("queue_depth", "Queue depth")
+    latency = registry.histogram("latency_seconds", "Latency", buckets=(0.1, 1.0))
+
+    requests.inc(outcome="success")
+    requests.inc(outcome="success")
+    depth.set_function(lambda: 3)
+    latency.observe(0.05)
+    latency.observe(0.5)
+    latency.observe(5.0)
+
+    text = registry.render()
+    assert 'requests_total{outcome="success"} 2.0' in text
+    assert "queue_depth 3.0" in text
+    assert 'latency_seconds_bucket{le="0.1"} 1' in text
+    assert 'latency_seconds_bucket{le="1.0"} 2' in text
+    assert 'latency_seconds_bucket{le="+Inf"} 3' in text
+    assert "latency_seconds_count 3" in text
+    assert latency.count() == 3
+
+
+@pytest.mark.asyncio
+async def test_http_endpoint() -> None:
+    registry = MetricsRegistry()
+    registry.counter("requests_total", "Requests").inc()
+
+    server = await start_metrics_server("127.0.0.1", 0, registry)
+    port = server.sockets[0].getsockname()[1]
+    try:
+        reader, writer = await asyncio.open_connection("127.0.0.1", port)
+        writer.write(b"GET /metrics HTTP/1.1\r\nHost: localhost\r\n\r\n")
+        await writer.drain()
+        response = (await reader.read()).decode("utf-8")
+        writer.close()
+    finally:
+        server.close()
+
+    assert response.startswith("HTTP/1.1 200 OK")
+    assert "requests_total 1.0" in response
@@ -0,0 +1,45 @@
+"""Tests for the extracted model cache."""
+import tarfile
+from pathlib import Path
+
+from wyoming_faster_whisper.model_cache import (
+    is_cached,
+    model_cache_dir,
+    save_model_cache,
+)
+
+
+class FakeModel:
+    """Model whose save_to writes a .nemo-like tar archive."""
+
+    def __init__(self, weights: bytes) -> None:
+        self.weights = weights
+
+    def save_to(self, path: str) -> None:
+        source_dir = Path(path).parent / "source"
+        source_dir.mkdir()
+        (source_dir / "model_config.yaml").write_text("name: fake\n")
+        (source_dir / "model_weights.ckpt").write_bytes(self.weights)
+        with tarfile.open(path, "w:") as archive:
+            for file_path in source_dir.iterdir():
+                archive.add(file_path, arcname=f"./{file_path.name}")
+
+
+def test_cache_dir_is_inside_data_dir(tmp_path: Path) -> None:
+    cache_dir = model_cache_dir(tmp_path, "nvidia/parakeet-tdt-0.6b-v2")
+    assert cache_dir.parent.parent == tmp_path
+    assert cache_dir.name == "nvidia--parakeet-tdt-0.6b-v2"
+
+
+def test_save_extracts_archive(tmp_path: Path) -> None:
+    cache_dir = model_cache_dir(tmp_path, "fake")
+    assert not is_cached(cache_dir)
+
+    save_model_cache(FakeModel(b"old"), cache_dir)
+    assert is_cached(cache_dir)
+    assert (cache_dir / "model_config.yaml").is_file()
+
+    # Replaced, and no temporary files are left behind
+    save_model_cache(FakeModel(b"new"), cache_dir)
+    assert (cache_dir / "model_weights.ckpt").read_bytes() == b"new"
+    assert [p.name for p in cache_dir.parent.iterdir()] == ["fake"]
@@ -0,0 +1,196 @@
+"""Tests for the ONNX Runtime backend, with fake sessions."""
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from wyoming_faster_whisper.onnx_backend import LogMelFeatures, OnnxAsrModel
+
+VOCABULARY = ["▁he", "llo", "▁world"]
+BLANK = len(VOCABULARY)
+
+
+class FakeInput:
+    def __init__(self, name: str, type_name: str) -> None:
+        self.name = name
+        self.type = type_name
+
+
+class FakeEncoder:
+    """Returns a fixed encoder output regardless of the features."""
+
+    def __init__(self, encoded: np.ndarray, lengths: List[int]) -> None:
+        self.encoded = encoded
+        self.lengths = np.array(lengths, dtype=np.int64)
+        self.batch_sizes: List[int] = []
+
+    def get_inputs(self) -> List[FakeInput]:
+        return [
+            FakeInput("audio_signal", "tensor(float)"),
+            FakeInput("length", "tensor(int64)"),
+        ]
+
+    def run(self, output_names: Optional[List[str]], feed: Dict[str, Any]):
+        batch_size = feed["audio_signal"].shape[0]
+        self.batch_sizes.append(batch_size)
+        return [self.encoded[:batch_size], self.lengths[:batch_size]]
+
+
+class ScriptedDecoderJoint:
+    """Emits the token stored in channel 0 of the encoder frame.
+
+    A token equal to the previous one is reported as blank, so each frame
+    emits at most once. Channel 1 holds the duration index.
+    """
+
+    def __init__(self, num_durations: int) -> None:
+        self.num_durations = num_durations
+
+    def get_inputs(self) -> List[FakeInput]:
+        return [
+            FakeInput("encoder_outputs", "tensor(float)"),
+            FakeInput("targets", "tensor(int32)"),
+            FakeInput("target_length", "tensor(int32)"),
+            FakeInput("input_states_1", "tensor(float)"),
+            FakeInput("input_states_2", "tensor(float)"),
+        ]
+
+    def run(self, output_names: Optional[List[str]], feed: Dict[str, Any]):
+        frames = feed["encoder_outputs"][:, :, 0].astype(np.int64)
+        previous = feed["targets"][:, 0]
+        batch_size = frames.shape[0]
+
+        token = np.where(frames[:, 0] == previous, BLANK, frames[:, 0])
+        logits = np.zeros((batch_size, 1, 1, BLANK + 1 + self.num_durations))
+        logits[np.arange(batch_size), 0, 0, token] = 1.0
+        if self.num_durations:
+            logits[np.arange(batch_size), 0, 0, BLANK + 1 + frames[:, 1]] = 1.0
+
+        states = [feed["input_states_1"] + 1, feed["input_states_2"] + 1]
+        return [logits, np.ones(batch_size)] + states
+
+
+class RunawayDecoderJoint(ScriptedDecoderJoint):
+    """Always emits a new token without advancing."""
+
+    def run(self, output_names: Optional[List[str]], feed: Dict[str, Any]):
+        previous = feed["targets"][:, 0]
+        batch_size = previous.shape[0]
+        token = (previous + 1) % BLANK
+        logits = np.zeros((batch_size, 1, 1, BLANK + 1 + self.num_durations))
+        logits[np.arange(batch_size), 0, 0, token] = 1.0
+        logits[:, 0, 0, BLANK + 1] = 1.0  # duration 0
+        return [
+            logits,
+            np.ones(batch_size),
+            feed["input_states_1"],
+            feed["input_states_2"],
+        ]
+
+
+def _config(durations: List[int], max_symbols: int = 10) -> Dict[str, Any]:
+    return {
+        "vocabulary": VOCABULARY,
+        "durations": durations,
+        "max_symbols_per_step": max_symbols,
+        "pred_rnn_layers": 1,
+        "pred_hidden": 2,
+        "preprocessor": {"features": 16},
+    }
+
+
+def _encoded(frames: List[List[Tuple[int, int]]]) -> np.ndarray:
+    """(token, duration index) per frame -> (batch, 2, frames)."""
+    return np.array(frames, dtype=np.float32).transpose(0, 2, 1)
+
+
+def test_tdt_greedy_decoding() -> None:
+    durations = [0, 1, 2]
+    encoded = _encoded(
+        [
+            # emit twice at t=0, skip t=2 with duration 2, then blank
+            [(0, 0), (1, 2), (2, 1), (BLANK, 1)],
+            [(2, 1), (BLANK, 1), (0, 1), (0, 1)],
+        ]
+    )
+    model = OnnxAsrModel(
+        FakeEncoder(encoded, [4, 2]),
+        ScriptedDecoderJoint(len(durations)),
+        _config(durations),
+    )
+
+    texts = model.transcribe(
+        [np.ones(1600, dtype=np.float32), np.ones(800, dtype=np.float32)],
+        batch_size=2,
+    )
+    assert texts == ["hello", "world"]
+
+
+def test_max_symbols_per_frame() -> None:
+    encoded = _encoded([[(0, 0), (0, 0)]])
+    model = OnnxAsrModel(
+        FakeEncoder(encoded, [2]),
+        RunawayDecoderJoint(num_durations=2),
+        _config([0, 1], max_symbols=2),
+    )
+
+    # Two symbols per frame, starting after blank: llo, world, he, llo
+    texts = model.transcribe([np.ones(320, dtype=np.float32)])
+    assert texts == ["llo world hello"]
+
+
+def test_empty_audio_is_not_decoded() -> None:
+    encoder = FakeEncoder(_encoded([[(2, 0)]]), [1])
+    model = OnnxAsrModel(encoder, ScriptedDecoderJoint(0), _config([]))
+
+    texts = model.transcribe(
+        [np.zeros(0, dtype=np.float32), np.ones(160, dtype=np.float32)],
+        batch_size=2,
+    )
+    assert texts == ["", "world"]
+    assert encoder.batch_sizes == [1]
+
+
+def test_word_timings() -> None:
+    durations = [0, 1, 2]
+    frames = [(0, 1), (1, 1)] + [(BLANK, 1)] * 3 + [(2, 1)] + [(BLANK, 1)] * 4
+    model = OnnxAsrModel(
+        FakeEncoder(_encoded([frames]), [10]),
+        ScriptedDecoderJoint(len(durations)),
+        _config(durations),
+    )
+
+    # 81 feature frames subsampled to 10 encoder frames of 80 ms each
+    results = model.transcribe_words([np.ones(12800, dtype=np.float32)])
+    assert len(results) == 1
+    result = results[0]
+    assert result.text == "hello world"
+    assert [word.word for word in result.words] == ["hello", "world"]
+    np.testing.assert_allclose(
+        [(word.start, word.end) for word in result.words],
+        [(0.0, 0.16), (0.4, 0.48)],
+    )
+
+    # Each token wins with logit 1 against three logits of 0
+    assert result.confidence is not None
+    np.testing.assert_allclose(result.confidence, np.e / (np.e + 3), rtol=1e-6)
+
+    # Same confidence without word timings
+    results = model.transcribe_confidence([np.ones(12800, dtype=np.float32)])
+    assert len(results) == 1
+    result = results[0]
+    assert (result.text, result.words) == ("hello world", ())
+    assert result.confidence is not None
+    np.testing.assert_allclose(result.confidence, np.e / (np.e + 3), rtol=1e-6)
+
+
+def test_log_mel_features() -> None:
+    features = LogMelFeatures(features=80)
+    audio = np.random.default_rng(0).standard_normal(16000).astype(np.float32)
+
+    batch, lengths = features.batch([audio, audio[:8000]])
+    assert batch.shape == (2, 80, 101)
+    assert lengths.tolist() == [101, 51]
+
+    # Normalized per feature, padding left as zeros
+    assert np.allclose(batch[0].mean(axis=1), 0.0, atol=1e-4)
+    assert np.all(batch[1, :, 51:] == 0.0)
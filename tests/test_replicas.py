@@ -0,0 +1,99 @@
+"""Tests for dispatching utterances across model replicas."""
+import asyncio
+import threading
+from typing import List
+
+import numpy as np
+import pytest
+
+from wyoming_faster_whisper.batching import TranscriptionBatcher
+from wyoming_faster_whisper.replicas import ReplicaPool, split_cpus, torch_thread_budget
+
+
+class NamedModel:
+    """Model that reports which replica transcribed each utterance."""
+
+    def __init__(self, name: str) -> None:
+        self.name = name
+
+    def transcribe(self, audios, batch_size: int = 1) -> List[str]:
+        return [self.name for _ in audios]
+
+
+class BlockingModel(NamedModel):
+    """Model that holds every batch until released."""
+
+    def __init__(self, name: str, release: threading.Event) -> None:
+        super().__init__(name)
+        self.release = release
+
+    def transcribe(self, audios, batch_size: int = 1) -> List[str]:
+        self.release.wait(timeout=5)
+        return super().transcribe(audios, batch_size)
+
+
+@pytest.mark.asyncio
+async def test_least_loaded_replica_is_selected() -> None:
+    release = threading.Event()
+    batchers = [
+        TranscriptionBatcher(BlockingModel(str(i), release), max_batch_size=1)
+        for i in range(3)
+    ]
+    pool = ReplicaPool(batchers)
+    pool.start()
+
+    audio = np.zeros(10, dtype=np.float32)
+    tasks = [
+        asyncio.create_task(batcher.transcribe(audio))
+        for batcher, load in zip(batchers, (2, 1, 3))
+        for _ in range(load)
+    ]
+    try:
+        await asyncio.sleep(0.05)
+        assert [batcher.pending for batcher in batchers] == [2, 1, 3]
+        assert pool.select() is batchers[1]
+    finally:
+        release.set()
+        await asyncio.gather(*tasks)
+        await pool.stop()
+
+
+def test_ties_are_round_robin() -> None:
+    batchers = [TranscriptionBatcher(NamedModel(str(i))) for i in range(3)]
+    pool = ReplicaPool(batchers)
+
+    assert [pool.select() for _ in range(4)] == [
+        batchers[0],
+        batchers[1],
+        batchers[2],
+        batchers[0],
+    ]
+
+
+@pytest.mark.asyncio
+async def test_concurrent_utterances_are_spread() -> None:
+    pool = ReplicaPool(
+        [TranscriptionBatcher(NamedModel(str(i)), max_batch_size=1) for i in range(2)]
+    )
+    pool.start()
+    try:
+        texts = await asyncio.gather(
+            *(pool.transcribe(np.zeros(10, dtype=np.float32)) for _ in range(4))
+        )
+    finally:
+        await pool.stop()
+
+    assert sorted(texts) == ["0", "0", "1", "1"]
+    assert pool.pending == 0
+
+
+def test_split_cpus() -> None:
+    assert split_cpus(2, range(4)) == [{0, 1}, {2, 3}]
+    assert split_cpus(3, range(4)) == [{0, 1}, {2}, {3}]
+    assert split_cpus(3, [0, 1]) == [{0}, {1}, {0}]
+
+
+def test_torch_thread_budget() -> None:
+    assert torch_thread_budget([None, None]) == 0
+    assert torch_thread_budget([{0, 1}, {2, 3}]) == 4
+    assert torch_thread_budget(split_cpus(3, [0, 1])) == 2
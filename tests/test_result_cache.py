@@ -0,0 +1,83 @@
+"""Tests for the transcript and speaker embedding caches."""
+import sqlite3
+import time
+
+import numpy as np
+
+from wyoming_faster_whisper.result_cache import LruCache, TranscriptCache, audio_key
+
+
+def test_audio_key() -> None:
+    audio = np.random.default_rng(0).standard_normal(16000).astype(np.float32)
+
+    assert audio_key(audio) == audio_key(audio.copy())
+    assert audio_key(audio) != audio_key(audio[:-1])
+    assert audio_key(audio[::2]) == audio_key(audio[::2].copy())
+
+    changed: np.ndarray = audio.copy()
+    changed[100] += 1e-3
+    assert audio_key(audio) != audio_key(changed)
+
+
+def test_lru_eviction() -> None:
+    cache: LruCache[str] = LruCache(max_entries=2, ttl=0)
+    cache.put("a", "1")
+    cache.put("b", "2")
+    assert cache.get("a") == "1"  # "b" is now least recently used
+
+    cache.put("c", "3")
+    assert len(cache) == 2
+    assert cache.get("b") is None
+    assert cache.get("a") == "1"
+    assert cache.get("c") == "3"
+
+
+def test_lru_expiry() -> None:
+    cache: LruCache[str] = LruCache(max_entries=10, ttl=0.05)
+    cache.put("a", "1")
+    assert cache.get("a") == "1"
+
+    time.sleep(0.1)
+    assert cache.get("a") is None
+    assert len(cache) == 0
+
+
+def test_disk_tier(tmp_path) -> None:
+    path = tmp_path / "transcripts.sqlite"
+    cache = TranscriptCache(max_entries=10, path=path, namespace="model-a")
+    cache.put("key", "hello world")
+    cache.close()
+
+    # A new process starts with an empty memory tier
+    cache = TranscriptCache(max_entries=10, path=path, namespace="model-a")
+    assert cache.get_memory("key") is None
+    assert cache.get_disk("key") == "hello world"
+    assert cache.get_memory("key") == "hello world"
+    cache.close()
+
+    # Another model never sees these transcripts
+    other = TranscriptCache(max_entries=10, path=path, namespace="model-b")
+    assert other.get_disk("key") is None
+    other.close()
+
+
+def test_disk_tier_expiry(tmp_path) -> None:
+    path = tmp_path / "transcripts.sqlite"
+    cache = TranscriptCache(max_entries=10, ttl=60, path=path)
+    cache.put("key", "hello world")
+
+    with sqlite3.connect(str(path)) as db:
+        db.execute("UPDATE transcripts SET created = created - 120")
+
+    cache.memory.clear()
+    assert cache.get_disk("key") is None
+    cache.close()
+
+
+def test_memory_only() -> None:
+    cache = TranscriptCache(max_entries=10)
+    assert not cache.has_disk
+    assert cache.get_disk("key") is None
+
+    cache.put("key", "hello world")
+    assert cache.get_memory("key") == "hello world"
@@ -0,0 +1,69 @@
+"""Tests for vectorized speaker matching."""
+import numpy as np
+
+from wyoming_faster_whisper.speaker_index import SpeakerIndex
+
+
+def _unit(*values: float) -> np.ndarray:
+    vector = np.array(values, dtype=np.float32)
+    return vector / np.linalg.norm(vector)
+
+
+def test_search_top_k() -> None:
+    index = SpeakerIndex.from_embeddings(
+        {
+            "alice": _unit(1, 0, 0),
+            "bob": _unit(0, 1, 0),
+            "charlie": _unit(1, 1, 0),
+        }
+    )
+
+    matches = index.search(_unit(1, 0.1, 0), k=2)
+    assert [name for name, _ in matches] == ["alice", "charlie"]
+    assert matches[0][1] > matches[1][1]
+    assert len(index.search(_unit(1, 0, 0), k=10)) == 3
+
+
+def test_multiple_enrollments_per_speaker() -> None:
+    embeddings = {
+        "alice": np.stack([_unit(1, 0, 0), _unit(0, 0, 1)]),
+        "bob": _unit(0.6, 0.8, 0),
+    }
+
+    # Max pooling: the best enrollment clip wins
+    max_index = SpeakerIndex.from_embeddings(embeddings, pooling="max")
+    assert max_index.matrix.shape == (3, 3)
+    name, score = max_index.search(_unit(0, 0, 1))[0]
+    assert name == "alice"
+    assert abs(score - 1.0) < 1e-6
+
+    # Centroid pooling: one row per speaker
+    centroid_index = SpeakerIndex.from_embeddings(embeddings, pooling="centroid")
+    assert centroid_index.matrix.shape == (2, 3)
+    np.testing.assert_allclose(
+        np.linalg.norm(centroid_index.matrix, axis=1), [1.0, 1.0], rtol=1e-6
+    )
+
+
+def test_batch_scores() -> None:
+    embeddings = {
+        "alice": np.stack([_unit(1, 0, 0), _unit(0, 0, 1)]),
+        "bob": _unit(0, 1, 0),
+    }
+    queries = np.stack([_unit(0, 0, 1), _unit(0, 1, 0), _unit(1, 1, 0)])
+
+    for pooling in ("centroid", "max"):
+        index = SpeakerIndex.from_embeddings(embeddings, pooling=pooling)
+        scores = index.batch_scores(queries)
+        assert scores.shape == (3, 2)
+        for query, row in zip(queries, scores):
+            expected = dict(index.search(query, k=2))
+            np.testing.assert_allclose(
+                row, [expected[name] for name in index.speakers], rtol=1e-5
+            )
+
+
+def test_empty_index() -> None:
+    index = SpeakerIndex.from_embeddings({})
+    assert len(index) == 0
+    assert index.search(_unit(1, 0, 0)) == []
@@ -0,0 +1,141 @@
+"""Tests for incremental speaker embedding, with a fake voice encoder."""
+import asyncio
+from typing import List
+
+import numpy as np
+import pytest
+
+from wyoming_faster_whisper.features import UtteranceFeatures
+from wyoming_faster_whisper.speaker_identifier import SpeakerIdentifier
+from wyoming_faster_whisper.speaker_index import SpeakerIndex
+from wyoming_faster_whisper.speaker_stream import PARTIAL_SAMPLES, SpeakerStream
+
+ALICE = np.array([1.0, 0.0, 0.0], dtype=np.float32)
+BOB = np.array([0.0, 1.0, 0.0], dtype=np.float32)
+RATE = 16000
+
+
+class FakeIdentifier(SpeakerIdentifier):
+    """Embeds a window as alice if it is mostly low pitched, else bob.
+
+    The third dimension is the window's level, so windows embedded from
+    different trimming or gain give different embeddings.
+    """
+
+    def __init__(self) -> None:
+        super().__init__(
+            None, SpeakerIndex.from_embeddings({"alice": ALICE, "bob": BOB})
+        )
+        self.batches: List[int] = []
+
+    def embed_mels(self, mels: np.ndarray) -> np.ndarray:
+        self.batches.append(len(mels))
+        embeddings = []
+        for mel in mels:
+            low, high = mel[:, :20].sum(), mel[:, 20:].sum()
+            voice = ALICE if low > high else BOB
+            embeddings.append(voice + [0.0, 0.0, 1e-3 * np.log10(mel.mean() + 1)])
+
+        return np.stack(embeddings)
+
+
+def _voice(seconds: float, alice: bool = True, amplitude: float = 0.1) -> np.ndarray:
+    t = np.arange(int(seconds * RATE)) / RATE
+    frequency = 300 if alice else 3000
+    return (amplitude * np.sin(2 * np.pi * frequency * t)).astype(np.float32)
+
+
+async def _feed(stream: SpeakerStream, audio: np.ndarray) -> None:
+    # 250 ms chunks, arriving faster than real time
+    for start in range(0, len(audio), 4000):
+        stream.feed(audio[start : start + 4000])
+        await asyncio.sleep(0.01)
+
+
+@pytest.mark.asyncio
+async def test_windows_are_embedded_while_streaming() -> None:
+    identifier = FakeIdentifier()
+    stream = SpeakerStream(identifier)
+    audio = _voice(4.0)
+    await _feed(stream, audio)
+    await asyncio.sleep(0.01)
+
+    assert stream.num_partials >= 3
+    embedding = await stream.finish(UtteranceFeatures(audio))
+    assert embedding is not None
+    assert identifier.identify_embedding(embedding) == "alice"
+
+    # Same partial windows as resemblyzer's embed_utterance for 4 seconds,
+    # and none embedded twice
+    assert stream.num_partials == 4
+    assert sum(identifier.batches) == 4
+
+
+@pytest.mark.asyncio
+async def test_running_average() -> None:
+    identifier = FakeIdentifier()
+    stream = SpeakerStream(identifier)
+    audio = np.concatenate([_voice(1.6), _voice(3.2, alice=False)])
+    stream.feed(audio)
+    embedding = await stream.finish(UtteranceFeatures(audio))
+
+    # Two windows are mostly alice, three mostly bob
+    assert embedding is not None
+    assert stream.num_partials == 5
+    np.testing.assert_allclose(np.linalg.norm(embedding), 1.0, rtol=1e-5)
+    np.testing.assert_allclose(embedding[0] / embedding[1], 2 / 3, rtol=1e-5)
+
+
+@pytest.mark.asyncio
+async def test_silence_is_trimmed() -> None:
+    identifier = FakeIdentifier()
+    stream = SpeakerStream(identifier)
+    audio = np.concatenate([np.zeros(PARTIAL_SAMPLES, np.float32), _voice(1.6)])
+    stream.feed(audio)
+    await stream.finish(UtteranceFeatures(audio))
+
+    # Only the speech is left: one window
+    assert stream.num_partials == 1
+
+
+@pytest.mark.asyncio
+async def test_final_embedding_matches_whole_utterance() -> None:
+    # Quiet speech first, so the gain and trimming change at the end
+    audio = np.concatenate(
+        [_voice(3.0, amplitude=0.005), _voice(2.0, alice=False, amplitude=0.3)]
+    )
+    stream = SpeakerStream(FakeIdentifier())
+    await _feed(stream, audio)
+    embedding = await stream.finish(UtteranceFeatures(audio))
+
+    assert embedding is not None
+    np.testing.assert_allclose(
+        embedding, FakeIdentifier().embed(audio), rtol=1e-5, atol=1e-7
+    )
+
+
+@pytest.mark.asyncio
+async def test_early_decision() -> None:
+    identifier = FakeIdentifier()
+    stream = SpeakerStream(identifier, margin=0.5, min_partials=2)
+    audio = _voice(10.0)
+    await _feed(stream, audio)
+    embedding = await stream.finish(UtteranceFeatures(audio))
+
+    assert stream.decided
+    assert stream.num_partials < 5
+    assert embedding is not None
+    assert identifier.identify_embedding(embedding) == "alice"
+
+
+@pytest.mark.asyncio
+async def test_short_audio_is_embedded_at_the_end() -> None:
+    identifier = FakeIdentifier()
+    stream = SpeakerStream(identifier)
+    audio = _voice(1.0)
+    stream.feed(audio)
+    await asyncio.sleep(0.01)
+    assert not identifier.batches
+
+    assert await stream.finish(UtteranceFeatures(audio)) is not None
+    assert identifier.batches == [1]
@@ -0,0 +1,57 @@
+"""Tests for incremental transcription while audio streams in."""
+from typing import List
+
+import numpy as np
+import pytest
+
+from wyoming_faster_whisper.batching import Transcription
+from wyoming_faster_whisper.streaming import StreamingTranscriber, find_cut
+
+
+class FakeBatcher:
+    """Batcher that reports the length of each segment."""
+
+    supports_word_timings = False
+    supports_confidence = False
+
+    def __init__(self) -> None:
+        self.lengths: List[int] = []
+
+    async def transcribe(self, audio: np.ndarray) -> str:
+        self.lengths.append(len(audio))
+        return f"segment{len(self.lengths)}"
+
+    async def transcribe_confidence(self, audio: np.ndarray) -> Transcription:
+        return Transcription(await self.transcribe(audio))
+
+    async def transcribe_words(self, audio: np.ndarray) -> Transcription:
+        return Transcription(await self.transcribe(audio))
+
+
+def test_find_cut_prefers_silence() -> None:
+    audio = np.ones(16000, dtype=np.float32)
+    audio[12000:12320] = 0.0
+
+    cut = find_cut(audio, 8000)
+    assert 12000 <= cut < 12320
+
+
+@pytest.mark.asyncio
+async def test_segments_committed_while_streaming() -> None:
+    batcher = FakeBatcher()
+    partials: List[str] = []
+
+    async def on_text(text: str) -> None:
+        partials.append(text)
+
+    streaming = StreamingTranscriber(batcher, chunk_ms=1000, on_text=on_text)
+    for _ in range(10):
+        # 250 ms at a time
+        streaming.feed(np.ones(4000, dtype=np.float32))
+
+    text = await streaming.finish()
+
+    assert len(batcher.lengths) > 1
+    assert sum(batcher.lengths) == 40000
+    assert text == " ".join(partials)
+    assert len(streaming.audio) == 40000
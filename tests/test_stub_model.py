@@ -0,0 +1,24 @@
+"""Tests for the stand-in ASR model."""
+import numpy as np
+
+from wyoming_faster_whisper.batching import Transcription
+from wyoming_faster_whisper.stub_model import StubASRModel
+
+
+def test_one_text_per_utterance() -> None:
+    model = StubASRModel(text="hello")
+    audios = [
+        np.zeros(0, dtype=np.float32),
+        np.zeros(100, dtype=np.float32),
+        np.random.default_rng(0).standard_normal(16000).astype(np.float32),
+    ]
+
+    assert model.transcribe(audios, batch_size=len(audios)) == ["hello"] * 3
+
+
+def test_text_only_word_fallback() -> None:
+    model = StubASRModel(text="hello")
+    assert not model.supports_word_timings
+    assert model.transcribe_words([np.zeros(100, dtype=np.float32)]) == [
+        Transcription("hello")
+    ]
@@ -0,0 +1,124 @@
+"""Tests for worker processes sharing a listening socket."""
+import asyncio
+import os
+import threading
+import time
+from pathlib import Path
+
+import pytest
+from wyoming.client import AsyncClient
+from wyoming.event import Event
+from wyoming.info import Describe
+from wyoming.server import AsyncEventHandler
+
+from wyoming_faster_whisper.supervisor import (
+    SocketServer,
+    Supervisor,
+    bind_socket,
+    close_socket,
+)
+
+
+class EchoHandler(AsyncEventHandler):
+    async def handle_event(self, event: Event) -> bool:
+        await self.write_event(Event(type="echo", data={"pid": os.getpid()}))
+        return True
+
+
+@pytest.mark.asyncio
+async def test_socket_server(tmp_path: Path) -> None:
+    uri = f"unix://{tmp_path}/test.socket"
+    sock = bind_socket(uri)
+    server = SocketServer(sock)
+    await server.start(EchoHandler)
+    try:
+        async with AsyncClient.from_uri(uri) as client:
+            await client.write_event(Describe().event())
+            event = await asyncio.wait_for(client.read_event(), timeout=5)
+    finally:
+        await server.stop()
+        close_socket(uri, sock)
+
+    assert event is not None
+    assert event.type == "echo"
+    assert not (tmp_path / "test.socket").exists()
+
+
+def test_supervisor_restarts_crashed_workers(tmp_path: Path) -> None:
+    ready_file = tmp_path / "ready"
+    started_file = tmp_path / "started"
+
+    def worker_main(index: int, on_ready) -> int:
+        with open(started_file, "a", encoding="utf-8") as started:
+            started.write(f"{index}\n")
+
+        on_ready()
+        if index == 0:
+            return 1  # crash once per start
+
+        time.sleep(60)
+        return 0
+
+    supervisor = Supervisor(2, worker_main, ready_file=str(ready_file))
+    was_ready = []
+
+    def stop_when_restarted() -> None:
+        deadline = time.monotonic() + 10
+        while time.monotonic() < deadline:
+            starts = started_file.read_text().split() if started_file.exists() else []
+            if starts.count("0") >= 2:
+                break
+
+            time.sleep(0.1)
+
+        was_ready.append(ready_file.exists())
+        supervisor.stop()
+
+    stopper = threading.Thread(target=stop_when_restarted)
+    stopper.start()
+    assert supervisor.run() == 0
+    stopper.join()
+
+    assert started_file.read_text().split().count("0") >= 2
+    assert was_ready == [True]
+    assert not ready_file.exists()
+
+
+def test_supervisor_waits_for_every_worker(tmp_path: Path) -> None:
+    ready_file = tmp_path / "ready"
+    started_file = tmp_path / "started"
+
+    def worker_main(index: int, on_ready) -> int:
+        with open(started_file, "a", encoding="utf-8") as started:
+            started.write(f"{index}\n")
+
+        if index == 0:
+            on_ready()
+            return 1  # ready again after each restart
+
+        time.sleep(60)  # never ready
+        return 0
+
+    supervisor = Supervisor(2, worker_main, ready_file=str(ready_file))
+    was_ready = []
+
+    def stop_when_restarted() -> None:
+        deadline = time.monotonic() + 10
+        while time.monotonic() < deadline:
+            starts = started_file.read_text().split() if started_file.exists() else []
+            if starts.count("0") >= 2:
+                break
+
+            time.sleep(0.1)
+
+        time.sleep(1)  # a few supervisor polls
+        was_ready.append(ready_file.exists())
+        supervisor.stop()
+
+    stopper = threading.Thread(target=stop_when_restarted)
+    stopper.start()
+    assert supervisor.run() == 0
+    stopper.join()
+
+    assert started_file.read_text().split().count("0") >= 2
+    assert was_ready == [False]
@@ -0,0 +1,63 @@
+"""Tests for voice activity detection on incoming audio."""
+import numpy as np
+
+from wyoming_faster_whisper.vad import SpeechTrimmer
+
+_RATE = 16000
+_FRAME_SAMPLES = 480  # 30 ms
+
+
+def _pcm(seconds: float, amplitude: float) -> bytes:
+    rng = np.random.default_rng(0)
+    samples = rng.uniform(-amplitude, amplitude, int(seconds * _RATE))
+    return (samples * 32767).astype("<i2").tobytes()
+
+
+def test_silence_is_trimmed() -> None:
+    trimmer = SpeechTrimmer(_RATE, 2, 1, threshold_db=-45, padding_ms=90)
+    audio = _pcm(1.0, 0.0001) + _pcm(0.6, 0.5) + _pcm(1.0, 0.0001)
+
+    # Feed in uneven chunks, like a satellite would
+    kept = b""
+    for start in range(0, len(audio), 1000):
+        kept += trimmer.process(audio[start : start + 1000])
+    kept += trimmer.finish()
+
+    assert trimmer.speech_detected
+    num_frames = len(kept) // (2 * _FRAME_SAMPLES)
+    speech_frames = int(0.6 * _RATE) // _FRAME_SAMPLES
+
+    # Speech plus at most 3 frames of padding on each side
+    assert speech_frames <= num_frames <= speech_frames + 8
+    assert len(kept) < len(audio) / 2
+
+
+def test_long_pause_is_shortened() -> None:
+    trimmer = SpeechTrimmer(_RATE, 2, 1, threshold_db=-45, padding_ms=90)
+    kept = trimmer.process(_pcm(0.3, 0.5) + _pcm(2.0, 0.0001) + _pcm(0.3, 0.5))
+    kept += trimmer.finish()
+
+    assert len(kept) < len(_pcm(0.3, 0.5)) * 2 + (2 * 6 * _FRAME_SAMPLES) + 4
+
+
+def test_no_speech() -> None:
+    trimmer = SpeechTrimmer(_RATE, 2, 1)
+    assert trimmer.process(_pcm(1.0, 0.0001)) == b""
+    assert trimmer.finish() == b""
+    assert not trimmer.speech_detected
+
+
+def test_trailing_silence_is_bounded() -> None:
+    trimmer = SpeechTrimmer(_RATE, 2, 1, threshold_db=-45, padding_ms=90)
+    trimmer.process(_pcm(0.3, 0.5))
+
+    silence = _pcm(1.0, 0.0001)
+    for _ in range(30):
+        assert trimmer.process(silence) == b""
+
+    # However long the pause, only padding on each side of it is kept:
+    # 3 frames after the first speech and 3 before the next
+    kept = trimmer.process(_pcm(0.3, 0.5))
+    assert len(kept) == (6 * 2 * _FRAME_SAMPLES) + (
+        (int(0.3 * _RATE) // _FRAME_SAMPLES) * 2 * _FRAME_SAMPLES
+    )
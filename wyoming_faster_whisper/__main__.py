@@ -3,23 +3,63 @@
 import argparse
 import asyncio
 import logging
+import os
+import signal
+import socket
 import sys
+import time
+from concurrent.futures import Executor, ThreadPoolExecutor
 from functools import partial
+from pathlib import Path
+from typing import Callable, List, Optional, Set, Tuple
 
-import nemo.collections.asr as nemo_asr
+import numpy as np
 from wyoming.client import AsyncClient
 from wyoming.info import AsrModel, AsrProgram, Attribution, Info
 from wyoming.server import AsyncServer
 
 from . import __version__
+from .admission import AdmissionController
+from .asr_backend import BACKEND_NEMO, BACKEND_ONNX, BACKENDS, AsrBackend, NemoBackend
+from .audio import TARGET_RATE
+from .batching import TranscriptionBatcher
+from .buffer_pool import KINDS, BufferPool
+from .cascade import CascadeRouter
+from .embedding_store import StoreWatcher
 from .handler import ParakeetEventHandler
+from .metrics import (
+    ADMISSION_REQUESTS,
+    BUFFER_POOL_BUFFERS,
+    BUFFER_POOL_BYTES,
+    QUEUE_DEPTH,
+    REPLICA_PENDING,
+    start_metrics_server,
+)
+from .model_cache import (
+    is_cached,
+    model_cache_dir,
+    restore_cached_model,
+    save_model_cache,
+)
+from .onnx_backend import OnnxAsrModel, export_onnx_model, is_exported, onnx_export_dir
+from .replicas import (
+    ReplicaPool,
+    TranscriberService,
+    init_replica_thread,
+    split_cpus,
+    torch_thread_budget,
+)
+from .result_cache import TRANSCRIPT_CACHE_FILE, LruCache, TranscriptCache
+from .speaker_identifier import SpeakerIdentifier
+from .stub_model import STUB_MODEL_NAME, StubASRModel
+from .supervisor import SocketServer, Supervisor, bind_socket, close_socket
 
 _LOGGER = logging.getLogger(__name__)
 
-async def main() -> None:
-    """Main entry point."""
+
+def _parse_args() -> argparse.Namespace:
     parser = argparse.ArgumentParser()
-    parser.add_argument("--model", required=False, default="nvidia/parakeet-tdt-0.6b-v2", help="Name of NeMo ASR model (default: nvidia/parakeet-tdt-0.6b-v2)")
+    parser.add_argument("--model", required=False, default="nvidia/parakeet-tdt-0.6b-v2", help="Name of NeMo ASR model, or 'stub' for a stand-in model used in benchmarks (default: nvidia/parakeet-tdt-0.6b-v2)")
     parser.add_argument("--uri", required=True, help="unix:// or tcp://")
     parser.add_argument("--data-dir", required=True, action="append", help="Data directory")
     parser.add_argument("--download-dir", help="Directory to download models")
@@ -28,49 +68,122 @@ async def main() -> None:
     parser.add_argument("--beam-size", type=int, default=1, help="Beam size (not used in NeMo greedy decoding)")
     parser.add_argument("--initial-prompt", help="Initial prompt text (not supported in NeMo)")
     parser.add_argument("--debug", action="store_true", help="Enable debug logging")
+    parser.add_argument("--metrics-port", type=int, help="Serve Prometheus metrics over HTTP on this port at /metrics")
+    parser.add_argument("--metrics-host", default="0.0.0.0", help="Host for the metrics endpoint (default: 0.0.0.0)")
     parser.add_argument("--embeddings-file", help="Speaker embeddings file")
+    parser.add_argument("--max-batch-size", type=int, default=8, help="Maximum number of utterances transcribed together (default: 8)")
+    parser.add_argument("--max-batch-wait-ms", type=float, default=5.0, help="Maximum time to wait for more utterances before transcribing a batch (default: 5)")
+    parser.add_argument("--vad", action="store_true", help="Drop silence from incoming audio before transcription and speaker ID")
+    parser.add_argument("--vad-threshold-db", type=float, default=-45.0, help="Frames quieter than this (dBFS) count as silence (default: -45)")
+    parser.add_argument("--vad-padding-ms", type=int, default=300, help="Silence kept around speech (default: 300)")
+    parser.add_argument("--streaming", action="store_true", help="Transcribe while audio is streaming in and send transcript-chunk events with partial text")
+    parser.add_argument("--streaming-chunk-ms", type=int, default=2000, help="Length of audio segments transcribed in streaming mode (default: 2000)")
+    parser.add_argument("--speaker-workers", type=int, default=2, help="Size of the speaker embedding thread pool (default: 2)")
+    parser.add_argument("--embeddings-reload-interval", type=float, default=5.0, help="Seconds between checks of --embeddings-file for changes; 0 disables reloading (default: 5)")
+    parser.add_argument("--speaker-incremental", action="store_true", help="Embed the speaker's voice in 1.6s windows while audio arrives instead of after it ends")
+    parser.add_argument("--speaker-early-margin", type=float, default=0.0, help="With --speaker-incremental, stop embedding once the best match is ahead of the runner-up by this similarity margin; 0 always embeds all audio (default: 0)")
+    parser.add_argument("--speaker-device", default="auto", help="Device for the speaker voice encoder (auto/cuda/cpu/mps)")
+    parser.add_argument("--workers", type=int, default=1, help="Number of server processes sharing the listening socket; crashed workers are restarted (default: 1)")
+    parser.add_argument("--replicas", type=int, default=1, help="Number of model replicas that transcribe in parallel (default: 1)")
+    parser.add_argument("--replica-devices", help="Comma-separated devices assigned to replicas in turn, e.g. cuda:0,cuda:1 (default: --device)")
+    parser.add_argument("--pin-replicas", action="store_true", help="Split the available CPU cores between replicas and pin each replica's worker thread to its cores (torch uses one thread pool for all replicas)")
+    parser.add_argument("--backend", choices=BACKENDS, default=BACKEND_NEMO, help="ASR inference backend: nemo (PyTorch) or onnx (ONNX Runtime, exported on first start) (default: nemo)")
+    parser.add_argument("--onnx-quantize", action="store_true", help="Quantize ONNX model weights to int8 (dynamic quantization)")
+    parser.add_argument("--intra-op-threads", type=int, default=0, help="Threads used within each ONNX operator (default: onnxruntime default)")
+    parser.add_argument("--inter-op-threads", type=int, default=0, help="Threads used to run independent ONNX operators in parallel (default: onnxruntime default)")
+    parser.add_argument("--model-cache", action="store_true", help="Keep an extracted copy of the model in --data-dir and restore it from there on the next start")
+    parser.add_argument("--no-warmup", action="store_true", help="Don't run a warm-up transcription before accepting connections")
+    parser.add_argument("--long-audio-window", type=float, default=0.0, help="Transcribe utterances longer than this many seconds in overlapping windows of this length; 0 disables (default: 0)")
+    parser.add_argument("--long-audio-overlap", type=float, default=2.0, help="Seconds of overlap between --long-audio-window windows (default: 2)")
+    parser.add_argument("--max-in-flight", type=int, help="Maximum number of utterances handled at once per worker, from their first audio until the transcript is sent (default: no limit)")
+    parser.add_argument("--max-queued", type=int, help="Maximum number of requests waiting for --max-in-flight; more are rejected with an error (default: no limit)")
+    parser.add_argument("--queue-timeout", type=float, default=0.0, help="Seconds a request may wait for --max-in-flight before it is rejected with an error; 0 waits forever (default: 0)")
+    parser.add_argument("--max-audio-seconds", type=float, default=0.0, help="Audio beyond this many seconds per utterance is ignored; 0 disables the limit (default: 0)")
+    parser.add_argument("--max-audio-bytes", type=int, default=0, help="Audio beyond this many bytes per utterance is ignored; 0 disables the limit (default: 0)")
+    parser.add_argument("--buffer-pool-mb", type=float, default=64.0, help="Megabytes of idle audio buffers kept for reuse by later utterances; 0 keeps none (default: 64)")
+    parser.add_argument("--cache-size", type=int, default=0, help="Number of transcripts and speaker embeddings kept in memory, keyed on a hash of the audio; 0 disables caching (default: 0)")
+    parser.add_argument("--cache-ttl", type=float, default=3600.0, help="Seconds before a cached result expires; 0 never expires (default: 3600)")
+    parser.add_argument("--cache-disk", action="store_true", help="Also keep transcripts in a SQLite database in --data-dir that survives restarts and is shared by --workers")
+    parser.add_argument("--ready-file", help="Create this file once the model is loaded and warmed up, and remove it on shutdown")
+    parser.add_argument("--speaker-pooling", choices=("centroid", "max"), default="max", help="How to combine several enrollment embeddings per speaker: max uses the store as enrolled (memory-mapped, shared by --workers); centroid averages them in memory, a private copy per worker (default: max)")
+    parser.add_argument("--diarize", action="store_true", help="Split each transcript into segments by speaker (who spoke when); needs --embeddings-file and can't be combined with --streaming")
+    parser.add_argument("--small-model", help="Name of a smaller NeMo ASR model that serves short utterances; longer or low-confidence ones go to --model (default: --model only)")
+    parser.add_argument("--small-model-max-seconds", type=float, default=5.0, help="Utterances longer than this go straight to --model; 0 sends all to --small-model first (default: 5)")
+    parser.add_argument("--small-model-min-confidence", type=float, default=0.0, help="Transcribe again with --model if the --small-model token confidence (0-1) is below this; 0 never escalates on confidence (default: 0)")
+    parser.add_argument("--diarize-step", type=float, default=0.5, help="Seconds between the starts of the 1.6s windows compared to enrolled speakers in --diarize mode (default: 0.5)")
 
     args = parser.parse_args()
+    if args.diarize and args.streaming:
+        parser.error("--diarize can't be combined with --streaming")
 
     if not args.download_dir:
         args.download_dir = args.data_dir[0]
 
+    return args
+
+
+async def main(
+    args: Optional[argparse.Namespace] = None,
+    listen_socket: Optional[socket.socket] = None,
+    on_ready: Optional[Callable[[], None]] = None,
+) -> None:
+    """Main entry point.
+
+    With a listen_socket (worker processes), connections are accepted on
+    it instead of binding --uri, and on_ready is called instead of
+    writing --ready-file.
+    """
+    if args is None:
+        args = _parse_args()
+
     logging.basicConfig(
         level=logging.DEBUG if args.debug else logging.INFO,
         format="%(asctime)s %(levelname)s [%(name)s] %(message)s"
     )
 
-    # Auto-detect device if not specified
-    if args.device == "auto":
-        import torch
-        if torch.cuda.is_available():
-            args.device = "cuda"
-            _LOGGER.info("Auto-detected CUDA device")
-        else:
-            args.device = "cpu"
-            _LOGGER.info("Auto-detected CPU device (CUDA not available)")
-    else:
-        _LOGGER.info("Using specified device: %s", args.device)
+    # Load voice encoder and speaker embeddings once for all connections,
+    # in the background while the ASR model loads
+    speaker_future = None
+    if args.embeddings_file:
+        speaker_future = asyncio.get_running_loop().run_in_executor(
+            None, _load_speaker_identifier, args
+        )
 
-    # Load NeMo model
-    try:
-        _LOGGER.info("Loading NeMo ASR model: %s", args.model)
-        asr_model = nemo_asr.models.ASRModel.from_pretrained(model_name=args.model)
-        
-        # Move model to appropriate device
-        if args.device == "cuda":
-            import torch
-            if torch.cuda.is_available():
-                asr_model = asr_model.cuda()
-                _LOGGER.info("Model moved to CUDA")
-            else:
-                _LOGGER.warning("CUDA requested but not available, using CPU")
-                args.device = "cpu"
-        
-        _LOGGER.info("Loaded model: %s on device: %s", args.model, args.device)
-    except Exception as e:
-        _LOGGER.error("Failed to load model: %s", e)
-        sys.exit(1)
+    # Each replica gets its own device and, optionally, its own CPU cores
+    num_replicas = max(1, args.replicas)
+    devices = [
+        device.strip()
+        for device in (args.replica_devices or args.device).split(",")
+        if device.strip()
+    ]
+    replica_cpus: List[Optional[Set[int]]] = [None] * num_replicas
+    if args.pin_replicas:
+        replica_cpus = list(split_cpus(num_replicas))
+
+    asr_models = []
+    for replica_index in range(num_replicas):
+        asr_models.append(
+            _load_asr_model(
+                args, devices[replica_index % len(devices)], replica_cpus[replica_index]
+            )
+        )
+
+    _LOGGER.info("Using %s backend with %s replica(s)", asr_models[0].name, num_replicas)
+
+    # Cheap model for the bulk of short commands
+    small_model: Optional[AsrBackend] = None
+    if args.small_model:
+        small_model = _load_asr_model(
+            args,
+            devices[0],
+            model_name=args.small_model,
+            confidence=args.small_model_min_confidence > 0,
+        )
+        _LOGGER.info("Using small model %s for utterances up to %s second(s)", args.small_model, args.small_model_max_seconds)
+
+    speaker_identifier = None
+    if speaker_future is not None:
+        speaker_identifier = await speaker_future
 
     # Create Wyoming info
     wyoming_info = Info(
@@ -99,30 +212,390 @@ async def main() -> None:
 
     # Server setup
     try:
-        server = AsyncServer.from_uri(args.uri)
+        if listen_socket is not None:
+            server: AsyncServer = SocketServer(listen_socket)
+        else:
+            server = AsyncServer.from_uri(args.uri)
     except Exception as e:
         _LOGGER.error("Failed to create server: %s", e)
         sys.exit(1)
 
+    # Inference runs in dedicated thread pools so the event loop stays free.
+    # Each replica has its own pool (pinned to its cores, if requested).
+    use_torch = (args.backend == BACKEND_NEMO) and (args.model != STUB_MODEL_NAME)
+    asr_executors = [
+        ThreadPoolExecutor(
+            max_workers=1,
+            thread_name_prefix=f"asr{replica_index}",
+            initializer=init_replica_thread,
+            initargs=(cpus,),
+        )
+        for replica_index, cpus in enumerate(replica_cpus)
+    ]
+
+    # torch has one intra-op thread pool per process, shared by all replicas
+    torch_threads = torch_thread_budget(replica_cpus)
+    if use_torch and (torch_threads > 0):
+        import torch
+
+        torch.set_num_threads(torch_threads)
+
+    speaker_executor = ThreadPoolExecutor(
+        max_workers=max(1, args.speaker_workers), thread_name_prefix="speaker"
+    )
+
+    # Concurrent utterances share forward passes instead of taking turns,
+    # and go to whichever replica has the least work
+    batchers = [
+        TranscriptionBatcher(
+            asr_model,
+            max_batch_size=args.max_batch_size,
+            max_wait_ms=args.max_batch_wait_ms,
+            executor=asr_executor,
+        )
+        for asr_model, asr_executor in zip(asr_models, asr_executors)
+    ]
+    pool = ReplicaPool(batchers)
+    for replica_index, batcher in enumerate(batchers):
+        REPLICA_PENDING.set_function(
+            partial(_pending, batcher), replica=str(replica_index)
+        )
+
+    transcriber: TranscriberService = pool
+    warmup_models: List[Tuple[AsrBackend, Executor]] = list(zip(asr_models, asr_executors))
+    small_executor: Optional[ThreadPoolExecutor] = None
+    if small_model is not None:
+        small_executor = ThreadPoolExecutor(
+            max_workers=1, thread_name_prefix="asr-small"
+        )
+        small_batcher = TranscriptionBatcher(
+            small_model,
+            max_batch_size=args.max_batch_size,
+            max_wait_ms=args.max_batch_wait_ms,
+            executor=small_executor,
+        )
+        REPLICA_PENDING.set_function(partial(_pending, small_batcher), replica="small")
+        warmup_models.append((small_model, small_executor))
+        transcriber = CascadeRouter(
+            small_batcher,
+            pool,
+            max_small_seconds=args.small_model_max_seconds,
+            min_confidence=args.small_model_min_confidence,
+        )
+
+    transcriber.start()
+    QUEUE_DEPTH.set_function(lambda: transcriber.queue_size)
+
+    # Under a burst, shed load instead of letting latency grow
+    admission = AdmissionController(
+        max_in_flight=args.max_in_flight,
+        max_queued=args.max_queued,
+        queue_timeout=args.queue_timeout,
+    )
+    ADMISSION_REQUESTS.set_function(lambda: admission.in_flight, state="in_flight")
+    ADMISSION_REQUESTS.set_function(lambda: admission.queued, state="queued")
+
+    # Audio buffers are checked out per utterance and reused across connections
+    buffer_pool = BufferPool(max_free_bytes=int(args.buffer_pool_mb * 1024 * 1024))
+    for kind in KINDS:
+        BUFFER_POOL_BUFFERS.set_function(partial(_pool_occupancy, buffer_pool, kind, "in_use"), kind=kind, state="in_use")
+        BUFFER_POOL_BUFFERS.set_function(partial(_pool_occupancy, buffer_pool, kind, "free"), kind=kind, state="free")
+        BUFFER_POOL_BYTES.set_function(partial(_pool_occupancy, buffer_pool, kind, "in_use_bytes"), kind=kind, state="in_use")
+        BUFFER_POOL_BYTES.set_function(partial(_pool_occupancy, buffer_pool, kind, "free_bytes"), kind=kind, state="free")
+
+    # Replayed audio skips the model and the voice encoder
+    transcript_cache: Optional[TranscriptCache] = None
+    embedding_cache: Optional[LruCache[np.ndarray]] = None
+    if args.cache_size > 0:
+        cache_path = None
+        if args.cache_disk:
+            cache_path = Path(args.data_dir[0]) / TRANSCRIPT_CACHE_FILE
+            cache_path.parent.mkdir(parents=True, exist_ok=True)
+        transcript_cache = TranscriptCache(
+            args.cache_size,
+            ttl=args.cache_ttl,
+            path=cache_path,
+            namespace=f"{args.backend}:{args.model}"
+            + (f"+{args.small_model}" if args.small_model else "")
+            + (":int8" if args.onnx_quantize else ""),
+        )
+        if speaker_identifier is not None:
+            embedding_cache = LruCache(args.cache_size, ttl=args.cache_ttl)
+
+    metrics_server = None
+    if args.metrics_port:
+        metrics_server = await start_metrics_server(args.metrics_host, args.metrics_port)
+
+    # Pick up new enrollments without restarting
+    watcher_task = None
+    if (speaker_identifier is not None) and (args.embeddings_reload_interval > 0):
+        watcher = StoreWatcher(
+            args.embeddings_file,
+            speaker_identifier.set_index,
+            interval=args.embeddings_reload_interval,
+            pooling=args.speaker_pooling,
+        )
+        watcher_task = asyncio.create_task(watcher.run())
+
+    # Only accept connections once the first request will be fast
+    if not args.no_warmup:
+        await asyncio.gather(
+            *(
+                _warmup_model(asr_model, asr_executor)
+                for asr_model, asr_executor in warmup_models
+            )
+        )
+
+    if on_ready is not None:
+        on_ready()
+    elif args.ready_file:
+        Path(args.ready_file).write_text(str(os.getpid()), encoding="utf-8")
+
     # Start server
     _LOGGER.info("Service ready on %s", args.uri)
-    await server.run(
-        partial(
-            ParakeetEventHandler,
-            wyoming_info,
-            args,
-            asr_model,
-            asyncio.Lock(),
-            initial_prompt=args.initial_prompt,
+    try:
+        await server.run(
+            partial(
+                ParakeetEventHandler,
+                wyoming_info,
+                args,
+                transcriber,
+                speaker_identifier,
+                initial_prompt=args.initial_prompt,
+                speaker_executor=speaker_executor,
+                transcript_cache=transcript_cache,
+                embedding_cache=embedding_cache,
+                admission=admission,
+                buffer_pool=buffer_pool,
+            )
         )
+    finally:
+        if args.ready_file and (on_ready is None):
+            Path(args.ready_file).unlink(missing_ok=True)
+        if watcher_task is not None:
+            watcher_task.cancel()
+        if metrics_server is not None:
+            metrics_server.close()
+        await transcriber.stop()
+        for asr_executor in asr_executors:
+            asr_executor.shutdown(wait=False)
+        if small_executor is not None:
+            small_executor.shutdown(wait=False)
+        speaker_executor.shutdown(wait=False)
+        if transcript_cache is not None:
+            transcript_cache.close()
+        buffer_pool.close()
+
+
+def _load_asr_model(
+    args: argparse.Namespace,
+    device: str,
+    cpus: Optional[Set[int]] = None,
+    model_name: Optional[str] = None,
+    confidence: bool = False,
+) -> AsrBackend:
+    """Load one replica of the ASR model (default: --model) on a device."""
+    model_name = model_name or args.model
+    if STUB_MODEL_NAME in (args.model, model_name):
+        # Stand-in model for benchmarks; no NeMo, torch or weights needed
+        _LOGGER.info("Using stub ASR model")
+        return StubASRModel()
+
+    if args.backend == BACKEND_ONNX:
+        # Give each pinned replica's sessions one thread per core by default
+        intra_op_threads = args.intra_op_threads or (len(cpus) if cpus else 0)
+        return _load_onnx_model(args, device, intra_op_threads, model_name)
+
+    return NemoBackend(_load_nemo_model(args, device, model_name), confidence=confidence)
+
+
+def _load_nemo_model(args: argparse.Namespace, device: str, model_name: Optional[str] = None):
+    """Load the NeMo ASR model (default: --model) on the requested device."""
+    model_name = model_name or args.model
+    import torch
+
+    # Auto-detect device if not specified
+    if device == "auto":
+        if torch.cuda.is_available():
+            device = "cuda"
+            _LOGGER.info("Auto-detected CUDA device")
+        else:
+            device = "cpu"
+            _LOGGER.info("Auto-detected CPU device (CUDA not available)")
+    else:
+        _LOGGER.info("Using specified device: %s", device)
+
+    if device.startswith("cuda") and (not torch.cuda.is_available()):
+        _LOGGER.warning("CUDA requested but not available, using CPU")
+        device = "cpu"
+
+    cache_dir = model_cache_dir(args.data_dir[0], model_name)
+    if args.model_cache and is_cached(cache_dir):
+        try:
+            _LOGGER.info("Restoring cached model from %s", cache_dir)
+            asr_model = restore_cached_model(cache_dir, device)
+            _LOGGER.info("Loaded model: %s on device: %s", model_name, device)
+            return asr_model
+        except Exception:
+            _LOGGER.exception("Failed to restore cached model; loading from scratch")
+
+    # Load NeMo model
+    try:
+        import nemo.collections.asr as nemo_asr
+
+        _LOGGER.info("Loading NeMo ASR model: %s", model_name)
+        asr_model = nemo_asr.models.ASRModel.from_pretrained(
+            model_name=model_name, map_location=torch.device(device)
+        )
+        _LOGGER.info("Loaded model: %s on device: %s", model_name, device)
+    except Exception as e:
+        _LOGGER.error("Failed to load model: %s", e)
+        sys.exit(1)
+
+    if args.model_cache and (not is_cached(cache_dir)):
+        try:
+            save_model_cache(asr_model, cache_dir)
+        except Exception:
+            _LOGGER.exception("Failed to cache model in %s", cache_dir)
+
+    return asr_model
+
+
+def _load_onnx_model(
+    args: argparse.Namespace,
+    device: str,
+    intra_op_threads: int = 0,
+    model_name: Optional[str] = None,
+) -> OnnxAsrModel:
+    """Load the ONNX model (default: --model), exporting it from NeMo on first use."""
+    model_name = model_name or args.model
+    export_dir = onnx_export_dir(args.data_dir[0], model_name, args.onnx_quantize)
+    if not is_exported(export_dir):
+        try:
+            export_onnx_model(
+                _load_nemo_model(args, "cpu", model_name), export_dir, quantize=args.onnx_quantize
+            )
+        except Exception as e:
+            _LOGGER.error("Failed to export model to ONNX: %s", e)
+            sys.exit(1)
+
+    if device == "auto":
+        device = "cuda"  # falls back to CPU if not available
+
+    try:
+        return OnnxAsrModel.load(
+            export_dir,
+            device=device,
+            intra_op_threads=intra_op_threads,
+            inter_op_threads=args.inter_op_threads,
+        )
+    except Exception as e:
+        _LOGGER.error("Failed to load ONNX model: %s", e)
+        sys.exit(1)
+
+
+def _load_speaker_identifier(args: argparse.Namespace) -> SpeakerIdentifier:
+    """Load and warm up speaker identification, exiting on failure."""
+    try:
+        speaker_identifier = SpeakerIdentifier.load(
+            args.embeddings_file,
+            device=args.speaker_device,
+            pooling=args.speaker_pooling,
+        )
+        speaker_identifier.warmup()
+    except Exception as e:
+        _LOGGER.error("Failed to load speaker identification: %s", e)
+        sys.exit(1)
+
+    return speaker_identifier
+
+
+def _pending(service: TranscriberService) -> int:
+    return service.pending
+
+
+def _pool_occupancy(buffer_pool: BufferPool, kind: str, field: str) -> int:
+    return getattr(buffer_pool.occupancy(kind), field)
+
+
+async def _warmup_model(asr_model: AsrBackend, executor: Executor) -> None:
+    """Run one transcription so the first request doesn't pay for it."""
+    _LOGGER.debug("Warming up ASR model")
+    start_time = time.perf_counter()
+    silence = np.zeros(TARGET_RATE, dtype=np.float32)
+    await asyncio.get_running_loop().run_in_executor(
+        executor, partial(asr_model.transcribe, [silence], batch_size=1)
     )
+    _LOGGER.debug("ASR model warmed up in %.2f second(s)", time.perf_counter() - start_time)
+
+
+def _run_worker(
+    args: argparse.Namespace,
+    listen_socket: socket.socket,
+    index: int,
+    on_ready: Callable[[], None],
+) -> int:
+    """Run the server in a forked worker process."""
+    worker_args = argparse.Namespace(**vars(args))
+    if worker_args.metrics_port:
+        # Each worker has its own metrics
+        worker_args.metrics_port += index
+
+    asyncio.run(_serve_worker(worker_args, listen_socket, on_ready))
+    return 0
+
+
+async def _serve_worker(
+    args: argparse.Namespace,
+    listen_socket: socket.socket,
+    on_ready: Callable[[], None],
+) -> None:
+    """Serve until the supervisor sends SIGTERM, then let main() clean up."""
+    main_task = asyncio.current_task()
+    assert main_task is not None
+    asyncio.get_running_loop().add_signal_handler(signal.SIGTERM, main_task.cancel)
+    try:
+        await main(args, listen_socket, on_ready)
+    except asyncio.CancelledError:
+        _LOGGER.debug("Worker stopped")
+
 
 def run() -> None:
     """Run the server."""
+    args = _parse_args()
+    if args.workers <= 1:
+        try:
+            asyncio.run(main(args))
+        except KeyboardInterrupt:
+            pass
+
+        return
+
+    logging.basicConfig(
+        level=logging.DEBUG if args.debug else logging.INFO,
+        format="%(asctime)s %(levelname)s [%(name)s] %(process)d %(message)s"
+    )
+
+    # Bind once before forking so all workers accept on the same socket
     try:
-        asyncio.run(main())
-    except KeyboardInterrupt:
-        pass
+        listen_socket = bind_socket(args.uri)
+    except Exception as e:
+        _LOGGER.error("Failed to create server: %s", e)
+        sys.exit(1)
+
+    _LOGGER.info("Starting %s worker(s) on %s", args.workers, args.uri)
+    supervisor = Supervisor(
+        args.workers,
+        partial(_run_worker, args, listen_socket),
+        ready_file=args.ready_file,
+    )
+    try:
+        exit_code = supervisor.run()
+    finally:
+        close_socket(args.uri, listen_socket)
+
+    sys.exit(exit_code)
+
 
 if __name__ == "__main__":
     run()
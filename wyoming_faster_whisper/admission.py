@@ -0,0 +1,110 @@
+"""Admission control for transcription requests under overload."""
+import asyncio
+import logging
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Optional
+
+from .metrics import ADMISSION
+
+_LOGGER = logging.getLogger(__name__)
+
+
+class Overloaded(Exception):
+    """A request was turned away instead of waiting for a transcription slot."""
+
+    def __init__(self, message: str, reason: str) -> None:
+        super().__init__(message)
+        self.reason = reason
+
+
+class AdmissionController:
+    """Bounds concurrent transcriptions and the queue waiting for them.
+
+    Up to max_in_flight requests are transcribed at once (None for no
+    limit). Up to max_queued more may wait for a slot (None for no limit),
+    each for at most queue_timeout seconds (0 waits forever). Anything
+    beyond that is rejected right away, so latency stays bounded during a
+    burst instead of growing with the backlog.
+    """
+
+    def __init__(
+        self,
+        max_in_flight: Optional[int] = None,
+        max_queued: Optional[int] = None,
+        queue_timeout: float = 0.0,
+    ) -> None:
+        if (max_in_flight is not None) and (max_in_flight < 1):
+            raise ValueError("max_in_flight must be at least 1")
+
+        self.max_in_flight = max_in_flight
+        self.max_queued = max_queued
+        self.queue_timeout = queue_timeout
+        self.in_flight = 0
+        self.queued = 0
+        self._slots: Optional[asyncio.Semaphore] = None
+        if max_in_flight is not None:
+            self._slots = asyncio.Semaphore(max_in_flight)
+
+    @asynccontextmanager
+    async def slot(self) -> AsyncIterator[None]:
+        """Hold a transcription slot, raising Overloaded if none is available."""
+        await self.acquire()
+        try:
+            yield
+        finally:
+            self.release()
+
+    async def acquire(self) -> None:
+        if self._slots is not None:
+            if (
+                self._slots.locked()
+                and (self.max_queued is not None)
+                and (self.queued >= self.max_queued)
+            ):
+                ADMISSION.inc(result="rejected")
+                raise Overloaded("Too many requests waiting", reason="queue_full")
+
+            self.queued += 1
+            try:
+                if self.queue_timeout > 0:
+                    await asyncio.wait_for(self._slots.acquire(), self.queue_timeout)
+                else:
+                    await self._slots.acquire()
+            except asyncio.TimeoutError as err:
+                ADMISSION.inc(result="timed_out")
+                raise Overloaded(
+                    f"No transcription slot within {self.queue_timeout} second(s)",
+                    reason="timeout",
+                ) from err
+            finally:
+                self.queued -= 1
+
+        self.in_flight += 1
+        ADMISSION.inc(result="admitted")
+
+    def release(self) -> None:
+        self.in_flight -= 1
+        if self._slots is not None:
+            self._slots.release()
+
+
+def max_audio_bytes(
+    rate: int,
+    width: int,
+    channels: int,
+    max_seconds: float = 0.0,
+    max_bytes: int = 0,
+) -> Optional[int]:
+    """Byte limit for one utterance in this format, or None for no limit.
+
+    The limit is rounded down to whole frames.
+    """
+    frame_bytes = width * channels
+    limits = []
+    if max_seconds > 0:
+        limits.append(int(max_seconds * rate) * frame_bytes)
+
+    if max_bytes > 0:
+        limits.append((max_bytes // frame_bytes) * frame_bytes)
+
+    return min(limits) if limits else None
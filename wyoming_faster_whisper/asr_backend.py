@@ -0,0 +1,129 @@
+"""Interchangeable implementations of the ASR model."""
+import copy
+import logging
+from abc import ABC, abstractmethod
+from typing import Any, List, Sequence
+
+import numpy as np
+
+from .batching import Transcription, result_confidence, result_text, result_words
+
+_LOGGER = logging.getLogger(__name__)
+
+BACKEND_NEMO = "nemo"
+BACKEND_ONNX = "onnx"
+BACKENDS = (BACKEND_NEMO, BACKEND_ONNX)
+
+
+class AsrBackend(ABC):
+    """Transcribes batches of 16kHz float32 mono utterances."""
+
+    name = ""
+    supports_word_timings = False
+    supports_confidence = False
+
+    @abstractmethod
+    def transcribe(
+        self, audio: Sequence[np.ndarray], batch_size: int = 4, **kwargs: Any
+    ) -> List[str]:
+        """Return one transcription per utterance, in order."""
+
+    def transcribe_words(
+        self, audio: Sequence[np.ndarray], batch_size: int = 4
+    ) -> List[Transcription]:
+        """Return text, word timings and confidence per utterance, in order.
+
+        Backends without word timings (see supports_word_timings) return
+        the text alone.
+        """
+        return [Transcription(text) for text in self.transcribe(audio, batch_size)]
+
+    def transcribe_confidence(
+        self, audio: Sequence[np.ndarray], batch_size: int = 4
+    ) -> List[Transcription]:
+        """Return text and confidence per utterance, in order.
+
+        Defaults to transcribe_words; backends where word timings cost extra
+        or change decoding override this.
+        """
+        return self.transcribe_words(audio, batch_size)
+
+
+class NemoBackend(AsrBackend):
+    """NeMo/PyTorch model, as loaded by ASRModel.from_pretrained.
+
+    With confidence, the decoder keeps per-token confidence scores, which
+    transcribe_words and transcribe_confidence average per utterance.
+    """
+
+    name = BACKEND_NEMO
+    supports_word_timings = True
+
+    def __init__(self, model: Any, confidence: bool = False) -> None:
+        self.model = model
+        self.supports_confidence = False
+        if confidence:
+            self._enable_confidence()
+
+    def transcribe(
+        self, audio: Sequence[np.ndarray], batch_size: int = 4, **kwargs: Any
+    ) -> List[str]:
+        results = self.model.transcribe(list(audio), batch_size=batch_size, **kwargs)
+        return [result_text(result) for result in results or []]
+
+    def transcribe_words(
+        self, audio: Sequence[np.ndarray], batch_size: int = 4
+    ) -> List[Transcription]:
+        # timestamps=True switches the model's decoding to compute timestamps
+        # and leaves it that way; restore it so plain transcribe stays cheap
+        decoding_cfg = copy.deepcopy(self.model.cfg.decoding)
+        try:
+            results = self.model.transcribe(
+                list(audio), batch_size=batch_size, timestamps=True
+            )
+        finally:
+            self.model.change_decoding_strategy(decoding_cfg)
+
+        frame_seconds = self._frame_seconds()
+        return [
+            Transcription(
+                result_text(result),
+                result_words(result, frame_seconds),
+                result_confidence(result),
+            )
+            for result in results or []
+        ]
+
+    def transcribe_confidence(
+        self, audio: Sequence[np.ndarray], batch_size: int = 4
+    ) -> List[Transcription]:
+        # Hypotheses carry the token confidence; without timestamps=True the
+        # decoding strategy stays as it is for plain transcribe
+        results = self.model.transcribe(
+            list(audio), batch_size=batch_size, return_hypotheses=True
+        )
+        return [
+            Transcription(result_text(result), (), result_confidence(result))
+            for result in results or []
+        ]
+
+    def _enable_confidence(self) -> None:
+        from omegaconf import open_dict
+
+        decoding_cfg = self.model.cfg.decoding
+        with open_dict(decoding_cfg):
+            if decoding_cfg.get("confidence_cfg") is None:
+                decoding_cfg.confidence_cfg = {}
+            decoding_cfg.confidence_cfg.preserve_token_confidence = True
+
+        try:
+            self.model.change_decoding_strategy(decoding_cfg)
+            self.supports_confidence = True
+        except Exception:  # pylint: disable=broad-except
+            _LOGGER.exception("Model can't report confidence")
+
+    def _frame_seconds(self) -> float:
+        cfg = self.model.cfg
+        return float(cfg.preprocessor.window_stride) * int(
+            cfg.encoder.get("subsampling_factor", 8)
+        )
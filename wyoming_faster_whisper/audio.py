@@ -0,0 +1,276 @@
+"""In-memory audio buffering and conversion."""
+import logging
+from functools import lru_cache
+from math import gcd
+from typing import Optional
+
+import numpy as np
+
+_LOGGER = logging.getLogger(__name__)
+
+TARGET_RATE = 16000
+"""Sample rate expected by the ASR model and the speaker encoder."""
+
+_DEFAULT_CAPACITY = TARGET_RATE * 2 * 10  # 10 seconds of 16-bit mono
+_INT16_SCALE = np.float32(1.0 / 32768.0)
+
+
+class PcmBuffer:
+    """Growable, preallocated buffer of raw PCM audio."""
+
+    def __init__(self, capacity: int = _DEFAULT_CAPACITY) -> None:
+        self._data = bytearray(capacity)
+        self._size = 0
+        self.rate: Optional[int] = None
+        self.width: Optional[int] = None
+        self.channels: Optional[int] = None
+
+    def __len__(self) -> int:
+        return self._size
+
+    @property
+    def capacity(self) -> int:
+        """Number of bytes that fit without reallocating."""
+        return len(self._data)
+
+    @property
+    def has_format(self) -> bool:
+        """True if the audio format has been set."""
+        return self.rate is not None
+
+    def set_format(self, rate: int, width: int, channels: int) -> None:
+        """Set the format of the audio that will be appended."""
+        self.rate = rate
+        self.width = width
+        self.channels = channels
+
+    def append(self, audio: bytes) -> None:
+        """Append raw PCM bytes, growing the buffer geometrically if needed."""
+        end = self._size + len(audio)
+        if end > len(self._data):
+            new_capacity = max(end, 2 * len(self._data))
+            self._data.extend(bytes(new_capacity - len(self._data)))
+
+        self._data[self._size : end] = audio
+        self._size = end
+
+    def view(self) -> memoryview:
+        """Return a view of the buffered bytes without copying."""
+        return memoryview(self._data)[: self._size]
+
+    def clear(self) -> None:
+        """Forget buffered audio and format, keeping the allocation."""
+        self._size = 0
+        self.rate = None
+        self.width = None
+        self.channels = None
+
+    def to_float32(
+        self, target_rate: int = TARGET_RATE, out: Optional[np.ndarray] = None
+    ) -> np.ndarray:
+        """Decode buffered audio to float32 mono at the target rate.
+
+        See pcm_to_float32 for out.
+        """
+        if (self._size == 0) or (not self.has_format):
+            return np.zeros(0, dtype=np.float32)
+
+        assert self.rate is not None
+        assert self.width is not None
+        assert self.channels is not None
+        return pcm_to_float32(
+            self.view(), self.rate, self.width, self.channels, target_rate, out=out
+        )
+
+
+def decode_pcm(audio, width: int, channels: int) -> np.ndarray:
+    """Decode raw little-endian PCM to float32 mono samples in [-1, 1]."""
+    if width == 2:
+        # Convert and scale in a single pass
+        samples = np.multiply(
+            np.frombuffer(audio, dtype="<i2"), _INT16_SCALE, dtype=np.float32
+        )
+    elif width == 4:
+        samples = np.frombuffer(audio, dtype="<i4").astype(np.float32)
+        samples /= 2147483648.0
+    elif width == 1:
+        samples = np.frombuffer(audio, dtype=np.uint8).astype(np.float32)
+        samples = (samples - 128.0) / 128.0
+    else:
+        raise ValueError(f"Unsupported sample width: {width}")
+
+    if channels > 1:
+        # Drop a trailing partial frame, if any
+        num_frames = len(samples) // channels
+        samples = samples[: num_frames * channels]
+        samples = samples.reshape(num_frames, channels).mean(axis=1)
+
+    return samples
+
+
+def is_native_format(
+    rate: int, width: int, channels: int, target_rate: int = TARGET_RATE
+) -> bool:
+    """True for 16-bit mono PCM at the target rate, which only needs scaling."""
+    return (rate == target_rate) and (width == 2) and (channels == 1)
+
+
+def pcm_to_float32(
+    audio,
+    rate: int,
+    width: int,
+    channels: int,
+    target_rate: int = TARGET_RATE,
+    out: Optional[np.ndarray] = None,
+) -> np.ndarray:
+    """Convert raw PCM to float32 mono samples at the target rate.
+
+    Audio in the native format is decoded into out if given (one float32
+    per sample); other formats always get a new array.
+    """
+    if is_native_format(rate, width, channels, target_rate):
+        # The usual Wyoming format: no downmixing or resampling
+        return np.multiply(
+            np.frombuffer(audio, dtype="<i2"), _INT16_SCALE, dtype=np.float32, out=out
+        )
+
+    samples = decode_pcm(audio, width, channels)
+
+    if rate != target_rate:
+        _LOGGER.debug("Resampling audio from %s Hz to %s Hz", rate, target_rate)
+        samples = resample(samples, rate, target_rate)
+
+    return np.ascontiguousarray(samples, dtype=np.float32)
+
+
+def resample(samples: np.ndarray, rate: int, target_rate: int) -> np.ndarray:
+    """Resample float32 audio with a polyphase filter."""
+    if (rate == target_rate) or (samples.size == 0):
+        return samples
+
+    from scipy.signal import resample_poly
+
+    divisor = gcd(rate, target_rate)
+    up, down = target_rate // divisor, rate // divisor
+    return resample_poly(
+        samples.astype(np.float32, copy=False),
+        up,
+        down,
+        window=_resample_filter(up, down),
+    )
+
+
+@lru_cache(maxsize=16)
+def _resample_filter(up: int, down: int) -> np.ndarray:
+    """Anti-aliasing filter for a rate ratio, designed once per ratio.
+
+    Same Kaiser-windowed low-pass that resample_poly designs on every call.
+    """
+    from scipy.signal import firwin
+
+    max_rate = max(up, down)
+    half_len = 10 * max_rate
+    taps = firwin(2 * half_len + 1, 1.0 / max_rate, window=("kaiser", 5.0))
+    taps = taps.astype(np.float32)
+    taps.flags.writeable = False
+    return taps
+
+
+class StreamResampler:
+    """Polyphase resampler for audio that arrives in pieces.
+
+    Gives the same samples as resample() on the whole signal: the filter's
+    input history is kept from one piece to the next, so there are no edge
+    effects or rounding drift at piece boundaries. Call finish() after the
+    last piece for the samples that depend on audio after the end.
+    """
+
+    def __init__(self, rate: int, target_rate: int = TARGET_RATE) -> None:
+        divisor = gcd(rate, target_rate)
+        self.up, self.down = target_rate // divisor, rate // divisor
+
+        # Same filter as resample_poly, split into one row per output phase
+        taps = _resample_filter(self.up, self.down) * self.up
+        self._half_len = (len(taps) - 1) // 2
+        self._num_taps = -(-len(taps) // self.up)
+        padded = np.zeros(self._num_taps * self.up, dtype=np.float32)
+        padded[: len(taps)] = taps
+        self._phases = padded.reshape(self._num_taps, self.up).T
+
+        # Input samples from absolute index _start on (zeros before 0)
+        self._start = -self._num_taps
+        self._history = np.zeros(self._num_taps, dtype=np.float32)
+        self._num_in = 0
+        self._num_out = 0
+
+    def process(self, samples: np.ndarray) -> np.ndarray:
+        """Resample the next piece of float32 audio."""
+        self._history = np.concatenate(
+            (self._history, np.asarray(samples, dtype=np.float32))
+        )
+        self._num_in += len(samples)
+
+        # Outputs whose input window has fully arrived
+        num_out = -(-((self._num_in * self.up) - self._half_len) // self.down)
+        return self._resample(max(self._num_out, num_out))
+
+    def finish(self) -> np.ndarray:
+        """Samples left after the last piece, as if followed by silence."""
+        num_out = -(-(self._num_in * self.up) // self.down)
+        last_index = (((num_out - 1) * self.down) + self._half_len) // self.up
+        self._history = np.concatenate(
+            (
+                self._history,
+                np.zeros(
+                    max(0, last_index + 1 - self._start - len(self._history)),
+                    dtype=np.float32,
+                ),
+            )
+        )
+        return self._resample(num_out)
+
+    def _resample(self, num_out: int) -> np.ndarray:
+        outputs = np.arange(self._num_out, num_out)
+        positions = (outputs * self.down) + self._half_len
+        indices = (positions // self.up)[:, None] - np.arange(self._num_taps)
+        windows = self._history[indices - self._start]
+        samples = np.einsum("nt,nt->n", windows, self._phases[positions % self.up])
+
+        # Drop history that no later output needs
+        self._num_out = num_out
+        next_index = ((num_out * self.down) + self._half_len) // self.up
+        keep_from = next_index - (self._num_taps - 1)
+        if keep_from > self._start:
+            self._history = self._history[keep_from - self._start :]
+            self._start = keep_from
+
+        return samples.astype(np.float32, copy=False)
+
+
+class PcmStreamDecoder:
+    """Decodes consecutive pieces of a PCM stream to float32 at the target rate.
+
+    Pieces must hold whole frames. Resampling carries over from one piece
+    to the next (see StreamResampler).
+    """
+
+    def __init__(
+        self, rate: int, width: int, channels: int, target_rate: int = TARGET_RATE
+    ) -> None:
+        self.width = width
+        self.channels = channels
+        self._resampler: Optional[StreamResampler] = None
+        if rate != target_rate:
+            self._resampler = StreamResampler(rate, target_rate)
+
+    def decode(self, audio, final: bool = False) -> np.ndarray:
+        """Decode the next piece; final flushes the resampler."""
+        samples = decode_pcm(audio, self.width, self.channels)
+        if self._resampler is None:
+            return samples
+
+        samples = self._resampler.process(samples)
+        if final:
+            samples = np.concatenate((samples, self._resampler.finish()))
+
+        return samples
@@ -0,0 +1,267 @@
+"""Dynamic micro-batching of transcription requests."""
+import asyncio
+import logging
+import time
+from concurrent.futures import Executor
+from typing import Any, List, NamedTuple, Optional, Set, Tuple
+
+import numpy as np
+
+from .metrics import BATCH_SIZE, QUEUE_WAIT_SECONDS, STAGE_SECONDS
+
+_LOGGER = logging.getLogger(__name__)
+
+
+class WordTiming(NamedTuple):
+    """A transcribed word and its time span in seconds."""
+
+    word: str
+    start: float
+    end: float
+
+
+class Transcription(NamedTuple):
+    """Text of an utterance, with word timings and confidence if requested.
+
+    Confidence is the mean token confidence in [0, 1], or None if the
+    model doesn't report it (or nothing was transcribed).
+    """
+
+    text: str
+    words: Tuple[WordTiming, ...] = ()
+    confidence: Optional[float] = None
+
+
+# What a caller wants besides the text, cheapest first
+DETAIL_TEXT = 0
+DETAIL_CONFIDENCE = 1
+DETAIL_WORDS = 2  # word timings and confidence
+
+# (audio, future, enqueue time, detail)
+_QueueItem = Tuple[np.ndarray, "asyncio.Future[Transcription]", float, int]
+
+
+def result_text(result: Any) -> str:
+    """Get text from a NeMo transcription result (Hypothesis or str)."""
+    if hasattr(result, "text"):
+        return result.text
+
+    return str(result)
+
+
+def result_words(result: Any, frame_seconds: float = 0.08) -> Tuple[WordTiming, ...]:
+    """Get word timings from a NeMo Hypothesis transcribed with timestamps.
+
+    Older NeMo versions only report encoder frame offsets.
+    """
+    timestamp = getattr(result, "timestamp", None) or {}
+    words: List[WordTiming] = []
+    for entry in timestamp.get("word", []):
+        if "start" in entry:
+            start, end = float(entry["start"]), float(entry["end"])
+        else:
+            start = entry["start_offset"] * frame_seconds
+            end = entry["end_offset"] * frame_seconds
+
+        words.append(WordTiming(str(entry["word"]), start, end))
+
+    return tuple(words)
+
+
+def result_confidence(result: Any) -> Optional[float]:
+    """Mean token confidence of a NeMo Hypothesis, if it was preserved."""
+    token_confidence = getattr(result, "token_confidence", None)
+    if not token_confidence:
+        return None
+
+    return float(np.mean([float(value) for value in token_confidence]))
+
+
+class TranscriptionBatcher:
+    """Collects concurrent utterances and transcribes them in one model call.
+
+    The first waiting utterance opens a window of up to max_wait_ms. Any
+    utterances that arrive inside the window (up to max_batch_size) are
+    transcribed together in a worker thread, and each caller's future is
+    resolved with its own text.
+
+    Batches run on the given executor (the loop's default executor if None),
+    one at a time: NeMo's transcribe switches the model between train and
+    eval mode and may change its decoding strategy, so a model instance
+    must not run two batches at once. Parallelism comes from replicas.
+    """
+
+    def __init__(
+        self,
+        model: Any,
+        max_batch_size: int = 8,
+        max_wait_ms: float = 5.0,
+        executor: Optional[Executor] = None,
+    ) -> None:
+        if max_batch_size < 1:
+            raise ValueError("max_batch_size must be at least 1")
+
+        self.model = model
+        self.max_batch_size = max_batch_size
+        self.max_wait = max(0.0, max_wait_ms) / 1000.0
+        self.executor = executor
+        self._queue: "asyncio.Queue[_QueueItem]" = asyncio.Queue()
+        self._task: Optional[asyncio.Task] = None
+        self._batch_tasks: Set[asyncio.Task] = set()
+        self._pending = 0
+
+    @property
+    def queue_size(self) -> int:
+        """Number of utterances waiting for a batch."""
+        return self._queue.qsize()
+
+    @property
+    def pending(self) -> int:
+        """Number of utterances queued or being transcribed."""
+        return self._pending
+
+    @property
+    def supports_word_timings(self) -> bool:
+        """True if the model can report when each word was spoken."""
+        return getattr(self.model, "supports_word_timings", False)
+
+    @property
+    def supports_confidence(self) -> bool:
+        """True if the model can report how sure it is of a transcript."""
+        return getattr(self.model, "supports_confidence", False)
+
+    def start(self) -> None:
+        """Start the batching worker on the running event loop."""
+        if self._task is None:
+            self._task = asyncio.create_task(self._run(), name="transcription batcher")
+
+    async def stop(self) -> None:
+        """Stop the batching worker."""
+        if self._task is None:
+            return
+
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+
+        self._task = None
+        if self._batch_tasks:
+            await asyncio.gather(*self._batch_tasks, return_exceptions=True)
+
+    async def transcribe(self, audio: np.ndarray) -> str:
+        """Transcribe 16kHz mono float32 audio as part of the next batch."""
+        return (await self._submit(audio, DETAIL_TEXT)).text
+
+    async def transcribe_confidence(self, audio: np.ndarray) -> Transcription:
+        """Like transcribe, with confidence (but no word timings) if supported."""
+        return await self._submit(audio, DETAIL_CONFIDENCE)
+
+    async def transcribe_words(self, audio: np.ndarray) -> Transcription:
+        """Like transcribe, with word timings and confidence if supported."""
+        return await self._submit(audio, DETAIL_WORDS)
+
+    async def _submit(self, audio: np.ndarray, detail: int) -> Transcription:
+        self.start()
+        future: "asyncio.Future[Transcription]" = (
+            asyncio.get_running_loop().create_future()
+        )
+        self._pending += 1
+        try:
+            await self._queue.put((audio, future, time.perf_counter(), detail))
+            return await future
+        finally:
+            self._pending -= 1
+
+    async def _run(self) -> None:
+        loop = asyncio.get_running_loop()
+        slot = asyncio.Semaphore(1)
+        while True:
+            # Keep collecting while the model is busy so batches grow
+            await slot.acquire()
+            try:
+                batch = await self._collect_batch(loop)
+            except BaseException:
+                slot.release()
+                raise
+
+            task = asyncio.create_task(self._run_batch(loop, batch))
+            self._batch_tasks.add(task)
+            task.add_done_callback(self._batch_tasks.discard)
+            task.add_done_callback(lambda _task: slot.release())
+
+    async def _collect_batch(self, loop: asyncio.AbstractEventLoop) -> List[_QueueItem]:
+        while True:
+            batch = [await self._queue.get()]
+            deadline = loop.time() + self.max_wait
+
+            while len(batch) < self.max_batch_size:
+                if not self._queue.empty():
+                    batch.append(self._queue.get_nowait())
+                    continue
+
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+
+                try:
+                    batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+
+            # Skip callers that have gone away while waiting
+            batch = [item for item in batch if not item[1].done()]
+            if batch:
+                return batch
+
+    async def _run_batch(
+        self, loop: asyncio.AbstractEventLoop, batch: List[_QueueItem]
+    ) -> None:
+        _LOGGER.debug("Transcribing batch of %s utterance(s)", len(batch))
+        started = time.perf_counter()
+        for _, _, enqueued, _ in batch:
+            QUEUE_WAIT_SECONDS.observe(started - enqueued)
+        BATCH_SIZE.observe(len(batch))
+
+        # Details cost little extra, so the most demanding caller decides
+        detail = max(item[3] for item in batch)
+        try:
+            results = await loop.run_in_executor(
+                self.executor,
+                self._transcribe_batch,
+                [item[0] for item in batch],
+                detail,
+            )
+        except Exception as err:  # pylint: disable=broad-except
+            _LOGGER.exception("Batch transcription failed")
+            for _, future, _, _ in batch:
+                if not future.done():
+                    future.set_exception(err)
+            return
+
+        for (_, future, _, _), result in zip(batch, results):
+            if not future.done():
+                future.set_result(result)
+
+    def _transcribe_batch(
+        self, audios: List[np.ndarray], detail: int = DETAIL_TEXT
+    ) -> List[Transcription]:
+        batch_size = len(audios)
+        with STAGE_SECONDS.time(stage="transcribe"):
+            if (detail >= DETAIL_WORDS) and self.supports_word_timings:
+                results = self.model.transcribe_words(audios, batch_size=batch_size)
+            elif (detail >= DETAIL_CONFIDENCE) and self.supports_confidence:
+                results = self.model.transcribe_confidence(
+                    audios, batch_size=batch_size
+                )
+            else:
+                outputs = self.model.transcribe(audios, batch_size=batch_size) or []
+                results = [Transcription(result_text(output)) for output in outputs]
+
+        if len(results) != len(audios):
+            raise RuntimeError(
+                f"Expected {len(audios)} transcription(s), got {len(results)}"
+            )
+
+        return results
@@ -0,0 +1,195 @@
+"""Reusable audio buffers shared by every connection."""
+import logging
+import threading
+import weakref
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Tuple, Union
+
+import numpy as np
+
+from .audio import TARGET_RATE, PcmBuffer, is_native_format
+from .metrics import BUFFER_POOL_REQUESTS
+
+_LOGGER = logging.getLogger(__name__)
+
+KIND_PCM = "pcm"
+KIND_FLOAT32 = "float32"
+KINDS = (KIND_PCM, KIND_FLOAT32)
+
+MIN_CLASS_BYTES = 64 * 1024
+DEFAULT_PCM_BYTES = TARGET_RATE * 2 * 10  # 10 seconds of 16-bit mono
+
+_Buffer = Union[PcmBuffer, np.ndarray]
+
+
+def size_class(num_bytes: int) -> int:
+    """Smallest power of two (at least MIN_CLASS_BYTES) holding num_bytes."""
+    return max(MIN_CLASS_BYTES, 1 << max(0, int(num_bytes) - 1).bit_length())
+
+
+def _floor_class(num_bytes: int) -> int:
+    """Largest size class that fits in num_bytes."""
+    return max(MIN_CLASS_BYTES, 1 << (int(num_bytes).bit_length() - 1))
+
+
+def _kind(buffer: _Buffer) -> str:
+    return KIND_PCM if isinstance(buffer, PcmBuffer) else KIND_FLOAT32
+
+
+def _num_bytes(buffer: _Buffer) -> int:
+    if isinstance(buffer, PcmBuffer):
+        return buffer.capacity
+
+    return buffer.nbytes
+
+
+@dataclass(frozen=True)
+class PoolOccupancy:
+    """Buffers of one kind that are checked out (in use) or kept (free)."""
+
+    in_use: int = 0
+    in_use_bytes: int = 0
+    free: int = 0
+    free_bytes: int = 0
+
+
+class BufferPool:
+    """Size-classed PCM and float32 buffers, checked out per utterance.
+
+    Buffer sizes are rounded up to a power of two, so buffers returned by
+    one utterance fit the next one of similar length. Free buffers are kept
+    up to max_free_bytes in total; buffers bigger than max_buffer_bytes are
+    never kept, so memory stays bounded no matter how long the server runs.
+
+    A buffer that is never returned (say, the request failed) is left to
+    the garbage collector. Checkouts and returns may happen on any thread.
+    """
+
+    def __init__(
+        self,
+        max_free_bytes: int = 64 * 1024 * 1024,
+        max_buffer_bytes: int = 16 * 1024 * 1024,
+    ) -> None:
+        self.max_free_bytes = max_free_bytes
+        self.max_buffer_bytes = max_buffer_bytes
+        self._lock = threading.Lock()
+        self._free: Dict[Tuple[str, int], List[_Buffer]] = {}
+        self._free_bytes = 0
+        self._in_use: "weakref.WeakValueDictionary[int, _Buffer]" = (
+            weakref.WeakValueDictionary()
+        )
+
+    def acquire_pcm(self, capacity: int = DEFAULT_PCM_BYTES) -> PcmBuffer:
+        """Check out an empty PCM buffer for at least capacity bytes."""
+        buffer = self._take(KIND_PCM, size_class(capacity))
+        if buffer is None:
+            buffer = PcmBuffer(capacity=size_class(capacity))
+
+        assert isinstance(buffer, PcmBuffer)
+        self._check_out(buffer)
+        return buffer
+
+    def acquire_float32(self, num_samples: int) -> np.ndarray:
+        """Check out a float32 array with num_samples (uninitialized) samples."""
+        num_bytes = size_class(num_samples * 4)
+        array = self._take(KIND_FLOAT32, num_bytes)
+        if array is None:
+            array = np.empty(num_bytes // 4, dtype=np.float32)
+
+        assert isinstance(array, np.ndarray)
+        self._check_out(array)
+        return array[:num_samples]
+
+    def to_float32(self, buffer: PcmBuffer) -> np.ndarray:
+        """Decode buffered audio like PcmBuffer.to_float32, into a pooled array.
+
+        Only audio in the native format is decoded into the pool; resampled
+        audio gets a new array (which release ignores).
+        """
+        if (
+            (len(buffer) == 0)
+            or (buffer.rate is None)
+            or (buffer.width is None)
+            or (buffer.channels is None)
+            or (not is_native_format(buffer.rate, buffer.width, buffer.channels))
+        ):
+            return buffer.to_float32()
+
+        return buffer.to_float32(out=self.acquire_float32(len(buffer) // 2))
+
+    def release(self, buffer: _Buffer) -> None:
+        """Return a checked out buffer (or a view of it) to the pool.
+
+        Buffers the pool didn't hand out, or already got back, are ignored.
+        """
+        if isinstance(buffer, np.ndarray) and (buffer.base is not None):
+            buffer = buffer.base
+
+        with self._lock:
+            if self._in_use.pop(id(buffer), None) is not buffer:
+                return
+
+            kind = _kind(buffer)
+            if isinstance(buffer, PcmBuffer):
+                buffer.clear()
+
+            num_bytes = _num_bytes(buffer)
+            if (num_bytes > self.max_buffer_bytes) or (
+                (self._free_bytes + num_bytes) > self.max_free_bytes
+            ):
+                # Dropped; an unusually long utterance shouldn't pin memory
+                BUFFER_POOL_REQUESTS.inc(kind=kind, result="discarded")
+                return
+
+            self._free.setdefault((kind, _floor_class(num_bytes)), []).append(buffer)
+            self._free_bytes += num_bytes
+
+    def occupancy(self, kind: str) -> PoolOccupancy:
+        """Current number and size of buffers of a kind."""
+        with self._lock:
+            in_use = [
+                _num_bytes(buffer)
+                for buffer in self._in_use.values()
+                if _kind(buffer) == kind
+            ]
+            free = [
+                _num_bytes(buffer)
+                for (free_kind, _class), buffers in self._free.items()
+                if free_kind == kind
+                for buffer in buffers
+            ]
+
+        return PoolOccupancy(len(in_use), sum(in_use), len(free), sum(free))
+
+    def close(self) -> None:
+        """Drop free buffers; checked out ones won't be kept when returned."""
+        with self._lock:
+            if self._in_use:
+                _LOGGER.debug("%s buffer(s) still checked out", len(self._in_use))
+
+            self._free.clear()
+            self._free_bytes = 0
+            self._in_use.clear()
+
+    def _take(self, kind: str, num_bytes: int) -> Optional[_Buffer]:
+        """Smallest free buffer of at least num_bytes, if any."""
+        with self._lock:
+            classes = sorted(
+                buffer_class
+                for (free_kind, buffer_class), buffers in self._free.items()
+                if (free_kind == kind) and (buffer_class >= num_bytes) and buffers
+            )
+            if not classes:
+                BUFFER_POOL_REQUESTS.inc(kind=kind, result="miss")
+                return None
+
+            # Most recently returned first; likely still in cache
+            buffer = self._free[(kind, classes[0])].pop()
+            self._free_bytes -= _num_bytes(buffer)
+
+        BUFFER_POOL_REQUESTS.inc(kind=kind, result="hit")
+        return buffer
+
+    def _check_out(self, buffer: _Buffer) -> None:
+        with self._lock:
+            self._in_use[id(buffer)] = buffer
@@ -0,0 +1,124 @@
+"""Small model first, large model only for utterances that need it."""
+import logging
+
+import numpy as np
+
+from .audio import TARGET_RATE
+from .batching import DETAIL_CONFIDENCE, DETAIL_TEXT, DETAIL_WORDS, Transcription
+from .metrics import CASCADE_CONFIDENCE, CASCADE_REQUESTS
+from .replicas import Transcriber, TranscriberService
+
+_LOGGER = logging.getLogger(__name__)
+
+TIER_SMALL = "small"
+TIER_LARGE = "large"
+
+
+class CascadeRouter:
+    """Serves utterances from a small model, escalating hard ones.
+
+    Utterances longer than max_small_seconds go straight to the large
+    model. The rest are transcribed by the small model, and again by the
+    large model if the small model's confidence is below min_confidence.
+    Either limit is disabled with 0. Confidence comes without word timings
+    unless the caller asked for them, so the small model decodes as usual.
+    """
+
+    def __init__(
+        self,
+        small: TranscriberService,
+        large: TranscriberService,
+        max_small_seconds: float = 0.0,
+        min_confidence: float = 0.0,
+    ) -> None:
+        self.small = small
+        self.large = large
+        self.max_small_seconds = max_small_seconds
+        self.min_confidence = min_confidence
+
+        if (min_confidence > 0) and (not small.supports_confidence):
+            _LOGGER.warning(
+                "Small model doesn't report confidence; routing by duration only"
+            )
+            self.min_confidence = 0.0
+
+    @property
+    def queue_size(self) -> int:
+        """Number of utterances waiting for a batch on either model."""
+        return self.small.queue_size + self.large.queue_size
+
+    @property
+    def pending(self) -> int:
+        """Number of utterances queued or being transcribed."""
+        return self.small.pending + self.large.pending
+
+    @property
+    def supports_word_timings(self) -> bool:
+        """True if both models can report when each word was spoken."""
+        return self.small.supports_word_timings and self.large.supports_word_timings
+
+    @property
+    def supports_confidence(self) -> bool:
+        """True if both models can report how sure they are of a transcript."""
+        return self.small.supports_confidence and self.large.supports_confidence
+
+    def start(self) -> None:
+        self.small.start()
+        self.large.start()
+
+    async def stop(self) -> None:
+        await self.small.stop()
+        await self.large.stop()
+
+    async def transcribe(self, audio: np.ndarray) -> str:
+        """Transcribe 16kHz mono float32 audio with the cheapest good model."""
+        return (await self._route(audio, DETAIL_TEXT)).text
+
+    async def transcribe_confidence(self, audio: np.ndarray) -> Transcription:
+        """Like transcribe, with confidence (but no word timings) if supported."""
+        return await self._route(audio, DETAIL_CONFIDENCE)
+
+    async def transcribe_words(self, audio: np.ndarray) -> Transcription:
+        """Like transcribe, with word timings and confidence if supported."""
+        return await self._route(audio, DETAIL_WORDS)
+
+    async def _route(self, audio: np.ndarray, detail: int) -> Transcription:
+        seconds = len(audio) / TARGET_RATE
+        if (self.max_small_seconds > 0) and (seconds > self.max_small_seconds):
+            CASCADE_REQUESTS.inc(tier=TIER_LARGE, reason="long")
+            return await _transcribe(self.large, audio, detail)
+
+        if self.min_confidence <= 0:
+            CASCADE_REQUESTS.inc(tier=TIER_SMALL, reason="short")
+            return await _transcribe(self.small, audio, detail)
+
+        result = await _transcribe(self.small, audio, max(detail, DETAIL_CONFIDENCE))
+        if result.confidence is None:
+            # Nothing transcribed; the large model won't hear more
+            CASCADE_REQUESTS.inc(tier=TIER_SMALL, reason="empty")
+            return result
+
+        CASCADE_CONFIDENCE.observe(result.confidence)
+        if result.confidence >= self.min_confidence:
+            CASCADE_REQUESTS.inc(tier=TIER_SMALL, reason="confident")
+            return result
+
+        _LOGGER.debug(
+            "Escalating to large model (confidence: %.2f): %s",
+            result.confidence,
+            result.text,
+        )
+        CASCADE_REQUESTS.inc(tier=TIER_LARGE, reason="low_confidence")
+        return await _transcribe(self.large, audio, detail)
+
+
+async def _transcribe(
+    transcriber: Transcriber, audio: np.ndarray, detail: int
+) -> Transcription:
+    if detail >= DETAIL_WORDS:
+        return await transcriber.transcribe_words(audio)
+
+    if detail >= DETAIL_CONFIDENCE:
+        return await transcriber.transcribe_confidence(audio)
+
+    return Transcription(await transcriber.transcribe(audio))
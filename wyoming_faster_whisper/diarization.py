@@ -0,0 +1,270 @@
+"""Who spoke when, from batched sliding-window voice embeddings."""
+import asyncio
+import logging
+from concurrent.futures import Executor
+from dataclasses import asdict, dataclass
+from typing import Any, Dict, List, Optional, Sequence, Union
+
+import numpy as np
+
+from .audio import TARGET_RATE
+from .batching import WordTiming
+from .features import PARTIAL_FRAMES, SPEAKER_FRONT_END, UtteranceFeatures, volume_gain
+from .long_audio import transcribe_long
+from .metrics import STAGE_SECONDS
+from .replicas import Transcriber
+from .speaker_identifier import SpeakerIdentifier
+
+_LOGGER = logging.getLogger(__name__)
+
+
+@dataclass
+class SpeakerTurn:
+    """A stretch of audio attributed to one speaker (None if unknown)."""
+
+    speaker: Optional[str]
+    start: float
+    end: float
+
+
+@dataclass
+class DiarizedSegment:
+    """Text spoken by one speaker, with its time span in seconds."""
+
+    speaker: Optional[str]
+    text: str
+    start: float
+    end: float
+
+    def to_dict(self) -> Dict[str, Any]:
+        return asdict(self)
+
+
+def window_starts(length: int, window: int, step: int) -> List[int]:
+    """Start of each sliding window; the last one ends with the audio."""
+    if length <= window:
+        return [0]
+
+    starts = list(range(0, length - window + 1, step))
+    if starts[-1] + window < length:
+        starts.append(length - window)
+
+    return starts
+
+
+def label_windows(
+    scores: np.ndarray,
+    speakers: Union[Sequence[str], np.ndarray],
+    threshold: float,
+) -> List[Optional[str]]:
+    """Best speaker per window (rows of scores), or None below threshold."""
+    if scores.size == 0:
+        return [None] * len(scores)
+
+    best = scores.argmax(axis=1)
+    return [
+        str(speakers[index]) if score >= threshold else None
+        for index, score in zip(best, scores[np.arange(len(scores)), best])
+    ]
+
+
+def smooth_labels(labels: Sequence[Optional[str]]) -> List[Optional[str]]:
+    """Replace a single window that disagrees with both neighbors."""
+    smoothed = list(labels)
+    for i in range(1, len(labels) - 1):
+        if (labels[i - 1] == labels[i + 1]) and (labels[i] != labels[i - 1]):
+            smoothed[i] = labels[i - 1]
+
+    return smoothed
+
+
+def merge_turns(
+    labels: Sequence[Optional[str]],
+    starts: Sequence[int],
+    window_samples: int,
+    num_samples: int,
+) -> List[SpeakerTurn]:
+    """Join adjacent windows with the same speaker into turns.
+
+    Each window owns the audio closest to its center, so turn boundaries
+    fall halfway between the centers of neighboring windows.
+    """
+    centers = [start + (window_samples / 2) for start in starts]
+    turns: List[SpeakerTurn] = []
+    for i, label in enumerate(labels):
+        start = 0.0 if i == 0 else (centers[i - 1] + centers[i]) / 2
+        end = (
+            float(num_samples)
+            if i == (len(labels) - 1)
+            else (centers[i] + centers[i + 1]) / 2
+        )
+        start, end = start / TARGET_RATE, end / TARGET_RATE
+        if turns and (turns[-1].speaker == label):
+            turns[-1].end = end
+        else:
+            turns.append(SpeakerTurn(label, start, end))
+
+    return turns
+
+
+def diarize(
+    identifier: SpeakerIdentifier,
+    features: UtteranceFeatures,
+    step_seconds: float = 0.5,
+    silence_dbfs: float = -50.0,
+) -> List[SpeakerTurn]:
+    """Split an utterance into speaker turns.
+
+    Every 1.6s window (one every step_seconds) is sliced from the mel
+    frames of the whole utterance, which are computed once. All windows are
+    embedded in a single batched forward pass and scored against all
+    enrolled speakers with one matrix product. Silent windows take the
+    label of the preceding window.
+    """
+    audio = features.audio
+    if audio.size == 0:
+        return []
+
+    hop_length = SPEAKER_FRONT_END.hop_length
+    mel = features.mel(SPEAKER_FRONT_END) * volume_gain(audio)
+    frame_power = 10 ** (features.frame_db(SPEAKER_FRONT_END) / 10)
+    if len(mel) < PARTIAL_FRAMES:
+        mel = np.pad(mel, ((0, PARTIAL_FRAMES - len(mel)), (0, 0)))
+
+    step_frames = max(1, round(step_seconds * TARGET_RATE / hop_length))
+    starts = window_starts(len(frame_power), PARTIAL_FRAMES, step_frames)
+    voiced = [
+        i
+        for i, start in enumerate(starts)
+        if 10 * np.log10(max(frame_power[start : start + PARTIAL_FRAMES].mean(), 1e-10))
+        >= silence_dbfs
+    ]
+    labels: List[Optional[str]] = [None] * len(starts)
+    if voiced:
+        windows = np.stack(
+            [mel[starts[i] : starts[i] + PARTIAL_FRAMES] for i in voiced]
+        )
+        with STAGE_SECONDS.time(stage="speaker_embed"):
+            embeddings = identifier.embed_mels(windows)
+
+        index = identifier.index
+        voiced_labels = label_windows(
+            index.batch_scores(embeddings), index.speakers, identifier.threshold
+        )
+        voiced_labels = smooth_labels(voiced_labels)
+        for i, label in zip(voiced, voiced_labels):
+            labels[i] = label
+
+        # Silence belongs to whoever spoke last (or first, at the start)
+        voiced_set = set(voiced)
+        previous = voiced_labels[0]
+        for i, label in enumerate(labels):
+            if i in voiced_set:
+                previous = label
+            else:
+                labels[i] = previous
+
+    turns = merge_turns(
+        labels,
+        [start * hop_length for start in starts],
+        PARTIAL_FRAMES * hop_length,
+        len(audio),
+    )
+    _LOGGER.debug("Diarized %s window(s) into %s turn(s)", len(starts), len(turns))
+    return turns
+
+
+def assign_words(
+    turns: Sequence[SpeakerTurn], words: Sequence[WordTiming]
+) -> List[DiarizedSegment]:
+    """Give each word to the turn containing its midpoint and group them.
+
+    Consecutive words of the same speaker form one segment that spans
+    from the first word's start to the last word's end.
+    """
+    segments: List[DiarizedSegment] = []
+    turn_index = 0
+    for word in words:
+        middle = (word.start + word.end) / 2
+        while (turn_index < (len(turns) - 1)) and (middle >= turns[turn_index].end):
+            turn_index += 1
+
+        speaker = turns[turn_index].speaker if turns else None
+        if segments and (segments[-1].speaker == speaker):
+            segments[-1].text += f" {word.word}"
+            segments[-1].end = word.end
+        else:
+            segments.append(DiarizedSegment(speaker, word.word, word.start, word.end))
+
+    return segments
+
+
+def main_speaker(segments: Sequence[DiarizedSegment]) -> Optional[str]:
+    """Speaker with the most speaking time."""
+    durations: Dict[Optional[str], float] = {}
+    for segment in segments:
+        durations[segment.speaker] = durations.get(segment.speaker, 0.0) + (
+            segment.end - segment.start
+        )
+
+    known = {speaker: d for speaker, d in durations.items() if speaker is not None}
+    if not known:
+        return None
+
+    return max(known, key=lambda speaker: known[speaker])
+
+
+async def transcribe_speakers(
+    transcriber: Transcriber,
+    identifier: SpeakerIdentifier,
+    features: UtteranceFeatures,
+    executor: Optional[Executor] = None,
+    step_seconds: float = 0.5,
+    long_audio_window: float = 0.0,
+    long_audio_overlap: float = 2.0,
+) -> List[DiarizedSegment]:
+    """Transcribe an utterance as per-speaker segments.
+
+    With word timings, the utterance is transcribed once while it is being
+    diarized, and words are assigned to turns. Otherwise (or if the audio
+    is longer than long_audio_window) each turn is transcribed separately
+    once the turns are known.
+    """
+    audio = features.audio
+    window_samples = int(long_audio_window * TARGET_RATE)
+    loop = asyncio.get_running_loop()
+    turns_future = loop.run_in_executor(
+        executor, diarize, identifier, features, step_seconds
+    )
+
+    if transcriber.supports_word_timings and (
+        (window_samples <= 0) or (len(audio) <= window_samples)
+    ):
+        transcription, turns = await asyncio.gather(
+            transcriber.transcribe_words(audio), turns_future
+        )
+        if transcription.words or (not transcription.text):
+            return assign_words(turns, transcription.words)
+
+        _LOGGER.debug("No word timings in transcript; transcribing each turn")
+    else:
+        turns = await turns_future
+
+    async def transcribe_turn(turn: SpeakerTurn) -> str:
+        turn_audio = audio[int(turn.start * TARGET_RATE) : int(turn.end * TARGET_RATE)]
+        if 0 < window_samples < len(turn_audio):
+            return await transcribe_long(
+                transcriber,
+                turn_audio,
+                long_audio_window,
+                overlap_seconds=long_audio_overlap,
+            )
+
+        return await transcriber.transcribe(turn_audio)
+
+    texts = await asyncio.gather(*(transcribe_turn(turn) for turn in turns))
+    return [
+        DiarizedSegment(turn.speaker, text.strip(), turn.start, turn.end)
+        for turn, text in zip(turns, texts)
+        if text.strip()
+    ]
@@ -0,0 +1,231 @@
+"""Versioned, memory-mappable file format for speaker embeddings.
+
+Layout (little-endian):
+
+    8 bytes   magic (b"WYSPKEMB")
+    uint32    format version
+    uint32    header length in bytes
+    ...       UTF-8 JSON header: {"count", "dim", "dtype", "speakers", "offset"}
+    ...       zero padding up to "offset" (64-byte aligned)
+    ...       float32 matrix of shape (count, dim), one L2-normalized row
+              per enrollment embedding; "speakers" names the row owners
+
+The matrix is opened with np.memmap, so processes that load the same store
+share its pages instead of each holding a private copy.
+"""
+import asyncio
+import json
+import logging
+import os
+import pickle
+import struct
+import tempfile
+from pathlib import Path
+from typing import Callable, Dict, Optional, Tuple, Union
+
+import numpy as np
+
+from .speaker_index import POOLING_CENTROID, POOLING_MAX, SpeakerIndex
+
+_LOGGER = logging.getLogger(__name__)
+
+MAGIC = b"WYSPKEMB"
+VERSION = 1
+STORE_SUFFIX = ".emb"
+
+_PREFIX = struct.Struct("<8sII")
+_ALIGNMENT = 64
+_DTYPE = "<f4"
+
+
+def is_store(path: Union[str, Path]) -> bool:
+    """True if the file starts with the embedding store magic."""
+    with open(path, "rb") as store_file:
+        return store_file.read(len(MAGIC)) == MAGIC
+
+
+def save_store(path: Union[str, Path], index: SpeakerIndex) -> None:
+    """Write an index to an embedding store atomically."""
+    path = Path(path)
+    matrix = np.ascontiguousarray(index.matrix, dtype=_DTYPE)
+    header = {
+        "count": int(matrix.shape[0]),
+        "dim": int(matrix.shape[1]) if matrix.ndim == 2 else 0,
+        "dtype": _DTYPE,
+        "speakers": index.row_speakers,
+    }
+
+    # Offset depends on the header length, which includes the offset
+    offset = 0
+    while True:
+        header["offset"] = offset
+        header_bytes = json.dumps(header).encode("utf-8")
+        needed = _PREFIX.size + len(header_bytes)
+        aligned = -(-needed // _ALIGNMENT) * _ALIGNMENT
+        if aligned == offset:
+            break
+
+        offset = aligned
+
+    path.parent.mkdir(parents=True, exist_ok=True)
+    fd, temp_path = tempfile.mkstemp(dir=path.parent, prefix=f".{path.name}.")
+    try:
+        with os.fdopen(fd, "wb") as store_file:
+            store_file.write(_PREFIX.pack(MAGIC, VERSION, len(header_bytes)))
+            store_file.write(header_bytes)
+            store_file.write(b"\0" * (offset - _PREFIX.size - len(header_bytes)))
+            store_file.write(matrix.tobytes())
+
+        os.replace(temp_path, path)
+    except BaseException:
+        Path(temp_path).unlink(missing_ok=True)
+        raise
+
+    _LOGGER.debug("Saved %s embedding(s) to %s", header["count"], path)
+
+
+def load_store(path: Union[str, Path]) -> SpeakerIndex:
+    """Open an embedding store as a memory-mapped speaker index."""
+    with open(path, "rb") as store_file:
+        magic, version, header_length = _PREFIX.unpack(store_file.read(_PREFIX.size))
+        if magic != MAGIC:
+            raise ValueError(f"Not a speaker embedding store: {path}")
+
+        if version != VERSION:
+            raise ValueError(f"Unsupported embedding store version: {version}")
+
+        header = json.loads(store_file.read(header_length).decode("utf-8"))
+
+    count, dim = header["count"], header["dim"]
+    if count == 0:
+        matrix = np.zeros((0, dim), dtype=np.float32)
+    else:
+        matrix = np.memmap(
+            path,
+            dtype=header["dtype"],
+            mode="r",
+            offset=header["offset"],
+            shape=(count, dim),
+        )
+
+    return SpeakerIndex(matrix, header["speakers"], normalized=True)
+
+
+def load_pickle(path: Union[str, Path]) -> Dict[str, np.ndarray]:
+    """Load a legacy pickled {speaker: embedding} dict."""
+    with open(path, "rb") as pickle_file:
+        embeddings = pickle.load(pickle_file)
+
+    if not isinstance(embeddings, dict):
+        raise ValueError(f"Expected a dict of embeddings in {path}")
+
+    return embeddings
+
+
+def convert_pickle(
+    pickle_path: Union[str, Path],
+    store_path: Optional[Union[str, Path]] = None,
+    pooling: str = POOLING_CENTROID,
+) -> Path:
+    """Convert a legacy pickled {speaker: embedding} dict to a store.
+
+    With centroid pooling, speakers with several embeddings get one
+    averaged row, so the server can use the store memory-mapped as is.
+    """
+    pickle_path = Path(pickle_path)
+    if store_path is None:
+        store_path = pickle_path.with_suffix(STORE_SUFFIX)
+
+    store_path = Path(store_path)
+    embeddings = load_pickle(pickle_path)
+    save_store(store_path, SpeakerIndex.from_embeddings(embeddings, pooling=pooling))
+    _LOGGER.info("Converted %s to %s", pickle_path, store_path)
+
+    return store_path
+
+
+def load_index(path: Union[str, Path]) -> SpeakerIndex:
+    """Load speaker embeddings from a store or a legacy pickle file.
+
+    Legacy pickles are converted to a store next to the original file (or
+    reused if that store is newer), falling back to an in-memory index when
+    the directory is read-only.
+    """
+    path = Path(path)
+    if is_store(path):
+        index = load_store(path)
+        _LOGGER.info("Loaded embeddings for %d speakers", len(index))
+        return index
+
+    store_path = path.with_suffix(STORE_SUFFIX)
+    if store_path == path:
+        _LOGGER.warning("%s is a legacy pickle file; loading in memory", path)
+        return SpeakerIndex.from_embeddings(load_pickle(path), pooling=POOLING_MAX)
+
+    if store_path.is_file() and (store_path.stat().st_mtime >= path.stat().st_mtime):
+        _LOGGER.info("Using converted embedding store %s", store_path)
+        return load_index(store_path)
+
+    _LOGGER.warning("%s is a legacy pickle file; converting to %s", path, store_path)
+    try:
+        return load_index(convert_pickle(path, store_path))
+    except OSError as err:
+        _LOGGER.warning("Could not write %s (%s); loading in memory", store_path, err)
+
+    return SpeakerIndex.from_embeddings(load_pickle(path), pooling=POOLING_MAX)
+
+
+class StoreWatcher:
+    """Reloads an embeddings file in the background when it changes.
+
+    The file's mtime and size are polled every interval seconds. A changed
+    file is loaded in a worker thread and handed to on_reload, which swaps
+    it in with a single reference assignment; callers already holding the
+    old index finish against it.
+    """
+
+    def __init__(
+        self,
+        path: Union[str, Path],
+        on_reload: Callable[[SpeakerIndex], None],
+        interval: float = 5.0,
+        pooling: str = POOLING_MAX,
+    ) -> None:
+        self.path = Path(path)
+        self.on_reload = on_reload
+        self.interval = interval
+        self.pooling = pooling
+        self._signature = self._stat()
+
+    def _stat(self) -> Optional[Tuple[int, int]]:
+        try:
+            stat = self.path.stat()
+        except OSError:
+            return None
+
+        return (stat.st_mtime_ns, stat.st_size)
+
+    def check(self) -> bool:
+        """Reload if the file changed since the last check."""
+        signature = self._stat()
+        if (signature is None) or (signature == self._signature):
+            return False
+
+        try:
+            index = load_index(self.path).pooled(self.pooling)
+        except Exception:  # pylint: disable=broad-except
+            # Probably caught mid-write; keep the old index and retry later
+            _LOGGER.exception("Failed to reload embeddings from %s", self.path)
+            return False
+
+        self._signature = signature
+        self.on_reload(index)
+        _LOGGER.info("Reloaded embeddings for %d speakers", len(index))
+        return True
+
+    async def run(self) -> None:
+        """Poll for changes until cancelled."""
+        loop = asyncio.get_running_loop()
+        while True:
+            await asyncio.sleep(self.interval)
+            await loop.run_in_executor(None, self.check)
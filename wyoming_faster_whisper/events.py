@@ -31,4 +31,22 @@ class SpeakerTranscript:
         return cls(
             text=event.data["text"],
             speaker=event.data.get("speaker")
-        )
\ No newline at end of file
+        )
+
+
+class TranscriptChunk:
+    """Partial transcript text sent while audio is still streaming."""
+    TYPE = "transcript-chunk"
+
+    def __init__(self, text: str) -> None:
+        self._event = Event(self.TYPE, data={"text": text})
+        _LOGGER.debug("Created transcript chunk: text='%s'", text)
+
+    def event(self) -> Event:
+        """Return Wyoming Event representation."""
+        return self._event
+
+    @classmethod
+    def from_event(cls, event: Event) -> "TranscriptChunk":
+        """Create from Wyoming Event."""
+        return cls(text=event.data["text"])
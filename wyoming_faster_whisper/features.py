@@ -0,0 +1,292 @@
+"""Front-end features of an utterance, computed once and shared.
+
+ASR and speaker ID both start from short-time spectra of the same 16kHz
+audio. MelFrontEnd describes one model's front end (STFT and mel
+filterbank), and UtteranceFeatures caches what was computed for an
+utterance, so every consumer of the utterance reuses it.
+"""
+import logging
+from typing import Any, Dict, Hashable, List, Optional, Tuple
+
+import numpy as np
+
+from .audio import TARGET_RATE
+from .metrics import STAGE_SECONDS
+
+_LOGGER = logging.getLogger(__name__)
+
+_POWER_FLOOR = 1e-10
+
+# resemblyzer's partial utterances: 160 frames (1.6 s), one every 77 frames
+PARTIAL_FRAMES = 160
+PARTIAL_STEP_FRAMES = 77
+_MIN_COVERAGE = 0.75
+
+
+def _hz_to_mel(freqs: np.ndarray) -> np.ndarray:
+    """Slaney mel scale: linear below 1 kHz, logarithmic above."""
+    freqs = np.asarray(freqs, dtype=np.float64)
+    mels = freqs / (200.0 / 3)
+    log_region = freqs >= 1000.0
+    mels[log_region] = 15.0 + np.log(freqs[log_region] / 1000.0) / (np.log(6.4) / 27)
+    return mels
+
+
+def _mel_to_hz(mels: np.ndarray) -> np.ndarray:
+    mels = np.asarray(mels, dtype=np.float64)
+    freqs = mels * (200.0 / 3)
+    log_region = mels >= 15.0
+    freqs[log_region] = 1000.0 * np.exp((np.log(6.4) / 27) * (mels[log_region] - 15.0))
+    return freqs
+
+
+def mel_filterbank(
+    rate: int, n_fft: int, n_mels: int, fmin: float = 0.0, fmax: Optional[float] = None
+) -> np.ndarray:
+    """Slaney-normalized mel filterbank (same as librosa.filters.mel)."""
+    fmax = (rate / 2) if fmax is None else fmax
+    fft_freqs = np.linspace(0, rate / 2, 1 + (n_fft // 2))
+    mel_freqs = _mel_to_hz(
+        np.linspace(
+            _hz_to_mel(np.array([fmin]))[0], _hz_to_mel(np.array([fmax]))[0], n_mels + 2
+        )
+    )
+
+    freq_diffs = np.diff(mel_freqs)
+    ramps = mel_freqs[:, None] - fft_freqs[None, :]
+    lower = -ramps[:-2] / freq_diffs[:-1, None]
+    upper = ramps[2:] / freq_diffs[1:, None]
+    weights = np.maximum(0, np.minimum(lower, upper))
+    weights *= (2.0 / (mel_freqs[2:] - mel_freqs[:-2]))[:, None]
+
+    return weights.astype(np.float32)
+
+
+class MelFrontEnd:
+    """Centered STFT (zero padded) and mel filterbank of one model.
+
+    NeMo's preprocessor uses a symmetric Hann window with pre-emphasis;
+    resemblyzer (librosa) uses a periodic one without.
+    """
+
+    def __init__(
+        self,
+        sample_rate: int = TARGET_RATE,
+        win_length: int = 400,
+        hop_length: int = 160,
+        n_fft: Optional[int] = None,
+        n_mels: int = 40,
+        preemph: Optional[float] = None,
+        periodic_window: bool = False,
+        fmin: float = 0.0,
+        fmax: Optional[float] = None,
+    ) -> None:
+        self.sample_rate = sample_rate
+        self.win_length = win_length
+        self.hop_length = hop_length
+        self.n_fft = n_fft or 2 ** int(np.ceil(np.log2(win_length)))
+        self.preemph = preemph
+
+        if periodic_window:
+            window = np.hanning(win_length + 1)[:-1]
+        else:
+            window = np.hanning(win_length)
+
+        # Window centered in n_fft
+        left = (self.n_fft - win_length) // 2
+        self.window = np.pad(
+            window.astype(np.float32), (left, self.n_fft - win_length - left)
+        )
+        self.filterbank = mel_filterbank(
+            sample_rate, self.n_fft, n_mels, fmin=fmin, fmax=fmax
+        )
+
+        # Front ends with the same STFT share the power spectrum
+        self.stft_key: Hashable = (
+            sample_rate,
+            win_length,
+            hop_length,
+            self.n_fft,
+            preemph,
+            periodic_window,
+        )
+        self.key: Hashable = (self.stft_key, n_mels, fmin, fmax)
+
+    @property
+    def n_mels(self) -> int:
+        return self.filterbank.shape[0]
+
+    def num_frames(self, num_samples: int) -> int:
+        return (num_samples // self.hop_length) + 1
+
+    def power(self, audio: np.ndarray) -> np.ndarray:
+        """Power spectrum with shape (frames, n_fft // 2 + 1)."""
+        audio = np.asarray(audio, dtype=np.float32)
+        if self.preemph:
+            audio = np.concatenate((audio[:1], audio[1:] - self.preemph * audio[:-1]))
+
+        padded = np.pad(audio, self.n_fft // 2)
+        frames = np.lib.stride_tricks.sliding_window_view(padded, self.n_fft)[
+            :: self.hop_length
+        ]
+        spectrum = np.fft.rfft(frames * self.window, axis=1)
+        return (np.square(spectrum.real) + np.square(spectrum.imag)).astype(np.float32)
+
+    def mel(self, power: np.ndarray) -> np.ndarray:
+        """Mel power with shape (frames, n_mels)."""
+        return power @ self.filterbank.T
+
+    def frame_db(self, power: np.ndarray) -> np.ndarray:
+        """Level of each windowed frame in dB relative to full scale."""
+        # Parseval, counting the mirrored half of the spectrum
+        total = (2 * power.sum(axis=1)) - power[:, 0] - power[:, -1]
+        mean_square = total / (self.n_fft * np.sum(np.square(self.window)))
+        return 10 * np.log10(np.maximum(mean_square, _POWER_FLOOR))
+
+    def __call__(self, audio: np.ndarray) -> np.ndarray:
+        return self.mel(self.power(audio))
+
+
+SPEAKER_FRONT_END = MelFrontEnd(
+    win_length=400, hop_length=160, n_fft=400, n_mels=40, periodic_window=True
+)
+"""resemblyzer's front end: 40 mel channels, 25 ms windows every 10 ms."""
+
+
+def volume_gain(audio: np.ndarray, target_dbfs: float = -30.0) -> float:
+    """Power gain that raises quiet audio to target_dbfs (never lowers it).
+
+    Mel power scales with the square of the amplitude, so this is applied
+    to mel frames instead of the waveform.
+    """
+    mean_square = float(np.mean(np.square(audio, dtype=np.float64)))
+    change_db = target_dbfs - (10 * np.log10(max(mean_square, _POWER_FLOOR)))
+    return float(10 ** (change_db / 10)) if change_db > 0 else 1.0
+
+
+def speech_frames(
+    frame_db: np.ndarray, top_db: float = 20.0, max_gap_frames: int = 8
+) -> np.ndarray:
+    """Mask of frames within top_db of the loudest one.
+
+    Pauses of up to max_gap_frames inside speech are kept.
+    """
+    if frame_db.size == 0:
+        return np.zeros(0, dtype=bool)
+
+    voiced = frame_db >= (frame_db.max() - top_db)
+    radius = max_gap_frames // 2
+    if radius > 0:
+        voiced = (
+            np.convolve(voiced.astype(np.float32), np.ones(2 * radius + 1), "same")
+            > 0.5
+        )
+
+    return voiced
+
+
+def partial_windows(
+    mel: np.ndarray,
+    frames: int = PARTIAL_FRAMES,
+    step: int = PARTIAL_STEP_FRAMES,
+    min_coverage: float = _MIN_COVERAGE,
+) -> np.ndarray:
+    """Overlapping windows of mel frames, (windows, frames, n_mels).
+
+    Same slicing as resemblyzer's embed_utterance: the last window is
+    zero-padded, and dropped if it covers less than min_coverage of
+    audio (unless it is the only one).
+    """
+    starts = window_starts(len(mel), frames, step, min_coverage)
+    padded = np.zeros((starts[-1] + frames, mel.shape[1]), dtype=np.float32)
+    padded[: len(mel)] = mel[: len(padded)]
+    return np.stack([padded[start : start + frames] for start in starts])
+
+
+def window_starts(
+    num_frames: int,
+    frames: int = PARTIAL_FRAMES,
+    step: int = PARTIAL_STEP_FRAMES,
+    min_coverage: float = _MIN_COVERAGE,
+) -> List[int]:
+    """First frame of each window partial_windows cuts from num_frames."""
+    starts = list(range(0, max(1, num_frames - frames + step + 1), step))
+    if (len(starts) > 1) and ((num_frames - starts[-1]) / frames) < min_coverage:
+        starts.pop()
+
+    return starts
+
+
+def speaker_windows(
+    mel: np.ndarray, frame_db: np.ndarray, gain: float, complete_only: bool = False
+) -> Tuple[np.ndarray, List[Hashable]]:
+    """Voice encoder input for an utterance: windows and a key per window.
+
+    Frames well below the loudest one are dropped (see speech_frames),
+    quiet audio is raised by gain (see volume_gain), and the rest is cut
+    into partial windows. With complete_only, the zero-padded last window
+    is left out (for audio that is still arriving).
+
+    A key names the frames and gain a window was built from, so windows of
+    the same audio with the same key hold the same values.
+    """
+    speech = speech_frames(frame_db)
+    kept = np.flatnonzero(speech) if speech.any() else np.arange(len(mel))
+    starts = window_starts(len(kept))
+    if complete_only:
+        starts = [start for start in starts if start + PARTIAL_FRAMES <= len(kept)]
+
+    if not starts:
+        return np.zeros((0, PARTIAL_FRAMES, mel.shape[1]), dtype=np.float32), []
+
+    windows = np.zeros((len(starts), PARTIAL_FRAMES, mel.shape[1]), dtype=np.float32)
+    keys: List[Hashable] = []
+    for window, start in zip(windows, starts):
+        frames = kept[start : start + PARTIAL_FRAMES]
+        window[: len(frames)] = mel[frames] * gain
+        keys.append((gain, frames.tobytes()))
+
+    return windows, keys
+
+
+class UtteranceFeatures:
+    """Audio of one utterance and the features computed from it so far.
+
+    Built once per request from the decoded 16kHz mono float32 audio.
+    Power spectra and mel frames are computed on first use and cached,
+    so consumers with the same front end share them.
+    """
+
+    def __init__(self, audio: np.ndarray, key: Optional[str] = None) -> None:
+        self.audio = audio
+        self.key = key
+        self._cache: Dict[Tuple[str, Hashable], Any] = {}
+
+    @property
+    def seconds(self) -> float:
+        return len(self.audio) / TARGET_RATE
+
+    def power(self, front_end: MelFrontEnd) -> np.ndarray:
+        """Power spectrum of the utterance, (frames, bins)."""
+        return self._cached("power", front_end.stft_key, front_end.power, self.audio)
+
+    def mel(self, front_end: MelFrontEnd = SPEAKER_FRONT_END) -> np.ndarray:
+        """Mel power of the utterance, (frames, n_mels)."""
+        return self._cached("mel", front_end.key, front_end.mel, self.power(front_end))
+
+    def frame_db(self, front_end: MelFrontEnd = SPEAKER_FRONT_END) -> np.ndarray:
+        """Level of each frame in dBFS."""
+        return self._cached(
+            "frame_db", front_end.stft_key, front_end.frame_db, self.power(front_end)
+        )
+
+    def _cached(self, kind: str, key: Hashable, compute: Any, *args: Any) -> Any:
+        cache_key = (kind, key)
+        value = self._cache.get(cache_key)
+        if value is None:
+            with STAGE_SECONDS.time(stage="features"):
+                value = compute(*args)
+            value.setflags(write=False)
+            self._cache[cache_key] = value
+
+        return value
@@ -2,62 +2,90 @@
 import argparse
 import asyncio
 import logging
-import os
-import tempfile
-import wave
-from pathlib import Path
-from typing import Optional
+import time
+from concurrent.futures import Executor
+from typing import Optional, Tuple
 
-import nemo.collections.asr as nemo_asr
 from wyoming.asr import Transcribe, Transcript
-from wyoming.audio import AudioChunk, AudioStop
+from wyoming.audio import AudioChunk, AudioStart, AudioStop
+from wyoming.error import Error
 from wyoming.event import Event
 from wyoming.info import Describe, Info
 from wyoming.server import AsyncEventHandler
-import torch
-import librosa
-import soundfile as sf
 import numpy as np
 
-from .speaker_identifier import load_embeddings, identify_speaker
+from .admission import AdmissionController, Overloaded, max_audio_bytes
+from .audio import TARGET_RATE, PcmBuffer, PcmStreamDecoder
+from .buffer_pool import BufferPool
+from .diarization import main_speaker, transcribe_speakers
+from .events import TranscriptChunk
+from .features import UtteranceFeatures
+from .long_audio import transcribe_long
+from .metrics import (
+    ACTIVE_CONNECTIONS,
+    ADMISSION,
+    AUDIO_SECONDS,
+    CACHE_LOOKUPS,
+    REAL_TIME_FACTOR,
+    REQUESTS,
+    STAGE_SECONDS,
+)
+from .replicas import Transcriber
+from .result_cache import LruCache, TranscriptCache, audio_key
+from .speaker_identifier import SpeakerIdentifier
+from .speaker_stream import SpeakerStream
+from .streaming import StreamingTranscriber
+from .vad import SpeechTrimmer
 
 _LOGGER = logging.getLogger(__name__)
 
+_STREAMING_STEP_MS = 250
+
+
 class ParakeetEventHandler(AsyncEventHandler):
     def __init__(
         self,
         wyoming_info: Info,
         cli_args: argparse.Namespace,
-        model: nemo_asr.models.ASRModel,
-        model_lock: asyncio.Lock,
+        batcher: Transcriber,
+        speaker_identifier: Optional[SpeakerIdentifier],
         *args,
         initial_prompt: Optional[str] = None,
+        speaker_executor: Optional[Executor] = None,
+        transcript_cache: Optional[TranscriptCache] = None,
+        embedding_cache: Optional[LruCache[np.ndarray]] = None,
+        admission: Optional[AdmissionController] = None,
+        buffer_pool: Optional[BufferPool] = None,
         **kwargs,
     ) -> None:
         super().__init__(*args, **kwargs)
         self.cli_args = cli_args
         self.wyoming_info_event = wyoming_info.event()
-        self.model = model
-        self.model_lock = model_lock
+        self.batcher = batcher
+        self.speaker_identifier = speaker_identifier
+        self.speaker_executor = speaker_executor
         self.initial_prompt = initial_prompt
+        self.transcript_cache = transcript_cache
+        self.embedding_cache = embedding_cache
+        self.admission = admission if admission is not None else AdmissionController()
+        self.buffer_pool = buffer_pool if buffer_pool is not None else BufferPool()
         self._language = self.cli_args.language
 
-        # Optimized VoiceEncoder device selection
-        from resemblyzer import VoiceEncoder
-        if torch.cuda.is_available():
-            encoder_device = "cuda"
-        elif torch.backends.mps.is_available():
-            encoder_device = "mps"
-        else:
-            encoder_device = "cpu"
-        self.voice_encoder = VoiceEncoder(device=encoder_device)
-        self.speaker_embeddings = None
-        if getattr(cli_args, "embeddings_file", None):
-            self.speaker_embeddings = load_embeddings(Path(cli_args.embeddings_file))
-
-        self._wav_dir = tempfile.TemporaryDirectory()
-        self._wav_path = os.path.join(self._wav_dir.name, "speech.wav")
-        self._wav_file = None
+        # Checked out from the pool for each utterance
+        self._audio_buffer: Optional[PcmBuffer] = None
+        self._vad: Optional[SpeechTrimmer] = None
+        self._streaming: Optional[StreamingTranscriber] = None
+        self._speaker_stream: Optional[SpeakerStream] = None
+        self._stream_decoder: Optional[PcmStreamDecoder] = None
+        # Diarization needs the whole utterance, so it excludes streaming
+        self._diarize = (speaker_identifier is not None) and getattr(cli_args, "diarize", False) and (not getattr(cli_args, "streaming", False))
+        self._speaker_incremental = (speaker_identifier is not None) and getattr(cli_args, "speaker_incremental", False) and (not self._diarize)
+        self._streamed_bytes = 0
+        self._max_bytes: Optional[int] = None
+        self._truncated = False
+        # Held from the start of the utterance until its transcript is sent
+        self._admitted = False
+        ACTIVE_CONNECTIONS.inc()
 
     async def handle_event(self, event: Event) -> bool:
         # Respond to Describe event with Info event
@@ -65,80 +93,387 @@ class ParakeetEventHandler(AsyncEventHandler):
             await self.write_event(self.wyoming_info_event)
             return True
 
+        if AudioStart.is_type(event.type):
+            try:
+                await self._admit()
+            except Overloaded as err:
+                return await self._reject(err)
+            return True
+
         if AudioChunk.is_type(event.type):
+            # Streaming work starts with the first chunk, so the slot does too
+            try:
+                await self._admit()
+            except Overloaded as err:
+                return await self._reject(err)
             chunk = AudioChunk.from_event(event)
-            if self._wav_file is None:
-                self._wav_file = wave.open(self._wav_path, "wb")
-                self._wav_file.setframerate(chunk.rate)
-                self._wav_file.setsampwidth(chunk.width)
-                self._wav_file.setnchannels(chunk.channels)
-            self._wav_file.writeframes(chunk.audio)
+            if self._audio_buffer is None:
+                self._audio_buffer = self.buffer_pool.acquire_pcm()
+            if not self._audio_buffer.has_format:
+                self._audio_buffer.set_format(chunk.rate, chunk.width, chunk.channels)
+                self._max_bytes = max_audio_bytes(
+                    chunk.rate,
+                    chunk.width,
+                    chunk.channels,
+                    max_seconds=getattr(self.cli_args, "max_audio_seconds", 0.0),
+                    max_bytes=getattr(self.cli_args, "max_audio_bytes", 0),
+                )
+                if getattr(self.cli_args, "vad", False):
+                    self._vad = SpeechTrimmer(
+                        chunk.rate,
+                        chunk.width,
+                        chunk.channels,
+                        threshold_db=self.cli_args.vad_threshold_db,
+                        padding_ms=self.cli_args.vad_padding_ms,
+                    )
+
+            if self._truncated:
+                return True
+            if self._vad is not None:
+                # Silence is dropped before it reaches the buffer
+                self._append_audio(self._vad.process(chunk.audio))
+            else:
+                self._append_audio(chunk.audio)
+            if getattr(self.cli_args, "streaming", False) or self._speaker_incremental:
+                await self._feed_streaming()
             return True
 
         if AudioStop.is_type(event.type):
-            self._wav_file.close()
-            self._wav_file = None
+            started = time.perf_counter()
+            try:
+                await self._admit()
+            except Overloaded as err:
+                return await self._reject(err)
+            try:
+                return await self._handle_audio_stop(started)
+            finally:
+                self._release_slot()
 
-            # Start both tasks in parallel
-            transcription_task = asyncio.create_task(self._transcribe_audio())
-            speaker_task = asyncio.create_task(self._identify_speaker_optimized())
-            text, speaker = await asyncio.gather(transcription_task, speaker_task)
+        return True
 
-            payload: str = str({"text": text, "speaker": speaker if speaker else "guest"})
-            await self.write_event(Transcript(text=payload).event())
-            return False
+    async def _admit(self) -> None:
+        """Take a transcription slot for this utterance, unless already holding one.
 
-        return True
+        The wait is bounded; late answers are worse than none.
+        """
+        if not self._admitted:
+            await self.admission.acquire()
+            self._admitted = True
+
+    def _release_slot(self) -> None:
+        if self._admitted:
+            self.admission.release()
+            self._admitted = False
 
-    async def _transcribe_audio(self) -> str:
-        async with self.model_lock:
-            # Convert audio to proper format for NeMo (mono, 16kHz)
-            # Load and convert the audio
-            audio, sr = librosa.load(self._wav_path, sr=16000, mono=True)
-            
-            # Create a temporary file with proper format
-            with tempfile.NamedTemporaryFile(suffix=".wav", delete=False) as temp_file:
-                temp_path = temp_file.name
-                sf.write(temp_path, audio, 16000)
-            
+    async def _reject(self, err: Overloaded) -> bool:
+        """Turn the request away with an error event."""
+        _LOGGER.warning("Rejected request: %s", err)
+        self._reset_audio()
+        REQUESTS.inc(outcome="overloaded")
+        await self.write_event(Error(text=str(err), code=f"overloaded_{err.reason}").event())
+        return False
+
+    async def _handle_audio_stop(self, started: float) -> bool:
+        if self._vad is not None:
+            self._append_audio(self._vad.finish())
+            self._vad = None
+
+        if getattr(self.cli_args, "streaming", False) or self._speaker_incremental:
+            await self._feed_streaming(final=True)
+        self._stream_decoder = None
+        speaker_stream = self._speaker_stream
+        self._speaker_stream = None
+
+        streaming = self._streaming
+        if streaming is not None:
+            # Most segments are already transcribed; only the tail is left
+            self._streaming = None
+            audio = streaming.audio
+            key = None
+            transcription_task = asyncio.create_task(
+                self._finish_streaming(streaming)
+            )
+        else:
+            # Decode and resample once (off the event loop); shared by ASR
+            # and speaker ID
+            loop = asyncio.get_running_loop()
+            with STAGE_SECONDS.time(stage="decode"):
+                audio, key = await loop.run_in_executor(None, self._decode_audio)
+            if not self._diarize:
+                transcription_task = asyncio.create_task(
+                    self._transcribe_audio(audio, key)
+                )
+
+        self._release_buffer()
+        self._streamed_bytes = 0
+        self._max_bytes = None
+        self._truncated = False
+
+        # Front-end features are computed once, by whichever consumer needs
+        # them first
+        features = UtteranceFeatures(audio, key)
+        if self._diarize:
+            payload = await self._diarize_audio(features)
+        else:
+            # Start both tasks in parallel
+            speaker_task = asyncio.create_task(
+                self._identify_speaker_optimized(features, speaker_stream)
+            )
             try:
-                # NeMo transcribe method returns a list of transcription results
-                transcriptions = self.model.transcribe([temp_path])
-                if transcriptions and len(transcriptions) > 0:
-                    result = transcriptions[0]
-                    if hasattr(result, 'text'):
-                        text = result.text
-                    else:
-                        text = str(result)
-                else:
-                    text = ""
-            finally:
-                # Clean up temporary file
-                os.unlink(temp_path)
-                
+                text, speaker = await asyncio.gather(transcription_task, speaker_task)
+            except Exception:
+                REQUESTS.inc(outcome="error")
+                raise
+
+            payload = str({"text": text, "speaker": speaker if speaker else "guest"})
+        await self.write_event(Transcript(text=payload).event())
+
+        elapsed = time.perf_counter() - started
+        audio_seconds = len(audio) / TARGET_RATE
+        REQUESTS.inc(outcome="success")
+        STAGE_SECONDS.observe(elapsed, stage="total")
+        AUDIO_SECONDS.observe(audio_seconds)
+        if audio_seconds > 0:
+            REAL_TIME_FACTOR.observe(elapsed / audio_seconds)
+
+        # Every consumer is done with the audio. Failed requests don't get
+        # here and leave it to the garbage collector, since a failed task's
+        # sibling may still be reading it.
+        self.buffer_pool.release(audio)
+        return False
+
+    async def disconnect(self) -> None:
+        ACTIVE_CONNECTIONS.dec()
+        self._reset_audio()
+        self._release_slot()
+
+    def _release_buffer(self) -> None:
+        """Return the PCM buffer to the pool, if one is checked out."""
+        if self._audio_buffer is not None:
+            self.buffer_pool.release(self._audio_buffer)
+            self._audio_buffer = None
+
+    def _reset_audio(self) -> None:
+        """Drop buffered audio and any streaming transcription in progress."""
+        if self._streaming is not None:
+            self._streaming.cancel()
+            self._streaming = None
+        if self._speaker_stream is not None:
+            self._speaker_stream.cancel()
+            self._speaker_stream = None
+        self._vad = None
+        self._stream_decoder = None
+        self._release_buffer()
+        self._streamed_bytes = 0
+        self._max_bytes = None
+        self._truncated = False
+
+    def _append_audio(self, audio: bytes) -> None:
+        """Buffer audio up to the per-utterance limit, dropping the rest."""
+        assert self._audio_buffer is not None
+        if (self._max_bytes is not None) and ((len(self._audio_buffer) + len(audio)) > self._max_bytes):
+            audio = audio[: max(0, self._max_bytes - len(self._audio_buffer))]
+            if not self._truncated:
+                _LOGGER.warning("Utterance exceeds %s byte(s); ignoring the rest", self._max_bytes)
+                ADMISSION.inc(result="truncated")
+                self._truncated = True
+        self._audio_buffer.append(audio)
+
+    async def _feed_streaming(self, final: bool = False) -> None:
+        """Pass newly buffered audio to the streaming transcriber and speaker ID."""
+        buffer = self._audio_buffer
+        if (buffer is None) or (not buffer.has_format):
+            return
+        assert buffer.rate is not None
+        assert buffer.width is not None
+        assert buffer.channels is not None
+
+        frame_bytes = buffer.width * buffer.channels
+        step_bytes = frame_bytes * ((buffer.rate * _STREAMING_STEP_MS) // 1000)
+        new_bytes = len(buffer) - self._streamed_bytes
+        if ((not final) and (new_bytes < step_bytes)) or ((new_bytes < frame_bytes) and (self._stream_decoder is None)):
+            return
+
+        # Resampling carries over between pieces, so pieces join seamlessly
+        if self._stream_decoder is None:
+            self._stream_decoder = PcmStreamDecoder(buffer.rate, buffer.width, buffer.channels)
+        end = self._streamed_bytes + ((new_bytes // frame_bytes) * frame_bytes)
+        pcm = bytes(buffer.view()[self._streamed_bytes : end])
+        self._streamed_bytes = end
+
+        # Off the event loop; events are handled one at a time, so pieces
+        # are still decoded in order
+        loop = asyncio.get_running_loop()
+        audio = await loop.run_in_executor(None, self._stream_decoder.decode, pcm, final)
+        if audio.size == 0:
+            return
+
+        if getattr(self.cli_args, "streaming", False):
+            if self._streaming is None:
+                self._streaming = StreamingTranscriber(
+                    self.batcher,
+                    chunk_ms=self.cli_args.streaming_chunk_ms,
+                    on_text=self._write_transcript_chunk,
+                )
+            self._streaming.feed(audio)
+
+        if self._speaker_incremental:
+            assert self.speaker_identifier is not None
+            if self._speaker_stream is None:
+                self._speaker_stream = SpeakerStream(
+                    self.speaker_identifier,
+                    self.speaker_executor,
+                    margin=self.cli_args.speaker_early_margin,
+                )
+            self._speaker_stream.feed(audio)
+
+    async def _write_transcript_chunk(self, text: str) -> None:
+        _LOGGER.debug("Partial transcript: %s", text)
+        await self.write_event(TranscriptChunk(text).event())
+
+    async def _finish_streaming(self, streaming: StreamingTranscriber) -> str:
+        text = await streaming.finish()
+        _LOGGER.info(text)
+        return text
+
+    def _decode_audio(self) -> Tuple[np.ndarray, Optional[str]]:
+        """Buffered audio as 16kHz float32, and its cache key if caching."""
+        if self._audio_buffer is None:
+            audio = np.zeros(0, dtype=np.float32)
+        else:
+            # Released once the response is written
+            audio = self.buffer_pool.to_float32(self._audio_buffer)
+        if (self.transcript_cache is None) and (self.embedding_cache is None):
+            return audio, None
+        return audio, audio_key(audio)
+
+    async def _transcribe_audio(self, audio: np.ndarray, key: Optional[str] = None) -> str:
+        if audio.size == 0:
+            _LOGGER.warning("No audio received")
+            return ""
+
+        cache = self.transcript_cache
+        if (cache is not None) and (key is not None):
+            text = cache.get_memory(key)
+            if (text is None) and cache.has_disk:
+                loop = asyncio.get_running_loop()
+                text = await loop.run_in_executor(None, cache.get_disk, key)
+            elif text is None:
+                text = cache.get_disk(key)  # counts the miss
+            if text is not None:
+                _LOGGER.info(text)
+                return text
+
+        window_seconds = getattr(self.cli_args, "long_audio_window", 0.0)
+        if (window_seconds > 0) and (len(audio) > (window_seconds * TARGET_RATE)):
+            # Overlapping windows keep each model call (and its memory) bounded
+            text = await transcribe_long(
+                self.batcher,
+                audio,
+                window_seconds,
+                overlap_seconds=self.cli_args.long_audio_overlap,
+                max_parallel=self.cli_args.max_batch_size,
+            )
+        else:
+            # Batched with any other utterances waiting for the model
+            text = await self.batcher.transcribe(audio)
+
+        if (cache is not None) and (key is not None):
+            if cache.has_disk:
+                # Written in the background; the response doesn't wait
+                asyncio.get_running_loop().run_in_executor(None, cache.put, key, text)
+            else:
+                cache.put(key, text)
+
         _LOGGER.info(text)
         return text
 
-    async def _identify_speaker_optimized(self) -> Optional[str]:
-        if not self.speaker_embeddings:
+    async def _diarize_audio(self, features: UtteranceFeatures) -> str:
+        """Transcript payload with one segment per speaker turn."""
+        assert self.speaker_identifier is not None
+        if features.audio.size == 0:
+            _LOGGER.warning("No audio received")
+            return str({"text": "", "speaker": "guest", "segments": []})
+
+        try:
+            with STAGE_SECONDS.time(stage="diarize"):
+                segments = await transcribe_speakers(
+                    self.batcher,
+                    self.speaker_identifier,
+                    features,
+                    self.speaker_executor,
+                    step_seconds=self.cli_args.diarize_step,
+                    long_audio_window=getattr(self.cli_args, "long_audio_window", 0.0),
+                    long_audio_overlap=getattr(self.cli_args, "long_audio_overlap", 2.0),
+                )
+        except Exception:
+            REQUESTS.inc(outcome="error")
+            raise
+
+        speaker = main_speaker(segments)
+        text = " ".join(segment.text for segment in segments)
+        _LOGGER.info(text)
+        _LOGGER.debug("Diarized into %s segment(s)", len(segments))
+        return str(
+            {
+                "text": text,
+                "speaker": speaker if speaker else "guest",
+                "segments": [
+                    {
+                        "speaker": segment.speaker if segment.speaker else "guest",
+                        "text": segment.text,
+                        "start": round(segment.start, 2),
+                        "end": round(segment.end, 2),
+                    }
+                    for segment in segments
+                ],
+            }
+        )
+
+    async def _identify_speaker_optimized(self, features: UtteranceFeatures, speaker_stream: Optional[SpeakerStream] = None) -> Optional[str]:
+        key = features.key
+        if (self.speaker_identifier is None) or (features.audio.size == 0):
+            if speaker_stream is not None:
+                speaker_stream.cancel()
             return None
         try:
-            from resemblyzer import preprocess_wav
-            # Load and preprocess audio in memory
-            wav = preprocess_wav(self._wav_path)
-            # Trim silence using librosa
-            trimmed_wav, _ = librosa.effects.trim(wav, top_db=20)
-            # If trimming removed everything, fall back to original
-            if trimmed_wav.size == 0:
-                trimmed_wav = wav
-            # Compute embedding (in-memory)
-            speaker = identify_speaker(
-                trimmed_wav,
-                self.speaker_embeddings,
-                self.voice_encoder
+            if speaker_stream is not None:
+                # Usually mostly embedded while the audio arrived
+                embedding = await speaker_stream.finish(features)
+                if embedding is not None:
+                    if (self.embedding_cache is not None) and (key is not None):
+                        self.embedding_cache.put(key, embedding)
+                    speaker = self.speaker_identifier.identify_embedding(embedding)
+                    _LOGGER.debug("Identified speaker: %s (%s partial window(s))", speaker, speaker_stream.num_partials)
+                    return speaker
+
+            # Runs in its own executor so it overlaps with ASR
+            loop = asyncio.get_running_loop()
+            speaker = await loop.run_in_executor(
+                self.speaker_executor, self._identify_speaker_sync, features
             )
             _LOGGER.debug("Identified speaker: %s", speaker)
             return speaker
         except Exception as e:
             _LOGGER.error("Speaker identification failed: %s", e)
             return None
+
+    def _identify_speaker_sync(self, features: UtteranceFeatures) -> Optional[str]:
+        assert self.speaker_identifier is not None
+        key = features.key
+        if self.embedding_cache is not None:
+            if key is None:
+                key = audio_key(features.audio)
+            embedding = self.embedding_cache.get(key)
+            if embedding is not None:
+                CACHE_LOOKUPS.inc(cache="speaker_embedding", result="hit_memory")
+                return self.speaker_identifier.identify_embedding(embedding)
+            CACHE_LOOKUPS.inc(cache="speaker_embedding", result="miss")
+
+        # Volume normalization and silence trimming work on the shared mel
+        # frames (timed as the "features" stage)
+        with STAGE_SECONDS.time(stage="speaker_embed"):
+            embedding = self.speaker_identifier.embed_features(features)
+        if (self.embedding_cache is not None) and (key is not None):
+            self.embedding_cache.put(key, embedding)
+        return self.speaker_identifier.identify_embedding(embedding)
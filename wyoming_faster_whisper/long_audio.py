@@ -0,0 +1,130 @@
+"""Transcription of long audio in overlapping windows."""
+import asyncio
+import logging
+import re
+from typing import List, Sequence, Tuple
+
+import numpy as np
+
+from .audio import TARGET_RATE
+from .replicas import Transcriber
+from .streaming import find_cut
+
+_LOGGER = logging.getLogger(__name__)
+
+_MAX_OVERLAP_WORDS = 30
+_NON_WORD = re.compile(r"[^\w']+")
+
+
+def split_windows(
+    audio: np.ndarray,
+    window_samples: int,
+    overlap_samples: int,
+    search_samples: int,
+) -> List[Tuple[int, int]]:
+    """Split audio into (start, end) windows of at most window_samples.
+
+    Each window but the last ends at the quietest point in its final
+    search_samples, and the next window starts overlap_samples earlier.
+    """
+    overlap_samples = min(overlap_samples, window_samples // 2)
+    search_samples = min(search_samples, (window_samples - overlap_samples) // 2)
+
+    num_samples = len(audio)
+    windows: List[Tuple[int, int]] = []
+    start = 0
+    while (num_samples - start) > window_samples:
+        end = start + find_cut(audio[start : start + window_samples], search_samples)
+        windows.append((start, end))
+        start = max(start + 1, end - overlap_samples)
+
+    windows.append((start, num_samples))
+    return windows
+
+
+def _normalize(word: str) -> str:
+    return _NON_WORD.sub("", word.lower())
+
+
+def merge_overlap(previous: List[str], current: List[str]) -> List[str]:
+    """Join the words of consecutive windows, dropping repeated overlap.
+
+    The longest run of words at the end of previous that also starts
+    current is kept once, as written in current. A word cut in half at either window edge may
+    be skipped on each side.
+    """
+    if (not previous) or (not current):
+        return previous + current
+
+    prev_norm = [_normalize(word) for word in previous[-_MAX_OVERLAP_WORDS - 1 :]]
+    cur_norm = [_normalize(word) for word in current[: _MAX_OVERLAP_WORDS + 1]]
+
+    best_length = 0
+    best_skips = (0, 0)  # (prev skip, cur skip)
+    for prev_skip in (0, 1):
+        for cur_skip in (0, 1):
+            max_length = min(len(prev_norm) - prev_skip, len(cur_norm) - cur_skip)
+            for length in range(max_length, 0, -1):
+                if (prev_skip or cur_skip) and (length < 2):
+                    # A single word next to a skipped one is too weak a match
+                    break
+
+                prev_end = len(prev_norm) - prev_skip
+                if (
+                    prev_norm[prev_end - length : prev_end]
+                    == cur_norm[cur_skip : cur_skip + length]
+                ):
+                    if length > best_length:
+                        best_length, best_skips = length, (prev_skip, cur_skip)
+                    break
+
+    if best_length == 0:
+        return previous + current
+
+    # The later window saw what follows the overlap, so its punctuation and
+    # capitalization are kept there
+    prev_skip, cur_skip = best_skips
+    return previous[: len(previous) - prev_skip - best_length] + current[cur_skip:]
+
+
+def merge_texts(texts: Sequence[str]) -> str:
+    """Stitch the texts of overlapping windows into one transcript."""
+    words: List[str] = []
+    for text in texts:
+        words = merge_overlap(words, text.split())
+
+    return " ".join(words)
+
+
+async def transcribe_long(
+    transcriber: Transcriber,
+    audio: np.ndarray,
+    window_seconds: float,
+    overlap_seconds: float = 2.0,
+    search_seconds: float = 2.0,
+    max_parallel: int = 4,
+) -> str:
+    """Transcribe 16kHz mono float32 audio in overlapping windows.
+
+    Windows are views into audio, and at most max_parallel are submitted
+    at once, so they are batched (and spread over replicas) without
+    crowding out other requests.
+    """
+    windows = split_windows(
+        audio,
+        int(window_seconds * TARGET_RATE),
+        int(overlap_seconds * TARGET_RATE),
+        int(search_seconds * TARGET_RATE),
+    )
+    _LOGGER.debug("Transcribing %s window(s)", len(windows))
+
+    slots = asyncio.Semaphore(max(1, max_parallel))
+
+    async def transcribe_window(start: int, end: int) -> str:
+        async with slots:
+            return await transcriber.transcribe(audio[start:end])
+
+    texts = await asyncio.gather(
+        *(transcribe_window(start, end) for start, end in windows)
+    )
+    return merge_texts(texts)
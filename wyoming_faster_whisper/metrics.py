@@ -0,0 +1,391 @@
+"""Prometheus-style metrics and an optional HTTP endpoint to scrape them."""
+import asyncio
+import logging
+import math
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterator, List, Optional, Sequence, Tuple, TypeVar
+
+_LOGGER = logging.getLogger(__name__)
+
+_LabelValues = Tuple[str, ...]
+
+LATENCY_BUCKETS = (
+    0.001,
+    0.0025,
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1.0,
+    2.5,
+    5.0,
+    10.0,
+    30.0,
+)
+RATIO_BUCKETS = (0.01, 0.02, 0.05, 0.1, 0.2, 0.3, 0.5, 0.75, 1.0, 1.5, 2.0, 5.0)
+SCORE_BUCKETS = (0.1, 0.2, 0.3, 0.35, 0.4, 0.5, 0.6, 0.7, 0.8, 0.9, 1.0)
+SIZE_BUCKETS = (1, 2, 4, 8, 16, 32, 64)
+
+
+def _format_labels(names: Sequence[str], values: _LabelValues, extra: str = "") -> str:
+    pairs = [f'{name}="{value}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _format_value(value: float) -> str:
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+
+    return repr(float(value))
+
+
+class _Metric:
+    TYPE = ""
+
+    def __init__(self, name: str, help_text: str, labels: Sequence[str] = ()) -> None:
+        self.name = name
+        self.help_text = help_text
+        self.label_names = tuple(labels)
+        self._lock = threading.Lock()
+
+    def _key(self, labels: Dict[str, str]) -> _LabelValues:
+        return tuple(str(labels.get(name, "")) for name in self.label_names)
+
+    def render(self) -> List[str]:
+        """Lines in the Prometheus text exposition format."""
+        return [
+            f"# HELP {self.name} {self.help_text}",
+            f"# TYPE {self.name} {self.TYPE}",
+        ]
+
+
+class Counter(_Metric):
+    """Monotonically increasing count."""
+
+    TYPE = "counter"
+
+    def __init__(self, name: str, help_text: str, labels: Sequence[str] = ()) -> None:
+        super().__init__(name, help_text, labels)
+        self._values: Dict[_LabelValues, float] = {}
+
+    def inc(self, amount: float = 1.0, **labels: str) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def get(self, **labels: str) -> float:
+        return self._values.get(self._key(labels), 0.0)
+
+    def render(self) -> List[str]:
+        lines = super().render()
+        with self._lock:
+            for key, value in sorted(self._values.items()):
+                labels = _format_labels(self.label_names, key)
+                lines.append(f"{self.name}{labels} {_format_value(value)}")
+
+        return lines
+
+
+class Gauge(_Metric):
+    """Value that can go up and down, or is read from a callback."""
+
+    TYPE = "gauge"
+
+    def __init__(self, name: str, help_text: str, labels: Sequence[str] = ()) -> None:
+        super().__init__(name, help_text, labels)
+        self._values: Dict[_LabelValues, float] = {}
+        self._callbacks: Dict[_LabelValues, Callable[[], float]] = {}
+
+    def set(self, value: float, **labels: str) -> None:
+        with self._lock:
+            self._values[self._key(labels)] = value
+
+    def inc(self, amount: float = 1.0, **labels: str) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def dec(self, amount: float = 1.0, **labels: str) -> None:
+        self.inc(-amount, **labels)
+
+    def set_function(self, function: Callable[[], float], **labels: str) -> None:
+        """Read the value from function at scrape time."""
+        with self._lock:
+            self._callbacks[self._key(labels)] = function
+
+    def get(self, **labels: str) -> float:
+        key = self._key(labels)
+        if key in self._callbacks:
+            return float(self._callbacks[key]())
+
+        return self._values.get(key, 0.0)
+
+    def render(self) -> List[str]:
+        lines = super().render()
+        with self._lock:
+            values = dict(self._values)
+            callbacks = dict(self._callbacks)
+
+        for key, function in callbacks.items():
+            try:
+                values[key] = float(function())
+            except Exception:  # pylint: disable=broad-except
+                _LOGGER.exception("Failed to read gauge %s", self.name)
+
+        for key, value in sorted(values.items()):
+            labels = _format_labels(self.label_names, key)
+            lines.append(f"{self.name}{labels} {_format_value(value)}")
+
+        return lines
+
+
+class Histogram(_Metric):
+    """Distribution of observed values in cumulative buckets."""
+
+    TYPE = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        help_text: str,
+        labels: Sequence[str] = (),
+        buckets: Sequence[float] = LATENCY_BUCKETS,
+    ) -> None:
+        super().__init__(name, help_text, labels)
+        self.buckets = tuple(sorted(buckets)) + (math.inf,)
+        self._counts: Dict[_LabelValues, List[int]] = {}
+        self._sums: Dict[_LabelValues, float] = {}
+
+    def observe(self, value: float, **labels: str) -> None:
+        key = self._key(labels)
+        with self._lock:
+            counts = self._counts.get(key)
+            if counts is None:
+                counts = self._counts[key] = [0] * len(self.buckets)
+                self._sums[key] = 0.0
+
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    counts[i] += 1
+                    break
+
+            self._sums[key] += value
+
+    @contextmanager
+    def time(self, **labels: str) -> Iterator[None]:
+        """Observe the duration of a block in seconds."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def count(self, **labels: str) -> int:
+        return sum(self._counts.get(self._key(labels), []))
+
+    def render(self) -> List[str]:
+        lines = super().render()
+        with self._lock:
+            for key in sorted(self._counts):
+                cumulative = 0
+                for bound, count in zip(self.buckets, self._counts[key]):
+                    cumulative += count
+                    labels = _format_labels(
+                        self.label_names, key, f'le="{_format_value(bound)}"'
+                    )
+                    lines.append(f"{self.name}_bucket{labels} {cumulative}")
+
+                labels = _format_labels(self.label_names, key)
+                lines.append(
+                    f"{self.name}_sum{labels} {_format_value(self._sums[key])}"
+                )
+                lines.append(f"{self.name}_count{labels} {cumulative}")
+
+        return lines
+
+
+_MetricT = TypeVar("_MetricT", bound=_Metric)
+
+
+class MetricsRegistry:
+    """Collection of metrics rendered together."""
+
+    def __init__(self) -> None:
+        self._metrics: Dict[str, _Metric] = {}
+
+    def register(self, metric: _MetricT) -> _MetricT:
+        self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name: str, help_text: str, labels: Sequence[str] = ()) -> Counter:
+        return self.register(Counter(name, help_text, labels))
+
+    def gauge(self, name: str, help_text: str, labels: Sequence[str] = ()) -> Gauge:
+        return self.register(Gauge(name, help_text, labels))
+
+    def histogram(
+        self,
+        name: str,
+        help_text: str,
+        labels: Sequence[str] = (),
+        buckets: Sequence[float] = LATENCY_BUCKETS,
+    ) -> Histogram:
+        return self.register(Histogram(name, help_text, labels, buckets))
+
+    def render(self) -> str:
+        """All metrics in the Prometheus text exposition format."""
+        lines: List[str] = []
+        for metric in self._metrics.values():
+            lines.extend(metric.render())
+
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = MetricsRegistry()
+
+REQUESTS = REGISTRY.counter(
+    "wyoming_asr_requests_total", "Transcription requests by outcome", ("outcome",)
+)
+STAGE_SECONDS = REGISTRY.histogram(
+    "wyoming_asr_stage_seconds", "Time spent in each request stage", ("stage",)
+)
+QUEUE_WAIT_SECONDS = REGISTRY.histogram(
+    "wyoming_asr_queue_wait_seconds",
+    "Time utterances wait for the ASR model (batch queue)",
+)
+QUEUE_DEPTH = REGISTRY.gauge(
+    "wyoming_asr_queue_depth", "Utterances waiting for the ASR model"
+)
+REPLICA_PENDING = REGISTRY.gauge(
+    "wyoming_asr_replica_pending",
+    "Utterances queued or being transcribed per model replica",
+    ("replica",),
+)
+BATCH_SIZE = REGISTRY.histogram(
+    "wyoming_asr_batch_size", "Utterances per model call", buckets=SIZE_BUCKETS
+)
+AUDIO_SECONDS = REGISTRY.histogram(
+    "wyoming_asr_audio_seconds",
+    "Duration of transcribed audio",
+    buckets=(0.5, 1.0, 2.0, 3.0, 5.0, 10.0, 30.0, 60.0, 300.0),
+)
+REAL_TIME_FACTOR = REGISTRY.histogram(
+    "wyoming_asr_real_time_factor",
+    "Processing time divided by audio duration",
+    buckets=RATIO_BUCKETS,
+)
+ACTIVE_CONNECTIONS = REGISTRY.gauge(
+    "wyoming_asr_active_connections", "Open Wyoming connections"
+)
+ADMISSION = REGISTRY.counter(
+    "wyoming_asr_admission_total",
+    "Admission control decisions (admitted, rejected, timed_out, truncated)",
+    ("result",),
+)
+ADMISSION_REQUESTS = REGISTRY.gauge(
+    "wyoming_asr_admission_requests",
+    "Requests holding (in_flight) or waiting for (queued) a transcription slot",
+    ("state",),
+)
+BUFFER_POOL_BUFFERS = REGISTRY.gauge(
+    "wyoming_asr_buffer_pool_buffers",
+    "Pooled audio buffers by kind (pcm, float32) and state (in_use, free)",
+    ("kind", "state"),
+)
+BUFFER_POOL_BYTES = REGISTRY.gauge(
+    "wyoming_asr_buffer_pool_bytes",
+    "Memory held by pooled audio buffers by kind and state",
+    ("kind", "state"),
+)
+BUFFER_POOL_REQUESTS = REGISTRY.counter(
+    "wyoming_asr_buffer_pool_requests_total",
+    "Buffer checkouts (hit, miss) and returns that weren't kept (discarded)",
+    ("kind", "result"),
+)
+CACHE_LOOKUPS = REGISTRY.counter(
+    "wyoming_asr_cache_lookups_total",
+    "Result cache lookups by cache and result (hit_memory, hit_disk, miss)",
+    ("cache", "result"),
+)
+CASCADE_REQUESTS = REGISTRY.counter(
+    "wyoming_asr_cascade_requests_total",
+    "Utterances served by each model tier (small, large) and why",
+    ("tier", "reason"),
+)
+CASCADE_CONFIDENCE = REGISTRY.histogram(
+    "wyoming_asr_cascade_confidence",
+    "Confidence of small model transcripts",
+    buckets=SCORE_BUCKETS,
+)
+SPEAKER_SCORE = REGISTRY.histogram(
+    "wyoming_asr_speaker_match_score",
+    "Similarity of the best matching enrolled speaker",
+    buckets=SCORE_BUCKETS,
+)
+SPEAKER_PARTIALS = REGISTRY.counter(
+    "wyoming_asr_speaker_partials_total",
+    "Partial windows of incremental speaker ID (embedded, or reused when finished)",
+    ("result",),
+)
+SPEAKER_RESULTS = REGISTRY.counter(
+    "wyoming_asr_speaker_results_total",
+    "Speaker identification results",
+    ("result",),
+)
+
+
+async def _handle_scrape(
+    registry: MetricsRegistry,
+    reader: asyncio.StreamReader,
+    writer: asyncio.StreamWriter,
+) -> None:
+    try:
+        request_line = await reader.readline()
+        # Skip headers
+        while (await reader.readline()) not in (b"\r\n", b"\n", b""):
+            pass
+
+        parts = request_line.decode("latin-1").split()
+        if (
+            (len(parts) >= 2)
+            and (parts[0] == "GET")
+            and (parts[1].split("?")[0] in ("/", "/metrics"))
+        ):
+            status, body = "200 OK", registry.render().encode("utf-8")
+        else:
+            status, body = "404 Not Found", b"Not Found\n"
+
+        writer.write(
+            (
+                f"HTTP/1.1 {status}\r\n"
+                "Content-Type: text/plain; version=0.0.4; charset=utf-8\r\n"
+                f"Content-Length: {len(body)}\r\n"
+                "Connection: close\r\n\r\n"
+            ).encode("latin-1")
+            + body
+        )
+        await writer.drain()
+    except (ConnectionError, asyncio.IncompleteReadError):
+        pass
+    finally:
+        writer.close()
+
+
+async def start_metrics_server(
+    host: str, port: int, registry: Optional[MetricsRegistry] = None
+) -> asyncio.Server:
+    """Serve metrics over HTTP at /metrics."""
+    scraped = registry if registry is not None else REGISTRY
+    server = await asyncio.start_server(
+        lambda reader, writer: _handle_scrape(scraped, reader, writer), host, port
+    )
+    _LOGGER.info("Serving metrics on http://%s:%s/metrics", host, port)
+    return server
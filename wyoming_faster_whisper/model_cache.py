@@ -0,0 +1,72 @@
+"""Extracted copy of a restored NeMo model for fast restarts."""
+import logging
+import os
+import shutil
+import tarfile
+import tempfile
+from pathlib import Path
+from typing import Any, Union
+
+_LOGGER = logging.getLogger(__name__)
+
+CACHE_DIR_NAME = "model-cache"
+_COMPLETE_MARKER = ".complete"
+
+
+def model_cache_dir(data_dir: Union[str, Path], model_name: str) -> Path:
+    """Directory holding the extracted model inside the data directory."""
+    safe_name = model_name.strip("/").replace("/", "--")
+    return Path(data_dir) / CACHE_DIR_NAME / safe_name
+
+
+def is_cached(cache_dir: Union[str, Path]) -> bool:
+    """True if a complete model has been extracted to cache_dir."""
+    return (Path(cache_dir) / _COMPLETE_MARKER).is_file()
+
+
+def save_model_cache(model: Any, cache_dir: Union[str, Path]) -> None:
+    """Save a restored model and unpack it so it can be loaded in place.
+
+    The .nemo archive written by save_to is extracted into a temporary
+    directory next to cache_dir and moved into place once complete.
+    """
+    cache_dir = Path(cache_dir)
+    cache_dir.parent.mkdir(parents=True, exist_ok=True)
+
+    temp_dir = Path(tempfile.mkdtemp(dir=cache_dir.parent, prefix=".tmp-"))
+    try:
+        archive_path = temp_dir / "model.nemo"
+        model.save_to(str(archive_path))
+
+        extract_dir = temp_dir / "extracted"
+        with tarfile.open(archive_path, "r:*") as archive:
+            archive.extractall(extract_dir)  # nosec - archive we just wrote
+
+        (extract_dir / _COMPLETE_MARKER).touch()
+        if cache_dir.exists():
+            shutil.rmtree(cache_dir)
+
+        os.replace(extract_dir, cache_dir)
+        _LOGGER.info("Cached model in %s", cache_dir)
+    finally:
+        shutil.rmtree(temp_dir, ignore_errors=True)
+
+
+def restore_cached_model(cache_dir: Union[str, Path], device: str) -> Any:
+    """Restore a NeMo ASR model from an extracted cache directory.
+
+    Skips the hub lookup and unpacking of the .nemo archive done by
+    from_pretrained.
+    """
+    import nemo.collections.asr as nemo_asr
+    import torch
+    from nemo.core.connectors.save_restore_connector import SaveRestoreConnector
+
+    connector = SaveRestoreConnector()
+    connector.model_extracted_dir = str(cache_dir)
+
+    return nemo_asr.models.ASRModel.restore_from(
+        restore_path=str(cache_dir),
+        map_location=torch.device(device),
+        save_restore_connector=connector,
+    )
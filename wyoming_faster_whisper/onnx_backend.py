@@ -0,0 +1,491 @@
+"""ONNX Runtime backend for NeMo transducer (RNNT/TDT) models.
+
+The NeMo model is exported once to an encoder and a combined
+decoder/joint network in the data directory. At runtime only numpy and
+onnxruntime are needed: log-mel features are computed in numpy and the
+transducer is decoded greedily, batched across utterances.
+"""
+import json
+import logging
+import os
+import shutil
+import tempfile
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence, Tuple, Union
+
+import numpy as np
+
+from .asr_backend import BACKEND_ONNX, AsrBackend
+from .batching import (
+    DETAIL_CONFIDENCE,
+    DETAIL_TEXT,
+    DETAIL_WORDS,
+    Transcription,
+    WordTiming,
+)
+from .features import MelFrontEnd
+
+_LOGGER = logging.getLogger(__name__)
+
+EXPORT_DIR_NAME = "onnx"
+ENCODER_FILE = "encoder-model.onnx"
+DECODER_JOINT_FILE = "decoder_joint-model.onnx"
+CONFIG_FILE = "config.json"
+CONFIG_VERSION = 1
+
+_LOG_ZERO_GUARD = 2**-24
+_NORMALIZE_EPSILON = 1e-5
+_ONNX_DTYPES = {
+    "tensor(float)": np.float32,
+    "tensor(int32)": np.int32,
+    "tensor(int64)": np.int64,
+}
+
+
+def onnx_export_dir(
+    data_dir: Union[str, Path], model_name: str, quantize: bool = False
+) -> Path:
+    """Directory holding the exported model inside the data directory."""
+    safe_name = model_name.strip("/").replace("/", "--")
+    if quantize:
+        safe_name += "-int8"
+
+    return Path(data_dir) / EXPORT_DIR_NAME / safe_name
+
+
+def is_exported(export_dir: Union[str, Path]) -> bool:
+    """True if a complete export exists in export_dir."""
+    # Config is written last
+    return (Path(export_dir) / CONFIG_FILE).is_file()
+
+
+# -----------------------------------------------------------------------------
+
+
+class LogMelFeatures:
+    """Numpy version of NeMo's AudioToMelSpectrogramPreprocessor at inference."""
+
+    def __init__(
+        self,
+        sample_rate: int = 16000,
+        window_size: float = 0.025,
+        window_stride: float = 0.01,
+        n_fft: Optional[int] = None,
+        features: int = 128,
+        preemph: Optional[float] = 0.97,
+        normalize: str = "per_feature",
+        lowfreq: float = 0.0,
+        highfreq: Optional[float] = None,
+        pad_to: int = 0,
+        pad_value: float = 0.0,
+    ) -> None:
+        self.front_end = MelFrontEnd(
+            sample_rate=sample_rate,
+            win_length=int(window_size * sample_rate),
+            hop_length=int(window_stride * sample_rate),
+            n_fft=n_fft,
+            n_mels=features,
+            preemph=preemph,
+            fmin=lowfreq,
+            fmax=highfreq,
+        )
+        self.sample_rate = sample_rate
+        self.hop_length = self.front_end.hop_length
+        self.normalize = normalize
+        self.pad_to = pad_to
+        self.pad_value = pad_value
+
+    @staticmethod
+    def from_config(config: Dict[str, Any]) -> "LogMelFeatures":
+        return LogMelFeatures(
+            **{
+                key: config[key]
+                for key in (
+                    "sample_rate",
+                    "window_size",
+                    "window_stride",
+                    "n_fft",
+                    "features",
+                    "preemph",
+                    "normalize",
+                    "lowfreq",
+                    "highfreq",
+                    "pad_to",
+                    "pad_value",
+                )
+                if key in config
+            }
+        )
+
+    def num_frames(self, num_samples: int) -> int:
+        return self.front_end.num_frames(num_samples)
+
+    def __call__(self, audio: np.ndarray) -> np.ndarray:
+        """Features for one utterance with shape (features, frames)."""
+        features = np.log(self.front_end(audio).T + _LOG_ZERO_GUARD)
+
+        if (self.normalize == "per_feature") and (features.shape[1] > 1):
+            mean = features.mean(axis=1, keepdims=True)
+            std = features.std(axis=1, ddof=1, keepdims=True) + _NORMALIZE_EPSILON
+            features = (features - mean) / std
+
+        return features.astype(np.float32)
+
+    def batch(self, audios: Sequence[np.ndarray]) -> Tuple[np.ndarray, np.ndarray]:
+        """Padded features (batch, features, frames) and frame counts."""
+        utterances = [self(audio) for audio in audios]
+        lengths = np.array([u.shape[1] for u in utterances], dtype=np.int64)
+        max_frames = int(lengths.max())
+        if self.pad_to > 0:
+            max_frames = int(np.ceil(max_frames / self.pad_to) * self.pad_to)
+
+        batch = np.full(
+            (len(utterances), self.front_end.n_mels, max_frames),
+            self.pad_value,
+            dtype=np.float32,
+        )
+        for i, utterance in enumerate(utterances):
+            batch[i, :, : utterance.shape[1]] = utterance
+
+        return batch, lengths
+
+
+# -----------------------------------------------------------------------------
+
+
+class OnnxAsrModel(AsrBackend):
+    """Exported transducer decoded greedily with onnxruntime sessions."""
+
+    name = BACKEND_ONNX
+    supports_word_timings = True
+    supports_confidence = True
+
+    def __init__(
+        self, encoder: Any, decoder_joint: Any, config: Dict[str, Any]
+    ) -> None:
+        self.encoder = encoder
+        self.decoder_joint = decoder_joint
+        self.vocabulary: List[str] = config["vocabulary"]
+        self.blank = len(self.vocabulary)
+        self.durations: List[int] = list(config.get("durations") or [])
+        self.max_symbols = int(config.get("max_symbols_per_step") or 10)
+        self.state_shape = (int(config["pred_rnn_layers"]), int(config["pred_hidden"]))
+        self.features = LogMelFeatures.from_config(config.get("preprocessor", {}))
+
+        self._encoder_inputs = encoder.get_inputs()
+        self._decoder_inputs = decoder_joint.get_inputs()
+
+    @staticmethod
+    def load(
+        export_dir: Union[str, Path],
+        device: str = "cpu",
+        intra_op_threads: int = 0,
+        inter_op_threads: int = 0,
+    ) -> "OnnxAsrModel":
+        """Create onnxruntime sessions for an exported model."""
+        import onnxruntime as ort
+
+        export_dir = Path(export_dir)
+        config = json.loads((export_dir / CONFIG_FILE).read_text(encoding="utf-8"))
+
+        options = ort.SessionOptions()
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        if intra_op_threads > 0:
+            options.intra_op_num_threads = intra_op_threads
+        if inter_op_threads > 0:
+            options.inter_op_num_threads = inter_op_threads
+            options.execution_mode = ort.ExecutionMode.ORT_PARALLEL
+
+        providers = ["CPUExecutionProvider"]
+        if (device == "cuda") and (
+            "CUDAExecutionProvider" in ort.get_available_providers()
+        ):
+            providers.insert(0, "CUDAExecutionProvider")
+
+        _LOGGER.info(
+            "Loading ONNX model from %s (providers: %s)", export_dir, providers
+        )
+        encoder = ort.InferenceSession(
+            str(export_dir / ENCODER_FILE), sess_options=options, providers=providers
+        )
+        decoder_joint = ort.InferenceSession(
+            str(export_dir / DECODER_JOINT_FILE),
+            sess_options=options,
+            providers=providers,
+        )
+
+        return OnnxAsrModel(encoder, decoder_joint, config)
+
+    def transcribe(
+        self, audio: Sequence[np.ndarray], batch_size: int = 4, **kwargs: Any
+    ) -> List[str]:
+        return [result.text for result in self._transcribe(audio, batch_size)]
+
+    def transcribe_words(
+        self, audio: Sequence[np.ndarray], batch_size: int = 4
+    ) -> List[Transcription]:
+        return self._transcribe(audio, batch_size, DETAIL_WORDS)
+
+    def transcribe_confidence(
+        self, audio: Sequence[np.ndarray], batch_size: int = 4
+    ) -> List[Transcription]:
+        return self._transcribe(audio, batch_size, DETAIL_CONFIDENCE)
+
+    def _transcribe(
+        self, audio: Sequence[np.ndarray], batch_size: int, detail: int = DETAIL_TEXT
+    ) -> List[Transcription]:
+        results: List[Transcription] = []
+        batch_size = max(1, batch_size)
+        for start in range(0, len(audio), batch_size):
+            batch = list(audio[start : start + batch_size])
+            non_empty = [i for i, samples in enumerate(batch) if len(samples) > 0]
+            batch_results = [Transcription("")] * len(batch)
+            if non_empty:
+                for i, result in zip(
+                    non_empty,
+                    self._transcribe_batch([batch[i] for i in non_empty], detail),
+                ):
+                    batch_results[i] = result
+
+            results.extend(batch_results)
+
+        return results
+
+    def _transcribe_batch(
+        self, audios: List[np.ndarray], detail: int = DETAIL_TEXT
+    ) -> List[Transcription]:
+        features, lengths = self.features.batch(audios)
+        encoded, encoded_lengths = self.encoder.run(
+            None,
+            {
+                self._encoder_inputs[0].name: features,
+                self._encoder_inputs[1].name: lengths.astype(
+                    _ONNX_DTYPES[self._encoder_inputs[1].type]
+                ),
+            },
+        )[:2]
+
+        encoded_lengths = np.asarray(encoded_lengths)
+        if detail == DETAIL_TEXT:
+            token_ids = self._greedy_decode(encoded, encoded_lengths)
+            return [Transcription(self._detokenize(ids)) for ids in token_ids]
+
+        token_probs: List[List[float]] = []
+        if detail == DETAIL_CONFIDENCE:
+            token_ids = self._greedy_decode(
+                encoded, encoded_lengths, token_probs=token_probs
+            )
+            return [
+                Transcription(self._detokenize(ids), (), _mean_confidence(probs))
+                for ids, probs in zip(token_ids, token_probs)
+            ]
+
+        token_frames: List[List[int]] = []
+        token_ids = self._greedy_decode(
+            encoded, encoded_lengths, token_frames, token_probs
+        )
+
+        # Each encoder frame covers several feature frames
+        subsampling = max(1, round(int(lengths.max()) / max(1, encoded_lengths.max())))
+        frame_seconds = (
+            subsampling * self.features.hop_length / self.features.sample_rate
+        )
+        return [
+            Transcription(
+                self._detokenize(ids),
+                self._word_timings(ids, frames, frame_seconds),
+                _mean_confidence(probs),
+            )
+            for ids, frames, probs in zip(token_ids, token_frames, token_probs)
+        ]
+
+    def _greedy_decode(
+        self,
+        encoded: np.ndarray,
+        encoded_lengths: np.ndarray,
+        token_frames: Optional[List[List[int]]] = None,
+        token_probs: Optional[List[List[float]]] = None,
+    ) -> List[List[int]]:
+        """Greedy transducer decoding of encoder output (batch, dim, frames).
+
+        Each step runs the decoder/joint once for all unfinished utterances.
+        With TDT durations, a step may skip several frames at once. If
+        token_frames is given, the encoder frame of each token is added to it,
+        and likewise the token's probability to token_probs.
+        """
+        batch_size, _, num_frames = encoded.shape
+        target_dtype = _ONNX_DTYPES[self._decoder_inputs[1].type]
+        length_dtype = _ONNX_DTYPES[self._decoder_inputs[2].type]
+
+        frame = np.zeros(batch_size, dtype=np.int64)
+        symbols = np.zeros(batch_size, dtype=np.int64)
+        last_token = np.full(batch_size, self.blank, dtype=np.int64)
+        states = [
+            np.zeros((self.state_shape[0], batch_size, self.state_shape[1]), np.float32)
+            for _ in self._decoder_inputs[3:]
+        ]
+        tokens: List[List[int]] = [[] for _ in range(batch_size)]
+        if token_frames is not None:
+            token_frames.extend([] for _ in range(batch_size))
+        if token_probs is not None:
+            token_probs.extend([] for _ in range(batch_size))
+        durations = np.array(self.durations, dtype=np.int64)
+
+        active = np.flatnonzero(frame < encoded_lengths)
+        while active.size > 0:
+            feed = {
+                self._decoder_inputs[0].name: encoded[
+                    active, :, np.minimum(frame[active], num_frames - 1)
+                ][:, :, None],
+                self._decoder_inputs[1]
+                .name: last_token[active, None]
+                .astype(target_dtype),
+                self._decoder_inputs[2].name: np.ones(active.size, dtype=length_dtype),
+            }
+            for state_input, state in zip(self._decoder_inputs[3:], states):
+                feed[state_input.name] = state[:, active]
+
+            outputs = self.decoder_joint.run(None, feed)
+            logits = outputs[0].reshape(active.size, -1)
+            new_states = outputs[-len(states) :] if states else []
+
+            token_logits = logits[:, : self.blank + 1]
+            token = token_logits.argmax(axis=1)
+            is_blank = token == self.blank
+            if token_probs is not None:
+                # Softmax of the winner; also right if the joint emits log-probs
+                shifted = token_logits - token_logits.max(axis=1, keepdims=True)
+                probs = 1.0 / np.exp(shifted).sum(axis=1)
+            if durations.size > 0:
+                advance = durations[logits[:, self.blank + 1 :].argmax(axis=1)]
+                advance[is_blank & (advance == 0)] = 1
+            else:
+                advance = is_blank.astype(np.int64)
+
+            emitted = active[~is_blank]
+            for i, token_id in zip(emitted, token[~is_blank]):
+                tokens[i].append(int(token_id))
+                if token_frames is not None:
+                    token_frames[i].append(int(frame[i]))
+
+            if token_probs is not None:
+                for i, prob in zip(emitted, probs[~is_blank]):
+                    token_probs[i].append(float(prob))
+
+            last_token[emitted] = token[~is_blank]
+            for state, new_state in zip(states, new_states):
+                state[:, emitted] = new_state[:, ~is_blank]
+
+            # Limit symbols per frame so decoding always makes progress
+            symbols[emitted] += 1
+            advance[(advance == 0) & (symbols[active] >= self.max_symbols)] = 1
+            frame[active] += advance
+            symbols[active[advance > 0]] = 0
+
+            active = active[frame[active] < encoded_lengths[active]]
+
+        return tokens
+
+    def _detokenize(self, token_ids: List[int]) -> str:
+        text = "".join(self.vocabulary[i] for i in token_ids)
+        return text.replace("▁", " ").strip()
+
+    def _word_timings(
+        self, token_ids: List[int], frames: List[int], frame_seconds: float
+    ) -> Tuple[WordTiming, ...]:
+        # [text, start, end] per word; "▁" starts a new word
+        words: List[List[Any]] = []
+        for token_id, frame in zip(token_ids, frames):
+            piece = self.vocabulary[token_id]
+            start, end = frame * frame_seconds, (frame + 1) * frame_seconds
+            if piece.startswith("▁") or (not words):
+                words.append([piece.lstrip("▁"), start, end])
+            else:
+                words[-1][0] += piece
+                words[-1][2] = end
+
+        return tuple(WordTiming(word, start, end) for word, start, end in words if word)
+
+
+# -----------------------------------------------------------------------------
+
+
+def export_onnx_model(
+    model: Any, export_dir: Union[str, Path], quantize: bool = False
+) -> None:
+    """Export a NeMo transducer model for the ONNX backend.
+
+    Writes to a temporary directory next to export_dir and moves it into
+    place once complete. With quantize, weights are quantized to int8
+    (dynamic quantization).
+    """
+    export_dir = Path(export_dir)
+    export_dir.parent.mkdir(parents=True, exist_ok=True)
+    temp_dir = Path(tempfile.mkdtemp(dir=export_dir.parent, prefix=".tmp-"))
+    try:
+        _LOGGER.info("Exporting model to ONNX (this may take a while)")
+        model.eval()
+        model.export(str(temp_dir / "model.onnx"))
+
+        if quantize:
+            from onnxruntime.quantization import QuantType, quantize_dynamic
+
+            for file_name in (ENCODER_FILE, DECODER_JOINT_FILE):
+                float_path = temp_dir / file_name
+                quantized_path = temp_dir / f"{file_name}.int8"
+                _LOGGER.info("Quantizing %s to int8", file_name)
+                quantize_dynamic(
+                    str(float_path),
+                    str(quantized_path),
+                    weight_type=QuantType.QInt8,
+                    use_external_data_format=True,
+                )
+                os.replace(quantized_path, float_path)
+
+        config = _export_config(model)
+        (temp_dir / CONFIG_FILE).write_text(json.dumps(config), encoding="utf-8")
+
+        if export_dir.exists():
+            shutil.rmtree(export_dir)
+
+        os.replace(temp_dir, export_dir)
+        _LOGGER.info("Exported ONNX model to %s", export_dir)
+    finally:
+        shutil.rmtree(temp_dir, ignore_errors=True)
+
+
+def _export_config(model: Any) -> Dict[str, Any]:
+    """Everything needed to decode without NeMo."""
+    cfg = model.cfg
+    preprocessor = cfg.preprocessor
+    vocab_size = model.tokenizer.vocab_size
+    durations = list(cfg.get("model_defaults", {}).get("tdt_durations", []) or [])
+    max_symbols = cfg.get("decoding", {}).get("greedy", {}).get("max_symbols", 10)
+
+    return {
+        "version": CONFIG_VERSION,
+        "vocabulary": [
+            model.tokenizer.ids_to_tokens([i])[0] for i in range(vocab_size)
+        ],
+        "durations": durations,
+        "max_symbols_per_step": max_symbols or 10,
+        "pred_rnn_layers": model.decoder.pred_rnn_layers,
+        "pred_hidden": model.decoder.pred_hidden,
+        "preprocessor": {
+            "sample_rate": preprocessor.get("sample_rate", 16000),
+            "window_size": preprocessor.get("window_size", 0.025),
+            "window_stride": preprocessor.get("window_stride", 0.01),
+            "n_fft": preprocessor.get("n_fft", None),
+            "features": preprocessor.get("features", 128),
+            "preemph": preprocessor.get("preemph", 0.97),
+            "normalize": preprocessor.get("normalize", "per_feature"),
+            "lowfreq": preprocessor.get("lowfreq", 0.0),
+            "highfreq": preprocessor.get("highfreq", None),
+            "pad_to": preprocessor.get("pad_to", 0),
+            "pad_value": preprocessor.get("pad_value", 0.0),
+        },
+    }
+
+
+def _mean_confidence(token_probs: List[float]) -> Optional[float]:
+    return float(np.mean(token_probs)) if token_probs else None
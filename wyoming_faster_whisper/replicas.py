@@ -0,0 +1,164 @@
+"""Several model replicas behind a least-loaded dispatcher."""
+import logging
+import os
+from typing import List, Optional, Protocol, Sequence, Set
+
+import numpy as np
+
+from .batching import Transcription, TranscriptionBatcher
+
+_LOGGER = logging.getLogger(__name__)
+
+
+class Transcriber(Protocol):
+    """Anything that handlers can submit utterances to."""
+
+    @property
+    def supports_word_timings(self) -> bool:
+        """True if transcripts can include when each word was spoken."""
+
+    @property
+    def supports_confidence(self) -> bool:
+        """True if transcripts can include how sure the model is."""
+
+    async def transcribe(self, audio: np.ndarray) -> str:
+        """Transcribe 16kHz mono float32 audio."""
+
+    async def transcribe_confidence(self, audio: np.ndarray) -> Transcription:
+        """Like transcribe, with confidence (but no word timings) if supported."""
+
+    async def transcribe_words(self, audio: np.ndarray) -> Transcription:
+        """Like transcribe, with word timings and confidence if supported."""
+
+
+class TranscriberService(Transcriber, Protocol):
+    """A Transcriber with its own workers, which reports its load."""
+
+    @property
+    def queue_size(self) -> int:
+        """Number of utterances waiting for a batch."""
+
+    @property
+    def pending(self) -> int:
+        """Number of utterances queued or being transcribed."""
+
+    def start(self) -> None:
+        """Start the workers on the running event loop."""
+
+    async def stop(self) -> None:
+        """Stop the workers."""
+
+
+class ReplicaPool:
+    """Routes each utterance to the least-loaded of several batchers.
+
+    Every batcher owns its own model replica and executor, so replicas
+    transcribe in parallel. Load is the number of utterances queued or
+    being transcribed; ties go round-robin.
+    """
+
+    def __init__(self, batchers: Sequence[TranscriptionBatcher]) -> None:
+        if not batchers:
+            raise ValueError("At least one batcher is required")
+
+        self.batchers = list(batchers)
+        self._next = 0
+
+    def __len__(self) -> int:
+        return len(self.batchers)
+
+    @property
+    def queue_size(self) -> int:
+        """Number of utterances waiting for a batch on any replica."""
+        return sum(batcher.queue_size for batcher in self.batchers)
+
+    @property
+    def pending(self) -> int:
+        """Number of utterances queued or being transcribed."""
+        return sum(batcher.pending for batcher in self.batchers)
+
+    @property
+    def supports_word_timings(self) -> bool:
+        """True if every replica can report when each word was spoken."""
+        return all(batcher.supports_word_timings for batcher in self.batchers)
+
+    @property
+    def supports_confidence(self) -> bool:
+        """True if every replica can report how sure it is of a transcript."""
+        return all(batcher.supports_confidence for batcher in self.batchers)
+
+    def start(self) -> None:
+        for batcher in self.batchers:
+            batcher.start()
+
+    async def stop(self) -> None:
+        for batcher in self.batchers:
+            await batcher.stop()
+
+    def select(self) -> TranscriptionBatcher:
+        """Pick the replica with the fewest pending utterances."""
+        num_batchers = len(self.batchers)
+        best_index = self._next
+        for offset in range(1, num_batchers):
+            index = (self._next + offset) % num_batchers
+            if self.batchers[index].pending < self.batchers[best_index].pending:
+                best_index = index
+
+        self._next = (best_index + 1) % num_batchers
+        return self.batchers[best_index]
+
+    async def transcribe(self, audio: np.ndarray) -> str:
+        """Transcribe 16kHz mono float32 audio on the least-loaded replica."""
+        return await self.select().transcribe(audio)
+
+    async def transcribe_confidence(self, audio: np.ndarray) -> Transcription:
+        """Like transcribe, with confidence (but no word timings) if supported."""
+        return await self.select().transcribe_confidence(audio)
+
+    async def transcribe_words(self, audio: np.ndarray) -> Transcription:
+        """Like transcribe, with word timings and confidence if supported."""
+        return await self.select().transcribe_words(audio)
+
+
+def split_cpus(
+    num_replicas: int, cpus: Optional[Sequence[int]] = None
+) -> List[Set[int]]:
+    """Divide CPU cores into contiguous, non-overlapping groups per replica.
+
+    If there are fewer cores than replicas, groups are shared round-robin.
+    """
+    if cpus is None:
+        cpus = sorted(_available_cpus())
+
+    cpus = list(cpus)
+    if num_replicas <= len(cpus):
+        # Group sizes differ by at most one core
+        return [
+            set(int(cpu) for cpu in group)
+            for group in np.array_split(np.array(cpus), num_replicas)
+        ]
+
+    return [{cpus[i % len(cpus)]} for i in range(num_replicas)]
+
+
+def init_replica_thread(cpus: Optional[Set[int]] = None) -> None:
+    """Pin the calling worker thread to cores.
+
+    Only affinity is per thread: torch's thread count is process-wide, so it
+    is set once for all replicas (see torch_thread_budget).
+    """
+    if cpus and hasattr(os, "sched_setaffinity"):
+        # On Linux, pid 0 is the calling thread
+        os.sched_setaffinity(0, cpus)
+
+
+def torch_thread_budget(replica_cpus: Sequence[Optional[Set[int]]]) -> int:
+    """Number of distinct cores pinned across all replicas (0 if unpinned)."""
+    return len(set().union(*(cpus for cpus in replica_cpus if cpus)))
+
+
+def _available_cpus() -> Set[int]:
+    if hasattr(os, "sched_getaffinity"):
+        return set(os.sched_getaffinity(0))
+
+    return set(range(os.cpu_count() or 1))
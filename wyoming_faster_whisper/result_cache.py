@@ -0,0 +1,182 @@
+"""Caches of per-utterance results keyed on a hash of the audio."""
+import hashlib
+import logging
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Generic, Optional, Tuple, TypeVar, Union
+
+import numpy as np
+
+from .metrics import CACHE_LOOKUPS
+
+_LOGGER = logging.getLogger(__name__)
+
+TRANSCRIPT_CACHE_FILE = "transcripts.sqlite"
+_PRUNE_EVERY = 100  # writes between pruning the disk tier
+
+_T = TypeVar("_T")
+
+
+def audio_key(audio: np.ndarray) -> str:
+    """Hash of decoded 16kHz float32 audio.
+
+    Only bit-identical audio (e.g. a replayed recording) shares a key, so a
+    hit can never return another utterance's transcript.
+    """
+    samples = np.ascontiguousarray(audio, dtype=np.float32)
+    return hashlib.blake2b(samples.data, digest_size=16).hexdigest()
+
+
+class LruCache(Generic[_T]):
+    """Thread-safe in-memory cache with an entry limit and expiry."""
+
+    def __init__(self, max_entries: int = 1000, ttl: float = 3600.0) -> None:
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries: "OrderedDict[str, Tuple[float, _T]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: str) -> Optional[_T]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+
+            created, value = entry
+            if (self.ttl > 0) and ((time.monotonic() - created) > self.ttl):
+                del self._entries[key]
+                return None
+
+            self._entries.move_to_end(key)
+            return value
+
+    def put(self, key: str, value: _T) -> None:
+        if self.max_entries <= 0:
+            return
+
+        with self._lock:
+            self._entries[key] = (time.monotonic(), value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+
+class TranscriptCache:
+    """Transcripts in memory, optionally backed by SQLite on disk.
+
+    The disk tier survives restarts and is shared by worker processes.
+    Its keys are prefixed with namespace (e.g. the model name) so that
+    transcripts from a different model are never returned. Entries older
+    than ttl seconds are ignored and pruned.
+    """
+
+    def __init__(
+        self,
+        max_entries: int = 1000,
+        ttl: float = 3600.0,
+        path: Optional[Union[str, Path]] = None,
+        max_disk_entries: int = 100000,
+        namespace: str = "",
+    ) -> None:
+        self.memory: LruCache[str] = LruCache(max_entries, ttl)
+        self.ttl = ttl
+        self.namespace = namespace
+        self.max_disk_entries = max_disk_entries
+        self._db: Optional[sqlite3.Connection] = None
+        self._db_lock = threading.Lock()
+        self._writes = 0
+
+        if path is not None:
+            self._db = sqlite3.connect(str(path), check_same_thread=False, timeout=5)
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS transcripts "
+                "(key TEXT PRIMARY KEY, text TEXT NOT NULL, created REAL NOT NULL)"
+            )
+            self._db.commit()
+
+    @property
+    def has_disk(self) -> bool:
+        return self._db is not None
+
+    def get_memory(self, key: str) -> Optional[str]:
+        """Look up a transcript in memory only (fast enough for the event loop)."""
+        text = self.memory.get(key)
+        if text is not None:
+            CACHE_LOOKUPS.inc(cache="transcript", result="hit_memory")
+
+        return text
+
+    def get_disk(self, key: str) -> Optional[str]:
+        """Look up a transcript on disk after a memory miss.
+
+        Hits are promoted to memory. A None result counts as a miss.
+        """
+        row = None
+        if self._db is not None:
+            with self._db_lock:
+                row = self._db.execute(
+                    "SELECT text, created FROM transcripts WHERE key = ?",
+                    (self._disk_key(key),),
+                ).fetchone()
+
+        if (row is None) or ((self.ttl > 0) and ((time.time() - row[1]) > self.ttl)):
+            CACHE_LOOKUPS.inc(cache="transcript", result="miss")
+            return None
+
+        CACHE_LOOKUPS.inc(cache="transcript", result="hit_disk")
+        self.memory.put(key, row[0])
+        return row[0]
+
+    def put(self, key: str, text: str) -> None:
+        """Store a transcript in memory and on disk."""
+        self.memory.put(key, text)
+        if self._db is None:
+            return
+
+        try:
+            with self._db_lock:
+                self._db.execute(
+                    "INSERT OR REPLACE INTO transcripts (key, text, created) "
+                    "VALUES (?, ?, ?)",
+                    (self._disk_key(key), text, time.time()),
+                )
+                self._writes += 1
+                if (self._writes % _PRUNE_EVERY) == 0:
+                    self._prune()
+
+                self._db.commit()
+        except sqlite3.Error:
+            _LOGGER.exception("Failed to write transcript cache")
+
+    def close(self) -> None:
+        if self._db is not None:
+            with self._db_lock:
+                self._db.close()
+                self._db = None
+
+    def _disk_key(self, key: str) -> str:
+        return f"{self.namespace}:{key}" if self.namespace else key
+
+    def _prune(self) -> None:
+        assert self._db is not None
+        if self.ttl > 0:
+            self._db.execute(
+                "DELETE FROM transcripts WHERE created < ?", (time.time() - self.ttl,)
+            )
+
+        self._db.execute(
+            "DELETE FROM transcripts WHERE key NOT IN "
+            "(SELECT key FROM transcripts ORDER BY created DESC LIMIT ?)",
+            (self.max_disk_entries,),
+        )
@@ -1,19 +1,30 @@
 """Speaker identification using pre-computed voice embeddings."""
 import logging
-import pickle
-from typing import Dict, Optional
+from pathlib import Path
+from typing import TYPE_CHECKING, Dict, Hashable, List, Optional, Sequence, Tuple, Union
 
 import numpy as np
-from resemblyzer import VoiceEncoder
+
+from .embedding_store import load_index, load_pickle
+from .features import (
+    SPEAKER_FRONT_END,
+    UtteranceFeatures,
+    speaker_windows,
+    volume_gain,
+)
+from .metrics import SPEAKER_RESULTS, SPEAKER_SCORE
+from .speaker_index import POOLING_MAX, SpeakerIndex
+
+if TYPE_CHECKING:
+    from resemblyzer import VoiceEncoder
 
 _LOGGER = logging.getLogger(__name__)
 
 def load_embeddings(path: str) -> Dict[str, np.ndarray]:
-    """Load speaker embeddings from pickle file."""
+    """Load speaker embeddings from legacy pickle file."""
     _LOGGER.debug("Loading speaker embeddings from %s", path)
     try:
-        with open(path, "rb") as f:
-            embeddings = pickle.load(f)
+        embeddings = load_pickle(path)
         _LOGGER.info("Loaded embeddings for %d speakers", len(embeddings))
         return embeddings
     except Exception as e:
@@ -22,8 +33,8 @@ def load_embeddings(path: str) -> Dict[str, np.ndarray]:
 
 def identify_speaker(
     audio_input,
-    embeddings: Dict[str, np.ndarray],
-    encoder: VoiceEncoder,
+    embeddings: Union[Dict[str, np.ndarray], SpeakerIndex],
+    encoder: "VoiceEncoder",
     threshold: float = 0.35,
 ) -> Optional[str]:
     """
@@ -31,7 +42,7 @@ def identify_speaker(
     
     Args:
         audio_input: Path to audio file (str) or preprocessed audio array (np.ndarray)
-        embeddings: Dictionary of {speaker_name: embedding}
+        embeddings: Speaker index or dictionary of {speaker_name: embedding}
         encoder: Initialized VoiceEncoder instance
         threshold: Minimum similarity score (0-1) to consider a match
         
@@ -52,35 +63,176 @@ def identify_speaker(
         else:
             raise ValueError(f"Unsupported audio_input type: {type(audio_input)}")
         
-        # Find best matching speaker
-        best_speaker = None
-        best_score = -1
-        
-        _LOGGER.debug("Comparing against %d enrolled speakers", len(embeddings))
-        for speaker, ref_embedding in embeddings.items():
-            similarity = np.dot(embedding, ref_embedding)
-            if similarity > best_score:
-                best_score = similarity
-                best_speaker = speaker
-        
-        _LOGGER.debug(
-            "Best match: %s (score: %.2f, threshold: %.2f)",
-            best_speaker, best_score, threshold
-        )
-        
-        if best_score >= threshold:
-            _LOGGER.info(
-                "Identified speaker: %s (score: %.2f)",
-                best_speaker, best_score
-            )
-            return best_speaker
-            
-        _LOGGER.warning(
-            "No speaker matched (best score: %.2f < threshold: %.2f)",
-            best_score, threshold
-        )
-        return None
-        
+        return match_speaker(embedding, embeddings, threshold)
+
     except Exception as e:
         _LOGGER.error("Speaker identification failed: %s", e)
-        raise
\ No newline at end of file
+        raise
+
+
+def match_speaker(
+    embedding: np.ndarray,
+    embeddings: Union[Dict[str, np.ndarray], SpeakerIndex],
+    threshold: float = 0.35,
+) -> Optional[str]:
+    """Name of the best matching speaker, or None below the threshold."""
+    # Find best matching speaker (one matrix-vector product)
+    if not isinstance(embeddings, SpeakerIndex):
+        embeddings = SpeakerIndex.from_embeddings(embeddings)
+
+    _LOGGER.debug("Comparing against %d enrolled speakers", len(embeddings))
+    matches = embeddings.search(embedding, k=1)
+    if not matches:
+        _LOGGER.warning("No enrolled speakers to compare against")
+        SPEAKER_RESULTS.inc(result="unknown")
+        return None
+
+    best_speaker, best_score = matches[0]
+    SPEAKER_SCORE.observe(best_score)
+
+    _LOGGER.debug(
+        "Best match: %s (score: %.2f, threshold: %.2f)",
+        best_speaker, best_score, threshold
+    )
+
+    if best_score >= threshold:
+        _LOGGER.info(
+            "Identified speaker: %s (score: %.2f)",
+            best_speaker, best_score
+        )
+        SPEAKER_RESULTS.inc(result="matched")
+        return best_speaker
+
+    _LOGGER.warning(
+        "No speaker matched (best score: %.2f < threshold: %.2f)",
+        best_score, threshold
+    )
+    SPEAKER_RESULTS.inc(result="unknown")
+    return None
+
+
+def select_encoder_device(device: str = "auto") -> str:
+    """Resolve the device used by the voice encoder."""
+    if device != "auto":
+        return device
+
+    import torch
+
+    if torch.cuda.is_available():
+        return "cuda"
+
+    if torch.backends.mps.is_available():
+        return "mps"
+
+    return "cpu"
+
+
+class SpeakerIdentifier:
+    """Process-wide voice encoder and enrolled speaker embeddings.
+
+    Built once at startup and shared by every connection.
+    """
+
+    def __init__(
+        self,
+        encoder: "VoiceEncoder",
+        index: SpeakerIndex,
+        threshold: float = 0.35,
+    ) -> None:
+        self.encoder = encoder
+        self.index = index
+        self.threshold = threshold
+
+    @staticmethod
+    def load(
+        embeddings_path: Union[str, Path],
+        device: str = "auto",
+        threshold: float = 0.35,
+        pooling: str = POOLING_MAX,
+    ) -> "SpeakerIdentifier":
+        """Load embeddings and create a voice encoder on the given device."""
+        index = load_index(embeddings_path).pooled(pooling)
+        encoder_device = select_encoder_device(device)
+        _LOGGER.info("Loading voice encoder on device: %s", encoder_device)
+        from resemblyzer import VoiceEncoder
+
+        encoder = VoiceEncoder(device=encoder_device, verbose=False)
+        return SpeakerIdentifier(encoder, index, threshold=threshold)
+
+    def set_index(self, index: SpeakerIndex) -> None:
+        """Swap in a new index; in-flight matches keep using the old one."""
+        self.index = index
+
+    def warmup(self) -> None:
+        """Run one embedding so the first request doesn't pay for it."""
+        _LOGGER.debug("Warming up voice encoder")
+        rng = np.random.default_rng(0)
+        wav = rng.uniform(-0.1, 0.1, 16000).astype(np.float32)
+        self.embed_features(UtteranceFeatures(wav))
+
+    def identify(self, wav: np.ndarray) -> Optional[str]:
+        """Identify the speaker of 16kHz audio."""
+        return match_speaker(self.embed(wav), self.index, self.threshold)
+
+    def embed(self, wav: np.ndarray) -> np.ndarray:
+        """Voice embedding of 16kHz audio, like enrollment (see embed_features)."""
+        return self.embed_features(UtteranceFeatures(wav))
+
+    def embed_mels(self, mels: np.ndarray) -> np.ndarray:
+        """Embeddings of (windows, 160, 40) mel windows, in one forward pass."""
+        import torch
+
+        mels = np.ascontiguousarray(mels, dtype=np.float32)
+        with torch.no_grad():
+            return self.encoder(torch.from_numpy(mels).to(self.encoder.device)).cpu().numpy()
+
+    def embed_windows(
+        self,
+        windows: np.ndarray,
+        keys: Sequence[Hashable],
+        embedded: Optional[Dict[Hashable, np.ndarray]] = None,
+    ) -> np.ndarray:
+        """Embeddings of windows from speaker_windows, in one forward pass.
+
+        Windows whose key is in embedded are not embedded again, and new
+        embeddings are added to it.
+        """
+        if embedded is None:
+            return self.embed_mels(windows)
+
+        missing = [i for i, key in enumerate(keys) if key not in embedded]
+        if missing:
+            for i, embedding in zip(missing, self.embed_mels(windows[missing])):
+                embedded[keys[i]] = embedding
+
+        return np.stack([embedded[key] for key in keys])
+
+    def embed_features(
+        self,
+        features: UtteranceFeatures,
+        embedded: Optional[Dict[Hashable, np.ndarray]] = None,
+    ) -> np.ndarray:
+        """Voice embedding of an utterance from its shared mel frames.
+
+        Does what preprocess_wav and embed_utterance do, but on the mel
+        frames: quiet audio is raised to -30 dBFS, frames 20 dB below the
+        loudest one are dropped (short pauses are kept), and the embeddings
+        of 1.6s partial windows are averaged. script/enroll_speakers.py
+        and SpeakerStream embed utterances the same way, so queries and
+        enrollments match. Window embeddings in embedded are reused.
+        """
+        windows, keys = speaker_windows(
+            features.mel(SPEAKER_FRONT_END),
+            features.frame_db(SPEAKER_FRONT_END),
+            volume_gain(features.audio),
+        )
+        embedding = self.embed_windows(windows, keys, embedded).mean(axis=0)
+        return embedding / np.linalg.norm(embedding)
+
+    def identify_embedding(self, embedding: np.ndarray) -> Optional[str]:
+        """Identify the speaker of an embedding from embed()."""
+        return match_speaker(embedding, self.index, self.threshold)
+
+    def match(self, embedding: np.ndarray, k: int = 1) -> List[Tuple[str, float]]:
+        """Return the top-k (speaker, score) matches for an embedding."""
+        return self.index.search(embedding, k=k)
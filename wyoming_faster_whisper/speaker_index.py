@@ -0,0 +1,184 @@
+"""Vectorized nearest-speaker search over enrolled voice embeddings."""
+import logging
+from typing import Dict, List, Mapping, Sequence, Tuple, Union
+
+import numpy as np
+
+_LOGGER = logging.getLogger(__name__)
+
+POOLING_CENTROID = "centroid"
+POOLING_MAX = "max"
+
+EnrolledEmbeddings = Union[np.ndarray, Sequence[np.ndarray]]
+
+
+def _normalize_rows(matrix: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return matrix / norms
+
+
+class SpeakerIndex:
+    """Enrolled embeddings as one contiguous L2-normalized float32 matrix.
+
+    Every row belongs to a speaker (see row_speakers). All rows are scored
+    with a single matrix-vector product, and a speaker's score is the max
+    over its rows. With centroid pooling each speaker has exactly one row.
+    """
+
+    def __init__(
+        self,
+        matrix: np.ndarray,
+        row_speakers: Sequence[str],
+        normalized: bool = False,
+    ) -> None:
+        if matrix.ndim != 2:
+            raise ValueError(f"Expected a 2D embedding matrix, got {matrix.shape}")
+
+        if len(row_speakers) != matrix.shape[0]:
+            raise ValueError("Need exactly one speaker name per embedding row")
+
+        if normalized and (matrix.dtype == np.float32):
+            # Keep as-is so memory-mapped matrices stay shared
+            self.matrix = matrix
+        else:
+            self.matrix = np.ascontiguousarray(
+                _normalize_rows(np.asarray(matrix, dtype=np.float32))
+            )
+
+        self.speakers, self._row_ids = np.unique(
+            np.asarray(row_speakers, dtype=object), return_inverse=True
+        )
+        self._one_row_per_speaker = len(self.speakers) == len(row_speakers)
+
+    def __len__(self) -> int:
+        """Number of enrolled speakers."""
+        return len(self.speakers)
+
+    @property
+    def dim(self) -> int:
+        """Embedding dimension."""
+        return self.matrix.shape[1]
+
+    @property
+    def row_speakers(self) -> List[str]:
+        """Speaker name for each row of the matrix."""
+        return [str(self.speakers[i]) for i in self._row_ids]
+
+    @staticmethod
+    def from_embeddings(
+        embeddings: Mapping[str, EnrolledEmbeddings],
+        pooling: str = POOLING_CENTROID,
+    ) -> "SpeakerIndex":
+        """Build an index from {speaker: embedding(s)}.
+
+        Each value may be a single embedding or several (one per enrollment
+        clip). With centroid pooling the clips are averaged into one row per
+        speaker; with max pooling every clip is kept and the best one wins.
+        """
+        if pooling not in (POOLING_CENTROID, POOLING_MAX):
+            raise ValueError(f"Unknown pooling: {pooling}")
+
+        rows: List[np.ndarray] = []
+        row_speakers: List[str] = []
+        for speaker, speaker_embeddings in embeddings.items():
+            speaker_matrix = np.atleast_2d(
+                np.asarray(speaker_embeddings, dtype=np.float32)
+            )
+            if speaker_matrix.size == 0:
+                continue
+
+            speaker_matrix = _normalize_rows(speaker_matrix)
+            if pooling == POOLING_CENTROID:
+                speaker_matrix = speaker_matrix.mean(axis=0, keepdims=True)
+
+            rows.append(speaker_matrix)
+            row_speakers.extend([speaker] * len(speaker_matrix))
+
+        if not rows:
+            return SpeakerIndex(np.zeros((0, 0), dtype=np.float32), [])
+
+        _LOGGER.debug(
+            "Indexed %s embedding(s) for %s speaker(s)",
+            len(row_speakers),
+            len(embeddings),
+        )
+        return SpeakerIndex(np.concatenate(rows), row_speakers)
+
+    def pooled(self, pooling: str) -> "SpeakerIndex":
+        """Return an index with the given pooling of per-speaker rows.
+
+        Max pooling uses the rows as they are. Centroid pooling of several
+        rows per speaker builds a new in-memory matrix, which (unlike a
+        memory-mapped store) every process holds its own copy of; pool at
+        enrollment time instead where possible.
+        """
+        if (pooling == POOLING_MAX) or self._one_row_per_speaker:
+            return self
+
+        _LOGGER.info(
+            "Averaging %s embedding(s) into one per speaker in memory",
+            len(self.matrix),
+        )
+        return SpeakerIndex.from_embeddings(self.to_dict(), pooling=pooling)
+
+    def scores(self, embedding: np.ndarray) -> np.ndarray:
+        """Cosine similarity of each enrolled speaker to an embedding."""
+        query = np.asarray(embedding, dtype=np.float32).reshape(-1)
+        norm = np.linalg.norm(query)
+        if norm > 0:
+            query = query / norm
+
+        row_scores = self.matrix @ query
+        if self._one_row_per_speaker:
+            speaker_scores = np.empty(len(self.speakers), dtype=np.float32)
+            speaker_scores[self._row_ids] = row_scores
+            return speaker_scores
+
+        speaker_scores = np.full(len(self.speakers), -np.inf, dtype=np.float32)
+        np.maximum.at(speaker_scores, self._row_ids, row_scores)
+        return speaker_scores
+
+    def batch_scores(self, embeddings: np.ndarray) -> np.ndarray:
+        """Scores of several embeddings at once, shape (embeddings, speakers).
+
+        One matrix-matrix product instead of a product per embedding.
+        """
+        queries = _normalize_rows(
+            np.asarray(embeddings, dtype=np.float32).reshape(len(embeddings), -1)
+        )
+        row_scores = queries @ self.matrix.T
+        if self._one_row_per_speaker:
+            speaker_scores = np.empty(
+                (len(queries), len(self.speakers)), dtype=np.float32
+            )
+            speaker_scores[:, self._row_ids] = row_scores
+            return speaker_scores
+
+        speaker_scores = np.full(
+            (len(self.speakers), len(queries)), -np.inf, dtype=np.float32
+        )
+        np.maximum.at(speaker_scores, self._row_ids, row_scores.T)
+        return speaker_scores.T
+
+    def search(self, embedding: np.ndarray, k: int = 1) -> List[Tuple[str, float]]:
+        """Return the top-k (speaker, score) matches, best first."""
+        if (len(self.speakers) == 0) or (k < 1):
+            return []
+
+        speaker_scores = self.scores(embedding)
+        k = min(k, len(speaker_scores))
+        if k < len(speaker_scores):
+            top = np.argpartition(-speaker_scores, k - 1)[:k]
+        else:
+            top = np.arange(len(speaker_scores))
+
+        top = top[np.argsort(-speaker_scores[top], kind="stable")]
+        return [(str(self.speakers[i]), float(speaker_scores[i])) for i in top]
+
+    def to_dict(self) -> Dict[str, np.ndarray]:
+        """Return {speaker: (rows, dim) matrix} of the indexed embeddings."""
+        return {
+            str(speaker): self.matrix[self._row_ids == i]
+            for i, speaker in enumerate(self.speakers)
+        }
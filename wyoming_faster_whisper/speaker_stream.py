@@ -0,0 +1,187 @@
+"""Speaker embedding computed while audio streams in."""
+import asyncio
+import logging
+from concurrent.futures import Executor
+from typing import Dict, Hashable, List, Optional
+
+import numpy as np
+
+from .features import (
+    PARTIAL_FRAMES,
+    PARTIAL_STEP_FRAMES,
+    SPEAKER_FRONT_END,
+    UtteranceFeatures,
+    speaker_windows,
+    volume_gain,
+)
+from .metrics import SPEAKER_PARTIALS, STAGE_SECONDS
+from .speaker_identifier import SpeakerIdentifier
+
+_LOGGER = logging.getLogger(__name__)
+
+# Same partial utterances as resemblyzer's embed_utterance: 160 mel frames
+# (1.6 s) at 1.3 partials per second
+PARTIAL_SAMPLES = PARTIAL_FRAMES * SPEAKER_FRONT_END.hop_length
+PARTIAL_STEP_SAMPLES = PARTIAL_STEP_FRAMES * SPEAKER_FRONT_END.hop_length
+
+
+def settled_frames(num_samples: int) -> int:
+    """Number of mel frames that later audio can no longer change."""
+    half_window = SPEAKER_FRONT_END.n_fft // 2
+    return max(0, ((num_samples - half_window) // SPEAKER_FRONT_END.hop_length) + 1)
+
+
+class SpeakerStream:
+    """Running speaker embedding of an utterance that is still arriving.
+
+    Windows are built from the audio so far like embed_features builds
+    them (frames far below the loudest one dropped, quiet audio raised),
+    and each complete window is embedded as soon as possible. finish()
+    builds the windows of the whole utterance and only embeds the ones
+    that weren't embedded already, so the result is what embed_features
+    returns. Windows are reused as long as the trimming and gain come out
+    the same, e.g. unless louder speech arrives later.
+
+    With a margin, embedding stops once the best enrolled speaker is above
+    the match threshold and ahead of the runner-up by at least margin. The
+    windows embedded by then are the utterance embedding.
+    """
+
+    def __init__(
+        self,
+        identifier: SpeakerIdentifier,
+        executor: Optional[Executor] = None,
+        margin: float = 0.0,
+        min_partials: int = 2,
+    ) -> None:
+        self.identifier = identifier
+        self.executor = executor
+        self.margin = margin
+        self.min_partials = max(1, min_partials)
+
+        self.num_partials = 0
+        self.decided = False
+        self.embedding: Optional[np.ndarray] = None
+        self._embedded: Dict[Hashable, np.ndarray] = {}
+        self._chunks: List[np.ndarray] = []
+        self._num_samples = 0
+        self._checked_samples = 0
+        self._task: Optional[asyncio.Task] = None
+
+    def feed(self, audio: np.ndarray) -> None:
+        """Add 16kHz mono float32 audio, embedding any complete windows."""
+        if self.decided or (audio.size == 0):
+            return
+
+        self._chunks.append(audio)
+        self._num_samples += len(audio)
+        if (self._task is None) and self._has_new_window():
+            self._task = asyncio.create_task(self._run())
+
+    async def finish(self, features: UtteranceFeatures) -> Optional[np.ndarray]:
+        """Return the embedding of the whole utterance.
+
+        Unless decided early, this is the embedding embed_features returns
+        for features, computing only the windows not embedded yet.
+        """
+        if self._task is not None:
+            await self._task
+
+        if (not self.decided) and (features.audio.size > 0):
+            loop = asyncio.get_running_loop()
+            self.embedding = await loop.run_in_executor(
+                self.executor, self._embed_final, features
+            )
+
+        self._chunks = []
+        return self.embedding
+
+    def cancel(self) -> None:
+        """Stop embedding."""
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+
+    def _has_new_window(self) -> bool:
+        return (self._num_samples >= PARTIAL_SAMPLES) and (
+            (self._num_samples - self._checked_samples) >= PARTIAL_STEP_SAMPLES
+        )
+
+    async def _run(self) -> None:
+        loop = asyncio.get_running_loop()
+        try:
+            while (not self.decided) and self._has_new_window():
+                audio = np.concatenate(self._chunks)
+                self._chunks = [audio]
+                self._checked_samples = len(audio)
+
+                embedding = await loop.run_in_executor(
+                    self.executor, self._embed_prefix, audio
+                )
+                if embedding is not None:
+                    self.embedding = embedding
+                    self._check_decision()
+        finally:
+            self._task = None
+
+    def _embed_prefix(self, audio: np.ndarray) -> Optional[np.ndarray]:
+        power = SPEAKER_FRONT_END.power(audio)[: settled_frames(len(audio))]
+        windows, keys = speaker_windows(
+            SPEAKER_FRONT_END.mel(power),
+            SPEAKER_FRONT_END.frame_db(power),
+            volume_gain(audio),
+            complete_only=True,
+        )
+        if not keys:
+            return None
+
+        return self._embed(windows, keys)
+
+    def _embed_final(self, features: UtteranceFeatures) -> np.ndarray:
+        windows, keys = speaker_windows(
+            features.mel(SPEAKER_FRONT_END),
+            features.frame_db(SPEAKER_FRONT_END),
+            volume_gain(features.audio),
+        )
+        reused = sum(1 for key in keys if key in self._embedded)
+        if reused:
+            SPEAKER_PARTIALS.inc(reused, result="reused")
+
+        return self._embed(windows, keys)
+
+    def _embed(self, windows: np.ndarray, keys: List[Hashable]) -> np.ndarray:
+        num_embedded = len(self._embedded)
+        with STAGE_SECONDS.time(stage="speaker_embed"):
+            embeddings = self.identifier.embed_windows(windows, keys, self._embedded)
+
+        if len(self._embedded) > num_embedded:
+            SPEAKER_PARTIALS.inc(len(self._embedded) - num_embedded, result="embedded")
+
+        self.num_partials = len(keys)
+        embedding = embeddings.mean(axis=0)
+        return (embedding / np.linalg.norm(embedding)).astype(np.float32)
+
+    def _check_decision(self) -> None:
+        if (self.margin <= 0) or (self.num_partials < self.min_partials):
+            return
+
+        embedding = self.embedding
+        if embedding is None:
+            return
+
+        matches = self.identifier.match(embedding, k=2)
+        if not matches:
+            return
+
+        best_score = matches[0][1]
+        runner_up = matches[1][1] if len(matches) > 1 else 0.0
+        if (best_score >= self.identifier.threshold) and (
+            (best_score - runner_up) >= self.margin
+        ):
+            _LOGGER.debug(
+                "Speaker decided after %s partial(s): %s (margin: %.2f)",
+                self.num_partials,
+                matches[0][0],
+                best_score - runner_up,
+            )
+            self.decided = True
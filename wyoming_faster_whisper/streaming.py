@@ -0,0 +1,137 @@
+"""Incremental transcription of audio while it is still streaming in."""
+import asyncio
+import logging
+from typing import Awaitable, Callable, List, Optional
+
+import numpy as np
+
+from .audio import TARGET_RATE
+from .replicas import Transcriber
+
+_LOGGER = logging.getLogger(__name__)
+
+_FRAME_SAMPLES = TARGET_RATE // 50  # 20 ms
+_MIN_TAIL_SAMPLES = TARGET_RATE // 10  # 100 ms
+
+TextCallback = Callable[[str], Awaitable[None]]
+
+
+def find_cut(audio: np.ndarray, search_samples: int) -> int:
+    """Find the quietest 20 ms frame in the last search_samples of audio.
+
+    Returns the sample index to cut at, so segments end in a pause rather
+    than in the middle of a word where possible.
+    """
+    end = len(audio)
+    start = max(0, end - search_samples)
+    num_frames = (end - start) // _FRAME_SAMPLES
+    if num_frames < 1:
+        return end
+
+    frames = audio[start : start + (num_frames * _FRAME_SAMPLES)]
+    energy = np.square(frames.reshape(num_frames, _FRAME_SAMPLES)).mean(axis=1)
+    quietest = int(np.argmin(energy))
+
+    return start + (quietest * _FRAME_SAMPLES) + (_FRAME_SAMPLES // 2)
+
+
+class StreamingTranscriber:
+    """Transcribes an utterance in segments as audio arrives.
+
+    Once chunk_ms of audio is pending, a segment ending at the quietest point
+    near the end of the chunk is committed and sent to the batcher right
+    away. Segment texts are passed to on_text in order as they complete, and
+    only the last, partial chunk remains to be decoded at the end.
+    """
+
+    def __init__(
+        self,
+        batcher: Transcriber,
+        chunk_ms: int = 2000,
+        search_ms: int = 500,
+        on_text: Optional[TextCallback] = None,
+    ) -> None:
+        self.batcher = batcher
+        self.chunk_samples = max(_FRAME_SAMPLES, (chunk_ms * TARGET_RATE) // 1000)
+        self.search_samples = min(
+            self.chunk_samples // 2, (search_ms * TARGET_RATE) // 1000
+        )
+        self.on_text = on_text
+
+        self._chunks: List[np.ndarray] = []
+        self._pending: List[np.ndarray] = []
+        self._pending_samples = 0
+        self._segments: List["asyncio.Task[str]"] = []
+        self._texts: List[str] = []
+        self._emitted = 0
+        self._emitter: Optional[asyncio.Task] = None
+
+    @property
+    def audio(self) -> np.ndarray:
+        """All audio fed so far as one 16kHz mono float32 array."""
+        if not self._chunks:
+            return np.zeros(0, dtype=np.float32)
+
+        if len(self._chunks) > 1:
+            self._chunks = [np.concatenate(self._chunks)]
+
+        return self._chunks[0]
+
+    def feed(self, audio: np.ndarray) -> None:
+        """Add 16kHz mono float32 audio, committing full segments."""
+        if audio.size == 0:
+            return
+
+        self._chunks.append(audio)
+        self._pending.append(audio)
+        self._pending_samples += len(audio)
+
+        if self._pending_samples < self.chunk_samples:
+            return
+
+        pending = np.concatenate(self._pending)
+        while len(pending) >= self.chunk_samples:
+            cut = find_cut(pending[: self.chunk_samples], self.search_samples)
+            self._commit(pending[:cut])
+            pending = pending[cut:]
+
+        self._pending = [pending]
+        self._pending_samples = len(pending)
+
+    async def finish(self) -> str:
+        """Transcribe the remaining audio and return the full text."""
+        if self._pending_samples > 0:
+            tail = np.concatenate(self._pending)
+            if (len(tail) >= _MIN_TAIL_SAMPLES) or (not self._segments):
+                self._commit(tail)
+
+        self._pending = []
+        self._pending_samples = 0
+
+        if self._emitter is not None:
+            await self._emitter
+
+        return " ".join(text for text in self._texts if text)
+
+    def cancel(self) -> None:
+        """Cancel outstanding segment transcriptions."""
+        for task in self._segments:
+            task.cancel()
+
+        if self._emitter is not None:
+            self._emitter.cancel()
+
+    def _commit(self, segment: np.ndarray) -> None:
+        _LOGGER.debug("Committing streaming segment of %s sample(s)", len(segment))
+        self._segments.append(asyncio.create_task(self.batcher.transcribe(segment)))
+        if (self._emitter is None) or self._emitter.done():
+            self._emitter = asyncio.create_task(self._emit_ready())
+
+    async def _emit_ready(self) -> None:
+        # Segments finish in any order; report text in audio order
+        while self._emitted < len(self._segments):
+            text = (await self._segments[self._emitted]).strip()
+            self._emitted += 1
+            self._texts.append(text)
+            if text and (self.on_text is not None):
+                await self.on_text(text)
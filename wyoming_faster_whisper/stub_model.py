@@ -0,0 +1,51 @@
+"""Tiny stand-in for a NeMo ASR model, for benchmarks and tests."""
+import logging
+from typing import Any, List, Sequence
+
+import numpy as np
+
+from .asr_backend import AsrBackend
+
+_LOGGER = logging.getLogger(__name__)
+
+STUB_MODEL_NAME = "stub"
+
+_FRAME_SAMPLES = 400  # 25 ms at 16kHz
+_HOP_SAMPLES = 160  # 10 ms at 16kHz
+
+
+class StubASRModel(AsrBackend):
+    """Mimics ASRModel.transcribe without NeMo or model weights.
+
+    Each utterance goes through a small but real amount of work (framing,
+    FFT and a projection), so latency still grows with audio length and
+    batch size. The returned text is fixed.
+    """
+
+    name = STUB_MODEL_NAME
+
+    def __init__(self, text: str = "", feature_dim: int = 256) -> None:
+        self.text = text
+        rng = np.random.default_rng(0)
+        self._projection = rng.standard_normal(
+            ((_FRAME_SAMPLES // 2) + 1, feature_dim)
+        ).astype(np.float32)
+
+    def transcribe(
+        self, audio: Sequence[np.ndarray], batch_size: int = 4, **kwargs: Any
+    ) -> List[str]:
+        """Return one (fixed) transcription per utterance."""
+        texts = []
+        for samples in audio:
+            num_frames = 1 + max(0, len(samples) - _FRAME_SAMPLES) // _HOP_SAMPLES
+            if len(samples) >= _FRAME_SAMPLES:
+                frames = np.lib.stride_tricks.sliding_window_view(
+                    samples, _FRAME_SAMPLES
+                )[::_HOP_SAMPLES][:num_frames]
+                spectrum = np.abs(np.fft.rfft(frames, axis=1)).astype(np.float32)
+                features = np.tanh(spectrum @ self._projection)
+                _LOGGER.debug("Stub features: %s", features.shape)
+
+            texts.append(self.text)
+
+        return texts
@@ -0,0 +1,276 @@
+"""Pre-forked worker processes sharing one listening socket."""
+import asyncio
+import logging
+import multiprocessing
+import os
+import select
+import signal
+import socket
+import sys
+import time
+from functools import partial
+from multiprocessing.process import BaseProcess
+from pathlib import Path
+from typing import Callable, Dict, Optional, Set
+from urllib.parse import urlparse
+
+from wyoming.server import AsyncServer, HandlerFactory
+
+_LOGGER = logging.getLogger(__name__)
+
+_BACKLOG = 128
+_POLL_SECONDS = 0.5
+_STOP_TIMEOUT = 10.0
+_MIN_UPTIME = 10.0  # workers that die sooner are crash-looping
+_MAX_RESTART_DELAY = 30.0
+
+# Workers are forked so they inherit the listening socket and loaded state
+_FORK = multiprocessing.get_context("fork")
+
+
+def bind_socket(uri: str) -> socket.socket:
+    """Create the listening socket for a tcp:// or unix:// URI."""
+    result = urlparse(uri)
+    if result.scheme == "tcp":
+        if (result.hostname is None) or (result.port is None):
+            raise ValueError("A port must be specified when using a 'tcp://' URI")
+
+        family = socket.AF_INET6 if ":" in result.hostname else socket.AF_INET
+        sock = socket.socket(family, socket.SOCK_STREAM)
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        sock.bind((result.hostname, result.port))
+    elif result.scheme == "unix":
+        path = Path(result.path)
+        if path.is_socket():
+            path.unlink()
+
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        sock.bind(str(path))
+    else:
+        raise ValueError("Only 'unix://' or 'tcp://' are supported with workers")
+
+    sock.listen(_BACKLOG)
+    sock.setblocking(False)
+    return sock
+
+
+def close_socket(uri: str, sock: socket.socket) -> None:
+    """Close a socket from bind_socket, removing a Unix socket file."""
+    sock.close()
+    result = urlparse(uri)
+    if result.scheme == "unix":
+        Path(result.path).unlink(missing_ok=True)
+
+
+class SocketServer(AsyncServer):
+    """Wyoming server accepting connections on an already bound socket."""
+
+    def __init__(self, sock: socket.socket) -> None:
+        super().__init__()
+        self.sock = sock
+        self._server: Optional[asyncio.AbstractServer] = None
+
+    async def run(self, handler_factory: HandlerFactory) -> None:
+        await self.start(handler_factory)
+        assert self._server is not None
+        await self._server.serve_forever()
+
+    async def start(self, handler_factory: HandlerFactory) -> None:
+        handler_callback = partial(self._handler_callback, handler_factory)
+        if self.sock.family == socket.AF_UNIX:
+            self._server = await asyncio.start_unix_server(
+                handler_callback, sock=self.sock
+            )
+        else:
+            self._server = await asyncio.start_server(handler_callback, sock=self.sock)
+
+        await self._server.start_serving()
+
+    async def stop(self) -> None:
+        await super().stop()
+
+        if self._server is not None:
+            self._server.close()
+
+
+# Called in each forked worker with (worker index, ready callback); returns
+# the process exit code. Workers are stopped with SIGTERM, whose default
+# action ends them at once: install a handler to clean up first.
+WorkerMain = Callable[[int, Callable[[], None]], int]
+
+
+class Supervisor:
+    """Forks worker processes, restarts crashed ones and stops them all.
+
+    Workers inherit the listening socket, so the kernel hands each new
+    connection to whichever worker accepts it first. Each worker reports
+    readiness over a pipe; once every worker index has, ready_file is created.
+
+    Only workers whose process exits are restarted: there is no health
+    check, so a worker that hangs keeps its place until it is killed.
+    """
+
+    def __init__(
+        self,
+        num_workers: int,
+        worker_main: WorkerMain,
+        ready_file: Optional[str] = None,
+    ) -> None:
+        self.num_workers = num_workers
+        self.worker_main = worker_main
+        self.ready_file = ready_file
+
+        self._workers: Dict[int, BaseProcess] = {}  # worker index -> process
+        self._started: Dict[int, float] = {}  # worker index -> start time
+        self._restart_delay: Dict[int, float] = {}
+        self._restart_at: Dict[int, float] = {}
+        self._ready: Set[int] = set()  # worker indexes that reported ready
+        self._ready_buffer = b""
+        self._stopping = False
+        self._ready_read, self._ready_write = os.pipe()
+        os.set_blocking(self._ready_read, False)
+
+    def run(self) -> int:
+        """Supervise workers until SIGTERM, SIGINT or stop()."""
+        previous_handlers = {
+            signum: signal.signal(signum, self._handle_signal)
+            for signum in (signal.SIGTERM, signal.SIGINT)
+        }
+        try:
+            for index in range(self.num_workers):
+                self._spawn(index)
+
+            while not self._stopping:
+                self._read_ready()
+                self._reap()
+                self._restart_due()
+        finally:
+            for signum, handler in previous_handlers.items():
+                signal.signal(signum, handler)
+
+            self._stop_all()
+            if self.ready_file:
+                Path(self.ready_file).unlink(missing_ok=True)
+
+        return 0
+
+    def stop(self) -> None:
+        """Make run() stop all workers and return (e.g. from another thread)."""
+        self._stopping = True
+
+    def _handle_signal(self, signum, frame) -> None:
+        _LOGGER.info("Stopping workers (signal %s)", signum)
+        self.stop()
+
+    def _spawn(self, index: int) -> None:
+        process = _FORK.Process(
+            target=self._run_worker, args=(index,), name=f"worker-{index}"
+        )
+        process.start()
+        _LOGGER.info("Started worker %s (pid %s)", index, process.pid)
+        self._workers[index] = process
+        self._started[index] = time.monotonic()
+
+    def _run_worker(self, index: int) -> None:
+        """Run worker_main in the forked process and exit with its code."""
+        exit_code = 1
+        try:
+            signal.signal(signal.SIGTERM, signal.SIG_DFL)
+            signal.signal(signal.SIGINT, signal.default_int_handler)
+            os.close(self._ready_read)
+            ready_write = self._ready_write
+
+            def notify_ready() -> None:
+                os.write(ready_write, f"{index}\n".encode())
+
+            exit_code = self.worker_main(index, notify_ready)
+        except KeyboardInterrupt:
+            exit_code = 0
+        except BaseException:  # pylint: disable=broad-except
+            _LOGGER.exception("Worker %s failed", index)
+
+        sys.exit(exit_code)
+
+    def _read_ready(self) -> None:
+        try:
+            readable, _, _ = select.select([self._ready_read], [], [], _POLL_SECONDS)
+        except InterruptedError:
+            return
+
+        if not readable:
+            return
+
+        try:
+            data = os.read(self._ready_read, 1024)
+        except BlockingIOError:
+            return
+
+        # One line per ready message: the worker index
+        *lines, self._ready_buffer = (self._ready_buffer + data).split(b"\n")
+        previously_ready = len(self._ready) >= self.num_workers
+        for line in lines:
+            index = int(line)
+            _LOGGER.debug("Worker %s is ready", index)
+            self._ready.add(index)
+
+        if (
+            (not previously_ready)
+            and (len(self._ready) >= self.num_workers)
+            and self.ready_file
+        ):
+            Path(self.ready_file).write_text(str(os.getpid()), encoding="utf-8")
+
+    def _reap(self) -> None:
+        for index, process in list(self._workers.items()):
+            exit_code = process.exitcode
+            if exit_code is None:
+                continue
+
+            del self._workers[index]
+            pid = process.pid
+            process.close()
+            if self._stopping:
+                continue
+
+            uptime = time.monotonic() - self._started.get(index, 0.0)
+            delay = 0.0
+            if uptime < _MIN_UPTIME:
+                delay = min(
+                    _MAX_RESTART_DELAY,
+                    max(1.0, 2 * self._restart_delay.get(index, 0.0)),
+                )
+
+            self._restart_delay[index] = delay
+            self._restart_at[index] = time.monotonic() + delay
+            _LOGGER.warning(
+                "Worker %s (pid %s) exited with status %s; restarting in %.0f second(s)",
+                index,
+                pid,
+                exit_code,
+                delay,
+            )
+
+    def _restart_due(self) -> None:
+        now = time.monotonic()
+        for index, restart_at in list(self._restart_at.items()):
+            if restart_at <= now:
+                del self._restart_at[index]
+                self._spawn(index)
+
+    def _stop_all(self) -> None:
+        for process in self._workers.values():
+            process.terminate()
+
+        deadline = time.monotonic() + _STOP_TIMEOUT
+        for process in self._workers.values():
+            process.join(max(0.0, deadline - time.monotonic()))
+
+        for process in self._workers.values():
+            if process.exitcode is None:
+                _LOGGER.warning("Killing worker (pid %s)", process.pid)
+                process.kill()
+                process.join()
+
+            process.close()
+
+        self._workers.clear()
@@ -0,0 +1,114 @@
+"""Lightweight voice activity detection on incoming PCM audio."""
+import logging
+from collections import deque
+from typing import Deque, List
+
+import numpy as np
+
+from .audio import decode_pcm
+
+_LOGGER = logging.getLogger(__name__)
+
+
+def frame_dbfs(frame: bytes, width: int, channels: int) -> float:
+    """RMS level of a PCM frame in dB relative to full scale."""
+    samples = decode_pcm(frame, width, channels)
+    rms = float(np.sqrt(np.mean(np.square(samples)))) if samples.size else 0.0
+    return 20.0 * np.log10(max(rms, 1e-10))
+
+
+class SpeechTrimmer:
+    """Drops silent frames as audio arrives so they are never buffered.
+
+    Audio is split into frame_ms frames and classified by energy. Leading
+    silence is dropped except for padding_ms before the first speech frame.
+    Pauses inside speech are kept up to 2 * padding_ms (padding on each
+    side), and trailing silence is cut to padding_ms by finish().
+    """
+
+    def __init__(
+        self,
+        rate: int,
+        width: int,
+        channels: int,
+        threshold_db: float = -45.0,
+        frame_ms: int = 30,
+        padding_ms: int = 300,
+    ) -> None:
+        self.width = width
+        self.channels = channels
+        self.threshold_db = threshold_db
+        self.frame_bytes = width * channels * max(1, (rate * frame_ms) // 1000)
+        self.padding_frames = max(1, padding_ms // frame_ms)
+
+        self.speech_detected = False
+        self.frames_in = 0
+        self.frames_out = 0
+
+        self._remainder = b""
+        self._preroll: Deque[bytes] = deque(maxlen=self.padding_frames)
+
+        # Only the start and end of a pause are ever kept, so a client
+        # streaming silence after speech can't grow memory
+        self._pause_head: List[bytes] = []
+        self._pause_tail: Deque[bytes] = deque(maxlen=self.padding_frames)
+
+    def process(self, audio: bytes) -> bytes:
+        """Classify new audio and return the part that should be kept."""
+        audio = self._remainder + audio
+        num_frames = len(audio) // self.frame_bytes
+        self._remainder = audio[num_frames * self.frame_bytes :]
+
+        kept: List[bytes] = []
+        for i in range(num_frames):
+            frame = audio[i * self.frame_bytes : (i + 1) * self.frame_bytes]
+            self.frames_in += 1
+            is_speech = (
+                frame_dbfs(frame, self.width, self.channels) >= self.threshold_db
+            )
+
+            if not self.speech_detected:
+                if is_speech:
+                    self.speech_detected = True
+                    kept.extend(self._preroll)
+                    kept.append(frame)
+                    self._preroll.clear()
+                else:
+                    self._preroll.append(frame)
+            elif is_speech:
+                kept.extend(self._end_pause())
+                kept.append(frame)
+            elif len(self._pause_head) < self.padding_frames:
+                self._pause_head.append(frame)
+            else:
+                self._pause_tail.append(frame)
+
+        self.frames_out += len(kept)
+        return b"".join(kept)
+
+    def finish(self) -> bytes:
+        """Return trailing padding after the last speech frame."""
+        trailing = self._pause_head
+        self._pause_head = []
+        self._pause_tail.clear()
+        self._remainder = b""
+        self._preroll.clear()
+        self.frames_out += len(trailing)
+
+        if self.frames_in > 0:
+            _LOGGER.debug(
+                "VAD kept %s/%s frame(s) (speech detected: %s)",
+                self.frames_out,
+                self.frames_in,
+                self.speech_detected,
+            )
+
+        return b"".join(trailing)
+
+    def _end_pause(self) -> List[bytes]:
+        # Long pauses keep padding after the previous word and before the
+        # next; shorter ones are kept whole
+        pause = self._pause_head + list(self._pause_tail)
+        self._pause_head = []
+        self._pause_tail.clear()
+        return pause